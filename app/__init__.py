@@ -2,18 +2,37 @@
 Factory de aplicación Flask.
 Crea y configura la instancia de la aplicación.
 """
-from flask import Flask
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_socketio import SocketIO
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from config import config
 
+
+def _rate_limit_key():
+    """Clave de Flask-Limiter: la API Key validada o, sin ella, la IP."""
+    from app.utils.rate_limit import rate_limit_key
+    return rate_limit_key()
+
+
+def _default_limit():
+    """Límite de las rutas sin límite propio: RATE_LIMIT_PER_MINUTE por minuto."""
+    return f"{current_app.config['RATE_LIMIT_PER_MINUTE']} per minute"
+
+
+def _token_bucket_enabled():
+    """Con el token bucket activo, la cuota global la aplica token_bucket_limiter."""
+    return current_app.config['RATE_LIMIT_TOKEN_BUCKET_ENABLED']
+
+
 db = SQLAlchemy()
 socketio = SocketIO()
+# Sin token bucket, la cuota global vuelve a ser el límite por defecto de
+# Flask-Limiter, como antes de RATE_LIMIT_TOKEN_BUCKET_ENABLED
 limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["100 per minute"]
+    key_func=_rate_limit_key,
+    default_limits=[_default_limit],
+    default_limits_exempt_when=_token_bucket_enabled
 )
 
 
@@ -30,9 +49,24 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    from app.utils.serialization import init_json
+    init_json(app)
+    
     db.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    
+    # client_manager siempre explícito: Flask-SocketIO conserva las opciones
+    # de llamadas anteriores a init_app
+    from app.utils.message_queue import create_client_manager
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        client_manager=create_client_manager(app.config['SOCKETIO_MESSAGE_QUEUE'], app.config['SOCKETIO_CHANNEL'])
+    )
+    
+    # Registra el esquema sqlite:// antes de que Flask-Limiter cree su almacenamiento
+    from app.utils.rate_limit import token_bucket_limiter
     limiter.init_app(app)
+    token_bucket_limiter.init_app(app, limiter.storage)
     
     from app.routes import api_bp
     app.register_blueprint(api_bp)
@@ -40,10 +74,39 @@ def create_app(config_name='default'):
     from app.utils.error_handlers import register_error_handlers
     register_error_handlers(app)
     
+    from app.commands import register_commands
+    register_commands(app)
+    
     from app.websocket_handlers import register_websocket_handlers
     register_websocket_handlers(socketio)
     
+    from app.services.content_filter import content_filter
+    content_filter.init_app(app)
+    
+    from app.utils.cache import session_page_cache
+    session_page_cache.init_app(app)
+    
+    from app.services.ingestion_service import ingestion_service
+    ingestion_service.init_app(app)
+    
+    from app.services.broadcast_dispatcher import broadcast_dispatcher
+    broadcast_dispatcher.init_app(app)
+    
+    from app.utils.replay_buffer import replay_buffer
+    replay_buffer.init_app(app)
+    
+    from app.services.api_key_cache import api_key_cache, last_used_buffer
+    api_key_cache.init_app(app)
+    last_used_buffer.init_app(app)
+    
     with app.app_context():
         db.create_all()
+        
+        from app.migrations import run_migrations
+        run_migrations()
+        
+        from app.repositories.message_repository import MessageRepository
+        MessageRepository().load_known_message_ids()
+        MessageRepository().detect_full_text_search()
     
     return app
@@ -0,0 +1,21 @@
+"""
+Comandos de línea de comandos (flask <comando>).
+"""
+import click
+
+
+def register_commands(app):
+    """
+    Registra los comandos CLI con la aplicación Flask.
+    
+    Args:
+        app: Instancia de la aplicación Flask
+    """
+    
+    @app.cli.command('rebuild-session-stats')
+    def rebuild_session_stats_command():
+        """Recalcula los contadores de session_stats desde la tabla messages."""
+        from app.repositories.message_repository import MessageRepository
+        
+        sessions = MessageRepository().rebuild_session_stats()
+        click.echo(f'Contadores reconstruidos para {sessions} sesiones')
@@ -0,0 +1,180 @@
+"""
+Migraciones ligeras del esquema.
+db.create_all() crea las tablas que faltan pero no altera las existentes;
+este módulo aplica los cambios incrementales de forma idempotente al
+iniciar la aplicación.
+"""
+from sqlalchemy import exists, inspect, select, text, update
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Message, SessionStats
+from app.utils.timestamps import to_epoch_ms
+
+
+# Filas actualizadas por transacción durante los backfills
+BACKFILL_BATCH_SIZE = 1000
+
+
+def run_migrations():
+    """Aplica en orden todas las migraciones pendientes."""
+    with db.engine.begin() as connection:
+        connection.execute(text('CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY)'))
+    
+    for migration in MIGRATIONS:
+        migration()
+
+
+def add_timestamp_epoch_column():
+    """Agrega messages.timestamp_epoch_ms, su índice y rellena las filas existentes."""
+    added = _add_column_if_missing('messages', 'timestamp_epoch_ms', 'BIGINT')
+    _create_missing_indexes(Message.__table__)
+    
+    # Las filas nuevas se guardan con la columna calculada; el recorrido solo
+    # hace falta una vez (los timestamps heredados no ISO quedan en NULL y
+    # harían que cualquier comprobación de nulos lo repitiera en cada arranque)
+    if not added and _is_applied('timestamp_epoch_backfill'):
+        return
+    
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Message.id, Message.timestamp)
+            .where(Message.id > last_id, Message.timestamp_epoch_ms.is_(None))
+            .order_by(Message.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        
+        updates = []
+        for row_id, timestamp in rows:
+            try:
+                updates.append({'id': row_id, 'timestamp_epoch_ms': to_epoch_ms(timestamp)})
+            except (ValueError, TypeError, OverflowError):
+                # Timestamps heredados no ISO quedan sin normalizar
+                continue
+        
+        if updates:
+            db.session.execute(update(Message), updates)
+        db.session.commit()
+        last_id = rows[-1][0]
+    
+    _mark_applied('timestamp_epoch_backfill')
+
+
+def add_session_keyset_index():
+    """Crea el índice (session_id, id) usado por la paginación con cursores."""
+    _create_missing_indexes(Message.__table__)
+
+
+def backfill_session_stats():
+    """Calcula session_stats la primera vez que se ejecuta sobre una base con mensajes."""
+    from app.repositories.message_repository import MessageRepository
+    
+    has_stats = db.session.execute(select(exists().select_from(SessionStats))).scalar()
+    has_messages = db.session.execute(select(exists().select_from(Message))).scalar()
+    
+    if has_messages and not has_stats:
+        MessageRepository().rebuild_session_stats()
+
+
+def create_messages_fts():
+    """
+    Crea el índice FTS5 messages_fts y los triggers que lo sincronizan.
+    
+    Solo aplica a SQLite. Si el motor no fue compilado con FTS5 la
+    migración no hace nada y la búsqueda sigue usando LIKE.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    
+    if inspect(db.engine).has_table('messages_fts'):
+        created = False
+    else:
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    "CREATE VIRTUAL TABLE messages_fts USING fts5("
+                    "content, content='messages', content_rowid='id', "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                ))
+        except OperationalError:
+            # SQLite sin FTS5
+            return
+        created = True
+    
+    with db.engine.begin() as connection:
+        for statement in MESSAGES_FTS_TRIGGERS:
+            connection.execute(text(statement))
+        
+        if created:
+            # Indexa los mensajes que existían antes de crear la tabla
+            connection.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+def add_api_key_rate_limit_columns():
+    """Agrega las cuotas de rate limiting por API Key."""
+    _add_column_if_missing('api_keys', 'rate_limit_per_minute', 'INTEGER')
+    _add_column_if_missing('api_keys', 'rate_limit_burst', 'INTEGER')
+
+
+def _is_applied(name):
+    """Indica si una migración de una sola vez ya terminó."""
+    with db.engine.connect() as connection:
+        return connection.execute(
+            text('SELECT 1 FROM schema_migrations WHERE name = :name'), {'name': name}
+        ).first() is not None
+
+
+def _mark_applied(name):
+    """Registra que una migración de una sola vez terminó."""
+    if _is_applied(name):
+        return
+    with db.engine.begin() as connection:
+        connection.execute(text('INSERT INTO schema_migrations (name) VALUES (:name)'), {'name': name})
+
+
+def _add_column_if_missing(table_name, column_name, column_type):
+    """
+    Ejecuta ALTER TABLE ADD COLUMN si la columna no existe.
+    
+    Returns:
+        True si la columna se agregó
+    """
+    columns = {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+    if column_name in columns:
+        return False
+    
+    with db.engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}'))
+    return True
+
+
+def _create_missing_indexes(table):
+    """Crea los índices declarados en el modelo que aún no existen."""
+    for index in table.indexes:
+        index.create(db.engine, checkfirst=True)
+
+
+# Triggers que mantienen messages_fts sincronizada con messages
+MESSAGES_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+
+MIGRATIONS = [
+    add_timestamp_epoch_column,
+    add_session_keyset_index,
+    backfill_session_stats,
+    create_messages_fts,
+    add_api_key_rate_limit_columns,
+]
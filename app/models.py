@@ -16,6 +16,7 @@ class Message(db.Model):
         session_id: Identificador de sesión para agrupar mensajes
         content: Contenido del mensaje
         timestamp: Cuándo se creó el mensaje (formato ISO)
+        timestamp_epoch_ms: timestamp normalizado a milisegundos UTC (para filtros de rango)
         sender: Quién envió el mensaje ('user' o 'system')
         word_count: Número de palabras en el mensaje
         character_count: Número de caracteres en el mensaje
@@ -23,12 +24,17 @@ class Message(db.Model):
     """
     
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_session_timestamp_epoch', 'session_id', 'timestamp_epoch_ms'),
+        db.Index('ix_messages_session_id_id', 'session_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     message_id = db.Column(db.String(100), unique=True, nullable=False, index=True)
     session_id = db.Column(db.String(100), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.String(50), nullable=False)
+    timestamp_epoch_ms = db.Column(db.BigInteger, nullable=True)
     sender = db.Column(db.String(20), nullable=False)
     word_count = db.Column(db.Integer, nullable=False)
     character_count = db.Column(db.Integer, nullable=False)
@@ -58,6 +64,44 @@ class Message(db.Model):
         }
 
 
+class SessionStats(db.Model):
+    """
+    Contadores de mensajes por sesión, mantenidos en la misma transacción
+    que cada inserción para evitar COUNT(*) en cada lectura.
+    
+    Atributos:
+        session_id: Identificador de sesión (clave primaria)
+        total_count: Número total de mensajes de la sesión
+        user_count: Número de mensajes enviados por 'user'
+        system_count: Número de mensajes enviados por 'system'
+        last_id: Clave primaria (Message.id) del último mensaje
+        last_timestamp: Timestamp del último mensaje
+    """
+    
+    __tablename__ = 'session_stats'
+    
+    session_id = db.Column(db.String(100), primary_key=True)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+    system_count = db.Column(db.Integer, nullable=False, default=0)
+    last_id = db.Column(db.Integer, nullable=True)
+    last_timestamp = db.Column(db.String(50), nullable=True)
+    
+    def __repr__(self):
+        return f'<SessionStats {self.session_id}: {self.total_count} messages>'
+    
+    def count_for(self, sender=None):
+        """
+        Retorna el contador correspondiente a un filtro de remitente.
+        
+        Args:
+            sender: None para el total, 'user' o 'system'
+        """
+        if sender is None:
+            return self.total_count
+        return self.user_count if sender == 'user' else self.system_count
+
+
 class APIKey(db.Model):
     """
     Modelo APIKey para autenticación de clientes.
@@ -69,6 +113,8 @@ class APIKey(db.Model):
         created_at: Fecha de creación
         last_used_at: Última vez que se usó la key
         is_active: Si la key está activa o revocada
+        rate_limit_per_minute: Solicitudes por minuto de la key (None: RATE_LIMIT_PER_MINUTE)
+        rate_limit_burst: Ráfaga máxima de la key (None: igual a su cuota por minuto)
     """
     
     __tablename__ = 'api_keys'
@@ -79,6 +125,8 @@ class APIKey(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     last_used_at = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
+    rate_limit_per_minute = db.Column(db.Integer, nullable=True)
+    rate_limit_burst = db.Column(db.Integer, nullable=True)
     
     def __repr__(self):
         return f'<APIKey {self.name} ({"active" if self.is_active else "revoked"})>'
@@ -93,5 +141,7 @@ class APIKey(db.Model):
             'name': self.name,
             'created_at': self.created_at.isoformat() + 'Z',
             'last_used_at': self.last_used_at.isoformat() + 'Z' if self.last_used_at else None,
-            'is_active': self.is_active
+            'is_active': self.is_active,
+            'rate_limit_per_minute': self.rate_limit_per_minute,
+            'rate_limit_burst': self.rate_limit_burst
         }
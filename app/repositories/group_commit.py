@@ -0,0 +1,105 @@
+"""
+Escritura con group commit para mensajes.
+Agrupa llamadas concurrentes a save_message en una sola transacción.
+"""
+import threading
+from app.utils.validators import ValidationError
+
+
+class _PendingBatch:
+    """Lote abierto de mensajes que esperan ser escritos juntos."""
+    
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.closed = False
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class GroupCommitWriter:
+    """
+    Coordina el group commit entre hilos.
+    
+    El primer hilo que llega a un lote vacío actúa como líder: espera la
+    ventana configurada (o hasta que el lote se llene), escribe todos los
+    mensajes acumulados con un INSERT masivo y reparte a cada llamador su
+    propio resultado o su error DUPLICATE_MESSAGE_ID.
+    """
+    
+    def __init__(self):
+        """Inicializa el coordinador sin lote abierto."""
+        self._lock = threading.Lock()
+        self._batch = None
+    
+    def submit(self, repository, message_data, window_seconds, max_batch_size):
+        """
+        Encola un mensaje en el lote actual y espera a que se escriba.
+        
+        Args:
+            repository: MessageRepository usado por el líder para escribir
+            message_data: Diccionario con los datos del mensaje
+            window_seconds: Tiempo máximo que el líder espera más mensajes
+            max_batch_size: Número de mensajes que cierra el lote de inmediato
+        
+        Returns:
+            Objeto Message guardado
+        
+        Raises:
+            ValidationError: Si el message_id ya existe
+        """
+        with self._lock:
+            batch = self._batch
+            is_leader = batch is None
+            if is_leader:
+                batch = _PendingBatch()
+                self._batch = batch
+            
+            index = len(batch.items)
+            batch.items.append(message_data)
+            
+            if len(batch.items) >= max_batch_size:
+                self._close(batch)
+        
+        if is_leader:
+            batch.full.wait(window_seconds)
+            with self._lock:
+                self._close(batch)
+            self._write(repository, batch)
+        else:
+            batch.done.wait()
+        
+        if batch.error is not None:
+            raise batch.error
+        
+        outcome = batch.results[index]
+        if isinstance(outcome, ValidationError):
+            raise outcome
+        
+        return outcome
+    
+    def _close(self, batch):
+        """Cierra el lote para que las nuevas llamadas abran otro. Requiere el lock."""
+        if not batch.closed:
+            batch.closed = True
+            if self._batch is batch:
+                self._batch = None
+            batch.full.set()
+    
+    @staticmethod
+    def _write(repository, batch):
+        """Escribe el lote completo y despierta a los hilos en espera."""
+        from app import db
+        
+        try:
+            batch.results = repository.save_messages_bulk(batch.items)
+        except Exception as error:
+            db.session.rollback()
+            batch.error = error
+        finally:
+            batch.done.set()
+
+
+# Instancia compartida por todos los repositorios del proceso
+group_commit_writer = GroupCommitWriter()
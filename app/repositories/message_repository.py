@@ -2,12 +2,58 @@
 Repositorio de mensajes para operaciones de base de datos.
 Maneja todas las interacciones con la base de datos para mensajes.
 """
+import html
+import re
+from flask import current_app
 from app import db
-from app.models import Message
+from app.models import Message, SessionStats
+from app.repositories.group_commit import group_commit_writer
+from app.repositories.records import MessageRecord, columns_for_fields
+from sqlalchemy import Column, Integer, MetaData, Table, Text, case, delete, exists, func, insert, inspect, literal_column, or_, select, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from app.utils.bloom_filter import BloomFilter
 from app.utils.validators import ValidationError
 
 
+# Máximo de parámetros por cláusula IN al consultar IDs existentes
+_IN_CHUNK_SIZE = 500
+
+# Marcadores del fragmento resaltado en los resultados de búsqueda
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+SNIPPET_ELLIPSIS = '…'
+SNIPPET_TOKENS = 16
+
+# snippet() marca los términos con caracteres de uso privado en lugar de
+# <mark>: el fragmento se escapa como HTML y luego se cambian por las etiquetas
+_SNIPPET_START = '\ue000'
+_SNIPPET_END = '\ue001'
+
+# Tabla virtual FTS5 creada por la migración create_messages_fts. Vive en
+# su propio MetaData para que db.create_all() no intente crearla.
+_messages_fts = Table('messages_fts', MetaData(), Column('rowid', Integer), Column('content', Text))
+
+# Palabras que se envían a FTS5
+_FTS_TERM_PATTERN = re.compile(r'\w+')
+
+# Indica si la búsqueda usa FTS5; se detecta en create_app
+_full_text_search = False
+
+# Filtro Bloom de message_ids conocidos; se carga en create_app y es None
+# cuando la pre-verificación de duplicados está desactivada
+_known_message_ids = None
+
+
+def _duplicate_error(message_id):
+    """Construye el error estándar para un message_id repetido."""
+    return ValidationError(
+        'DUPLICATE_MESSAGE_ID',
+        f'Ya existe un mensaje con el ID "{message_id}"',
+        {'field': 'message_id'}
+    )
+
+
 class MessageRepository:
     """Repositorio para operaciones de base de datos de mensajes."""
     
@@ -24,32 +70,313 @@ class MessageRepository:
         Raises:
             ValidationError: Si el message_id ya existe
         """
-        try:
-            message = Message(
-                message_id=message_data['message_id'],
-                session_id=message_data['session_id'],
-                content=message_data['content'],
-                timestamp=message_data['timestamp'],
-                sender=message_data['sender'],
-                word_count=message_data['word_count'],
-                character_count=message_data['character_count'],
-                processed_at=message_data['processed_at']
+        # Rechazar duplicados conocidos antes de abrir una transacción;
+        # el índice único sigue siendo la autoridad final.
+        if self._is_known_duplicate(message_data['message_id']):
+            raise _duplicate_error(message_data['message_id'])
+        
+        if current_app.config.get('GROUP_COMMIT_ENABLED'):
+            return group_commit_writer.submit(
+                self,
+                message_data,
+                current_app.config['GROUP_COMMIT_WINDOW_MS'] / 1000,
+                current_app.config['GROUP_COMMIT_MAX_BATCH']
             )
+        
+        try:
+            message = Message(**self._to_row(message_data))
             
             db.session.add(message)
+            db.session.flush()
+            self._apply_session_stats([message])
             db.session.commit()
+            self._remember_message_ids([message.message_id])
             
             return message
             
         except IntegrityError:
             db.session.rollback()
-            raise ValidationError(
-                'DUPLICATE_MESSAGE_ID',
-                f'Ya existe un mensaje con el ID "{message_data["message_id"]}"',
-                {'field': 'message_id'}
+            self._remember_message_ids([message_data['message_id']])
+            raise _duplicate_error(message_data['message_id'])
+    
+    def save_messages_bulk(self, messages_data):
+        """
+        Guarda varios mensajes en una única transacción con un INSERT masivo.
+        
+        Los message_id duplicados (contra la base de datos o dentro del propio
+        lote) se reportan por elemento sin revertir el resto del lote.
+        
+        Args:
+            messages_data: Lista de diccionarios con los datos de cada mensaje
+            
+        Returns:
+            Lista alineada con la entrada; cada elemento es un objeto Message
+            guardado o un ValidationError con el motivo del rechazo
+        """
+        results = [None] * len(messages_data)
+        existing = self._find_existing_message_ids(
+            [data['message_id'] for data in messages_data]
+        )
+        
+        pending = []
+        seen = set()
+        for index, data in enumerate(messages_data):
+            message_id = data['message_id']
+            if message_id in existing or message_id in seen:
+                results[index] = _duplicate_error(message_id)
+                continue
+            seen.add(message_id)
+            pending.append((index, self._to_row(data)))
+        
+        if not pending:
+            return results
+        
+        rows = [row for _, row in pending]
+        try:
+            inserted_ids = self._insert_rows(rows)
+            saved = [Message(id=row_id, **row) for row, row_id in zip(rows, inserted_ids)]
+            self._apply_session_stats(saved)
+            db.session.commit()
+        except IntegrityError:
+            # Otro escritor insertó alguno de los IDs entre la verificación
+            # y el INSERT: se reintenta fila a fila con savepoints.
+            db.session.rollback()
+            inserted_ids = self._insert_rows_individually(rows)
+            saved = [
+                Message(id=row_id, **row) if row_id is not None else None
+                for row, row_id in zip(rows, inserted_ids)
+            ]
+            self._apply_session_stats([message for message in saved if message is not None])
+            db.session.commit()
+        
+        self._remember_message_ids([row['message_id'] for row in rows])
+        
+        for (index, row), message in zip(pending, saved):
+            results[index] = message if message is not None else _duplicate_error(row['message_id'])
+        
+        return results
+    
+    def get_session_stats(self, session_id):
+        """
+        Obtiene los contadores mantenidos de una sesión.
+        
+        Args:
+            session_id: Identificador de sesión
+            
+        Returns:
+            Objeto SessionStats, o None si la sesión no tiene mensajes
+        """
+        return db.session.get(SessionStats, session_id)
+    
+    def get_sessions_stats(self, session_ids):
+        """
+        Obtiene los contadores de varias sesiones en una sola consulta.
+        
+        Args:
+            session_ids: Identificadores de sesión
+        
+        Returns:
+            Diccionario session_id -> SessionStats; las sesiones sin mensajes no aparecen
+        """
+        stats = {}
+        session_ids = list(session_ids)
+        for start in range(0, len(session_ids), _IN_CHUNK_SIZE):
+            chunk = session_ids[start:start + _IN_CHUNK_SIZE]
+            for row in db.session.scalars(select(SessionStats).where(SessionStats.session_id.in_(chunk))):
+                stats[row.session_id] = row
+        return stats
+    
+    def rebuild_session_stats(self):
+        """
+        Recalcula todos los contadores de sesión a partir de la tabla messages.
+        
+        Returns:
+            Número de sesiones reconstruidas
+        """
+        aggregated = select(
+            Message.session_id,
+            func.count().label('total_count'),
+            func.sum(case((Message.sender == 'user', 1), else_=0)).label('user_count'),
+            func.sum(case((Message.sender == 'system', 1), else_=0)).label('system_count'),
+            func.max(Message.id).label('last_id')
+        ).group_by(Message.session_id).subquery()
+        
+        latest = select(
+            aggregated.c.session_id,
+            aggregated.c.total_count,
+            aggregated.c.user_count,
+            aggregated.c.system_count,
+            aggregated.c.last_id,
+            Message.timestamp
+        ).join(Message, Message.id == aggregated.c.last_id)
+        
+        db.session.execute(delete(SessionStats))
+        db.session.execute(insert(SessionStats).from_select(
+            ['session_id', 'total_count', 'user_count', 'system_count', 'last_id', 'last_timestamp'],
+            latest
+        ))
+        db.session.commit()
+        
+        return db.session.query(SessionStats).count()
+    
+    def _apply_session_stats(self, messages):
+        """
+        Incrementa los contadores de sesión dentro de la transacción actual.
+        
+        Args:
+            messages: Objetos Message recién insertados (con id asignado)
+        """
+        deltas = {}
+        for message in messages:
+            delta = deltas.setdefault(message.session_id, {
+                'total_count': 0, 'user_count': 0, 'system_count': 0,
+                'last_id': None, 'last_timestamp': None
+            })
+            delta['total_count'] += 1
+            delta[f'{message.sender}_count'] += 1
+            if delta['last_id'] is None or message.id > delta['last_id']:
+                delta['last_id'] = message.id
+                delta['last_timestamp'] = message.timestamp
+        
+        for session_id, delta in deltas.items():
+            if self._increment_session_stats(session_id, delta):
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(SessionStats).values(session_id=session_id, **delta))
+            except IntegrityError:
+                # Otro escritor creó la fila entre el UPDATE y el INSERT
+                self._increment_session_stats(session_id, delta)
+    
+    @staticmethod
+    def _increment_session_stats(session_id, delta):
+        """Aplica un UPDATE atómico de los contadores; retorna False si la fila no existe."""
+        is_newer = SessionStats.last_id.is_(None) | (SessionStats.last_id < delta['last_id'])
+        result = db.session.execute(
+            update(SessionStats)
+            .where(SessionStats.session_id == session_id)
+            .values(
+                total_count=SessionStats.total_count + delta['total_count'],
+                user_count=SessionStats.user_count + delta['user_count'],
+                system_count=SessionStats.system_count + delta['system_count'],
+                last_id=case((is_newer, delta['last_id']), else_=SessionStats.last_id),
+                last_timestamp=case((is_newer, delta['last_timestamp']), else_=SessionStats.last_timestamp)
             )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+    
+    def load_known_message_ids(self):
+        """
+        Reconstruye el filtro Bloom de message_ids a partir de la base de datos.
+        
+        Se ejecuta al iniciar la aplicación. El filtro se dimensiona para al
+        menos el doble de los mensajes existentes.
+        """
+        global _known_message_ids
+        
+        if not current_app.config['DUPLICATE_FILTER_ENABLED']:
+            _known_message_ids = None
+            return
+        
+        existing_count = db.session.query(Message.id).count()
+        known_ids = BloomFilter(
+            max(current_app.config['DUPLICATE_FILTER_CAPACITY'], existing_count * 2),
+            current_app.config['DUPLICATE_FILTER_ERROR_RATE']
+        )
+        
+        rows = db.session.execute(
+            select(Message.message_id).execution_options(yield_per=10000)
+        ).scalars()
+        for message_id in rows:
+            known_ids.add(message_id)
+        
+        _known_message_ids = known_ids
+    
+    def _is_known_duplicate(self, message_id):
+        """Consulta la base de datos solo si el filtro Bloom reconoce el ID."""
+        if _known_message_ids is None or message_id not in _known_message_ids:
+            return False
+        return self.message_exists(message_id)
     
-    def get_messages_by_session(self, session_id, limit=10, offset=0, sender=None):
+    @staticmethod
+    def _remember_message_ids(message_ids):
+        """Agrega al filtro Bloom los IDs que ya existen en la base de datos."""
+        if _known_message_ids is not None:
+            for message_id in message_ids:
+                _known_message_ids.add(message_id)
+    
+    def _find_existing_message_ids(self, message_ids):
+        """Retorna el subconjunto de message_ids que ya existen en la base de datos."""
+        existing = set()
+        unique_ids = list(dict.fromkeys(message_ids))
+        
+        # Los IDs que el filtro Bloom no reconoce son nuevos con certeza
+        if _known_message_ids is not None:
+            unique_ids = [message_id for message_id in unique_ids if message_id in _known_message_ids]
+        
+        for start in range(0, len(unique_ids), _IN_CHUNK_SIZE):
+            chunk = unique_ids[start:start + _IN_CHUNK_SIZE]
+            existing.update(db.session.execute(
+                select(Message.message_id).where(Message.message_id.in_(chunk))
+            ).scalars())
+        
+        return existing
+    
+    def _insert_rows(self, rows):
+        """Ejecuta un INSERT masivo y retorna los IDs generados en orden."""
+        result = db.session.execute(
+            insert(Message).returning(Message.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+    
+    def _insert_rows_individually(self, rows):
+        """Inserta fila a fila con savepoints; None marca un duplicado."""
+        inserted_ids = []
+        
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    row_id = db.session.execute(
+                        insert(Message).returning(Message.id), row
+                    ).scalar_one()
+                inserted_ids.append(row_id)
+            except IntegrityError:
+                inserted_ids.append(None)
+        
+        return inserted_ids
+    
+    @staticmethod
+    def _to_row(message_data):
+        """Extrae las columnas persistibles de un diccionario de mensaje."""
+        return {
+            'message_id': message_data['message_id'],
+            'session_id': message_data['session_id'],
+            'content': message_data['content'],
+            'timestamp': message_data['timestamp'],
+            'timestamp_epoch_ms': message_data['timestamp_epoch_ms'],
+            'sender': message_data['sender'],
+            'word_count': message_data['word_count'],
+            'character_count': message_data['character_count'],
+            'processed_at': message_data['processed_at']
+        }
+    
+    def message_exists(self, message_id):
+        """
+        Indica si ya existe un mensaje con el message_id dado.
+        
+        Args:
+            message_id: Identificador del mensaje
+            
+        Returns:
+            True si el mensaje existe
+        """
+        return db.session.execute(
+            select(exists().where(Message.message_id == message_id))
+        ).scalar()
+    
+    def get_messages_by_session(self, session_id, limit=10, offset=0, sender=None, fields=None):
         """
         Recupera mensajes de una sesión con paginación y filtrado.
         
@@ -58,25 +385,245 @@ class MessageRepository:
             limit: Número máximo de mensajes a retornar
             offset: Número de mensajes a omitir
             sender: Filtro opcional por remitente ('user' o 'system')
+            fields: Campos a leer (ver MESSAGE_FIELDS), o None para todos
             
         Returns:
-            Lista de objetos Message
+            Lista de mensajes (MessageRecord o Message según REPOSITORY_READ_MODE)
         """
-        query = Message.query.filter_by(session_id=session_id)
+        stmt = self._read_select(fields).where(Message.session_id == session_id)
         
         # Aplicar filtro de sender si se proporciona
         if sender:
-            query = query.filter_by(sender=sender)
+            stmt = stmt.where(Message.sender == sender)
         
         # Aplicar paginación
-        messages = query.order_by(Message.id.asc()).limit(limit).offset(offset).all()
+        stmt = stmt.order_by(Message.id.asc()).limit(limit).offset(offset)
+        
+        return self._load(db.session.execute(stmt), fields)
+    
+    def iter_messages_by_session(self, session_id, sender=None, batch_size=1000, fields=None):
+        """
+        Recorre todos los mensajes de una sesión en bloques, en orden de inserción.
+        
+        La consulta se lee con yield_per: el cursor de la base de datos entrega
+        batch_size filas a la vez, de modo que la memoria no crece con el
+        tamaño de la sesión.
+        
+        Args:
+            session_id: Identificador de sesión
+            sender: Filtro opcional por remitente
+            batch_size: Filas por bloque
+            fields: Campos a leer (ver MESSAGE_FIELDS), o None para todos
+            
+        Yields:
+            Listas de mensajes de hasta batch_size elementos
+        """
+        stmt = self._read_select(fields).where(Message.session_id == session_id)
+        if sender:
+            stmt = stmt.where(Message.sender == sender)
+        stmt = stmt.order_by(Message.id.asc()).execution_options(yield_per=batch_size)
+        
+        for partition in db.session.execute(stmt).partitions():
+            yield self._load(partition, fields)
+    
+    def get_messages_by_session_keyset(self, session_id, limit=10, after_id=None, before_id=None, sender=None,
+                                       fields=None):
+        """
+        Recupera una página de mensajes usando paginación keyset sobre Message.id.
+        
+        A diferencia de LIMIT/OFFSET, el costo no crece con la profundidad de la
+        página: la consulta salta directamente al cursor usando el índice
+        (session_id, id).
+        
+        Args:
+            session_id: Identificador de sesión
+            limit: Número máximo de mensajes a retornar
+            after_id: Retornar mensajes con id mayor a este valor
+            before_id: Retornar los mensajes inmediatamente anteriores a este id
+            sender: Filtro opcional por remitente
+            fields: Campos a leer (ver MESSAGE_FIELDS), o None para todos
+            
+        Returns:
+            Tupla (lista de mensajes en orden ascendente, hay más en esa dirección)
+        """
+        stmt = self._read_select(fields).where(Message.session_id == session_id)
+        
+        if sender:
+            stmt = stmt.where(Message.sender == sender)
+        
+        if before_id is not None:
+            stmt = stmt.where(Message.id < before_id).order_by(Message.id.desc()).limit(limit + 1)
+            messages = self._load(db.session.execute(stmt), fields)
+            has_more = len(messages) > limit
+            return messages[:limit][::-1], has_more
+        
+        if after_id is not None:
+            stmt = stmt.where(Message.id > after_id)
+        
+        messages = self._load(db.session.execute(stmt.order_by(Message.id.asc()).limit(limit + 1)), fields)
+        return messages[:limit], len(messages) > limit
+    
+    def get_latest_messages(self, session_id, limit, after_id=None):
+        """
+        Recupera los últimos mensajes de una sesión, opcionalmente solo los
+        posteriores a un id.
+        
+        Args:
+            session_id: Identificador de sesión
+            limit: Número máximo de mensajes a retornar
+            after_id: Retornar solo mensajes con id mayor a este valor
+            
+        Returns:
+            Tupla (lista de mensajes en orden ascendente, hay más anteriores sin retornar)
+        """
+        stmt = self._read_select().where(Message.session_id == session_id)
+        if after_id is not None:
+            stmt = stmt.where(Message.id > after_id)
+        
+        messages = self._load(db.session.execute(stmt.order_by(Message.id.desc()).limit(limit + 1)))
+        return messages[:limit][::-1], len(messages) > limit
+    
+    def get_message_row_id(self, session_id, message_id):
+        """
+        Obtiene el id interno de un mensaje de una sesión.
+        
+        Args:
+            session_id: Identificador de sesión
+            message_id: Identificador público del mensaje
+            
+        Returns:
+            Id interno, o None si el mensaje no existe en la sesión
+        """
+        return db.session.execute(
+            select(Message.id).where(Message.message_id == message_id, Message.session_id == session_id)
+        ).scalar()
+    
+    def get_messages_by_sessions(self, pages, sender=None, fields=None):
+        """
+        Recupera una página keyset de cada una de varias sesiones en una sola consulta.
+        
+        Cada página es un SELECT de ids con su propio LIMIT que recorre el
+        índice (session_id, id) desde el cursor; las filas completas de todas
+        las páginas se leen con una única consulta (id IN (...) OR ...). El costo
+        depende del tamaño de las páginas, no del de las sesiones.
+        
+        Args:
+            pages: Lista de tuplas (session_id, limit, after_id, before_id). Con
+                after_id se leen los mensajes siguientes; con before_id, o sin
+                ninguno de los dos, los inmediatamente anteriores (los más
+                recientes de la sesión)
+            sender: Filtro opcional por remitente
+            fields: Campos a leer (ver MESSAGE_FIELDS), o None para todos
+        
+        Returns:
+            Lista alineada con pages de tuplas (mensajes en orden ascendente,
+            hay más en esa dirección)
+        """
+        if not pages:
+            return []
         
-        return messages
+        page_ids = []
+        for session_id, limit, after_id, before_id in pages:
+            ids = select(Message.id).where(Message.session_id == session_id)
+            if sender:
+                ids = ids.where(Message.sender == sender)
+            if after_id is not None:
+                ids = ids.where(Message.id > after_id).order_by(Message.id.asc())
+            else:
+                if before_id is not None:
+                    ids = ids.where(Message.id < before_id)
+                ids = ids.order_by(Message.id.desc())
+            page_ids.append(Message.id.in_(ids.limit(limit + 1)))
+        
+        # session_id se lee siempre, aunque no esté entre los campos pedidos,
+        # para repartir las filas entre las páginas
+        stmt = (
+            self._read_select(fields)
+            .add_columns(Message.session_id.label('page_session_id'))
+            .where(or_(*page_ids))
+            .order_by(Message.id.asc())
+        )
+        
+        rows = db.session.execute(stmt).all()
+        messages = self._load(rows, fields, extra_columns=1)
+        
+        by_session = {session_id: [] for session_id, _, _, _ in pages}
+        for row, message in zip(rows, messages):
+            by_session[row[-1]].append(message)
+        
+        results = []
+        for session_id, limit, after_id, _ in pages:
+            page_messages = by_session[session_id]
+            has_more = len(page_messages) > limit
+            if after_id is not None:
+                page_messages = page_messages[:limit]
+            else:
+                # Se leyeron hacia atrás: el mensaje adicional es el más antiguo
+                page_messages = page_messages[-limit:] if has_more else page_messages
+            results.append((page_messages, has_more))
+        return results
+    
+    @staticmethod
+    def release_connection():
+        """
+        Cierra la sesión actual y devuelve su conexión al pool.
+        
+        Se usa antes de esperas largas dentro de una solicitud para no retener
+        una conexión ociosa; la siguiente consulta abre una sesión nueva.
+        """
+        db.session.remove()
+    
+    @staticmethod
+    def _core_reads():
+        """Indica si las lecturas usan SQLAlchemy Core en lugar del ORM."""
+        return current_app.config['REPOSITORY_READ_MODE'] == 'core'
+    
+    def _read_columns(self, fields=None):
+        """Columnas de lectura: las de los campos pedidos en modo core o la entidad Message."""
+        return columns_for_fields(fields) if self._core_reads() else (Message,)
+    
+    def _read_select(self, fields=None):
+        """
+        SELECT base de las lecturas de mensajes.
+        
+        Con un subconjunto de campos solo se proyectan sus columnas; en modo
+        ORM se usa load_only para no cargar el resto.
+        """
+        stmt = select(*self._read_columns(fields))
+        if fields is not None and not self._core_reads():
+            stmt = stmt.options(load_only(*columns_for_fields(fields)))
+        return stmt
+    
+    def _load(self, rows, fields=None, extra_columns=0):
+        """
+        Convierte filas de un SELECT de lectura en mensajes.
+        
+        Args:
+            rows: Filas cuyo inicio son las columnas de _read_columns(fields)
+            fields: Campos leídos, o None para todos
+            extra_columns: Columnas adicionales al final de cada fila, que se descartan
+            
+        Returns:
+            Lista de MessageRecord (modo core) o Message (modo ORM)
+        """
+        if not self._core_reads():
+            return [row[0] for row in rows]
+        
+        if fields is not None:
+            # zip se detiene en las columnas del registro y descarta las adicionales
+            names = [column.key for column in columns_for_fields(fields)]
+            return [MessageRecord(**dict(zip(names, row))) for row in rows]
+        
+        if extra_columns:
+            return [MessageRecord(*row[:-extra_columns]) for row in rows]
+        return [MessageRecord(*row) for row in rows]
     
     def get_message_count_by_session(self, session_id, sender=None):
         """
         Obtiene el conteo total de mensajes para una sesión.
         
+        Se resuelve con una búsqueda por clave primaria en session_stats.
+        
         Args:
             session_id: Identificador de sesión
             sender: Filtro opcional por remitente
@@ -84,43 +631,112 @@ class MessageRepository:
         Returns:
             Conteo total de mensajes
         """
-        query = Message.query.filter_by(session_id=session_id)
+        sender = sender or None
+        if sender not in (None, 'user', 'system'):
+            return Message.query.filter_by(session_id=session_id, sender=sender).count()
         
-        if sender:
-            query = query.filter_by(sender=sender)
+        stats = self.get_session_stats(session_id)
+        return stats.count_for(sender) if stats else 0
+    
+    def detect_full_text_search(self):
+        """
+        Activa la búsqueda FTS5 si está habilitada y existe la tabla messages_fts.
         
-        return query.count()
+        Se ejecuta al iniciar la aplicación, después de las migraciones.
+        """
+        global _full_text_search
+        
+        _full_text_search = (
+            current_app.config['SEARCH_FULL_TEXT_ENABLED']
+            and inspect(db.engine).has_table('messages_fts')
+        )
     
-    def search_messages(self, session_id, filters, limit=10, offset=0):
+    def search_messages_page(self, session_id, filters, limit=10, offset=0, sort=None, highlight=False,
+                             count='exact', estimate_cap=1000, fields=None):
         """
-        Busca mensajes con múltiples filtros.
+        Busca mensajes y calcula el total en una sola consulta.
+        
+        Con FTS5 disponible el texto se busca por términos (con prefijo) y los
+        resultados pueden ordenarse por relevancia BM25; sin FTS5 se usa LIKE.
+        El total viaja en cada fila: COUNT(*) OVER () en modo 'exact' o un
+        conteo acotado a estimate_cap filas en modo 'estimate'. Con highlight,
+        los fragmentos se piden aparte y solo para las filas de la página.
         
         Args:
             session_id: Identificador de sesión
-            filters: Diccionario con filtros (query, start_date, end_date, sender)
+            filters: Diccionario con filtros (query, start_ms, end_ms, sender)
             limit: Número máximo de resultados
             offset: Número de resultados a omitir
+            sort: 'relevance' o 'chronological'; por defecto relevancia si hay texto
+            highlight: Si es True, retorna también un fragmento resaltado
+            count: 'exact', 'estimate' o 'none'
+            estimate_cap: Máximo de filas que cuenta el modo 'estimate'
+            fields: Campos a leer (ver MESSAGE_FIELDS), o None para todos
             
         Returns:
-            Lista de objetos Message
+            Tupla (lista de tuplas (mensaje, fragmento o None), total o None, hay más resultados)
         """
-        query = Message.query.filter_by(session_id=session_id)
+        match = self._full_text_match(filters.get('query'))
         
-        if filters.get('query'):
-            query = query.filter(Message.content.like(f"%{filters['query']}%"))
+        # SQLite no admite bm25() junto a funciones de ventana: la relevancia
+        # se calcula en una subconsulta sobre messages_fts
+        hits = None
+        if match is not None:
+            hits = (
+                select(_messages_fts.c.rowid, func.bm25(literal_column('messages_fts')).label('rank'))
+                .where(literal_column('messages_fts').op('MATCH')(match))
+                .subquery('hits')
+            )
+        by_relevance = hits is not None and (sort or 'relevance') == 'relevance'
         
-        if filters.get('start_date'):
-            query = query.filter(Message.timestamp >= filters['start_date'])
+        # La página se resuelve sobre ids (y el total viaja en cada fila);
+        # solo las filas de la página se unen después con messages
+        columns = [Message.id.label('id')]
+        if by_relevance:
+            columns.append(hits.c.rank.label('rank'))
+        if count == 'exact':
+            columns.append(func.count().over().label('total'))
+        elif count == 'estimate':
+            columns.append(self._bounded_count(session_id, filters, match, estimate_cap).scalar_subquery().label('total'))
         
-        if filters.get('end_date'):
-            query = query.filter(Message.timestamp <= filters['end_date'])
+        page = self._search_query(db.session.query(*columns), session_id, filters, match, hits)
+        if by_relevance:
+            page = page.order_by(hits.c.rank, Message.id.asc())
+        else:
+            page = page.order_by(Message.id.asc())
+        page = page.limit(limit + 1).offset(offset).subquery('page')
         
-        if filters.get('sender'):
-            query = query.filter_by(sender=filters['sender'])
+        total_columns = [page.c.total] if count != 'none' else []
+        stmt = self._read_select(fields).add_columns(*total_columns).join(page, page.c.id == Message.id)
+        if by_relevance:
+            stmt = stmt.order_by(page.c.rank, Message.id.asc())
+        else:
+            stmt = stmt.order_by(Message.id.asc())
+        
+        rows = db.session.execute(stmt).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        messages = query.order_by(Message.id.asc()).limit(limit).offset(offset).all()
+        total = None
+        if count != 'none':
+            if rows:
+                total = rows[0][-1]
+            elif offset == 0:
+                total = 0
+            elif count == 'exact':
+                # Página vacía más allá del final: no hay fila que traiga el total
+                total = self.count_search_results(session_id, filters)
+            else:
+                total = db.session.execute(self._bounded_count(session_id, filters, match, estimate_cap)).scalar()
         
-        return messages
+        messages = self._load(rows, fields, extra_columns=len(total_columns))
+        snippets = {}
+        if highlight and match is not None and messages:
+            snippets = self._snippets(match, [message.id for message in messages])
+        
+        results = [(message, snippets.get(message.id)) for message in messages]
+        
+        return results, total, has_more
     
     def count_search_results(self, session_id, filters):
         """
@@ -133,18 +749,80 @@ class MessageRepository:
         Returns:
             Conteo total de resultados
         """
-        query = Message.query.filter_by(session_id=session_id)
+        match = self._full_text_match(filters.get('query'))
+        query = self._search_query(db.session.query(func.count(Message.id)), session_id, filters, match)
+        return query.scalar()
+    
+    @staticmethod
+    def _snippets(match, message_ids):
+        """Obtiene los fragmentos resaltados, con el contenido escapado como HTML, solo para los mensajes de la página."""
+        rows = db.session.execute(
+            select(_messages_fts.c.rowid, func.snippet(
+                literal_column('messages_fts'), 0,
+                _SNIPPET_START, _SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS
+            ))
+            .where(literal_column('messages_fts').op('MATCH')(match), _messages_fts.c.rowid.in_(message_ids))
+        ).all()
+        return {
+            rowid: html.escape(snippet).replace(_SNIPPET_START, HIGHLIGHT_START).replace(_SNIPPET_END, HIGHLIGHT_END)
+            for rowid, snippet in rows
+        }
+    
+    def _bounded_count(self, session_id, filters, match, cap):
+        """Construye un SELECT COUNT(*) que deja de contar al llegar a cap filas."""
+        matching = self._search_query(db.session.query(Message.id), session_id, filters, match).limit(cap)
+        return select(func.count()).select_from(matching.subquery())
+    
+    @staticmethod
+    def _full_text_match(text_query):
+        """
+        Traduce el texto buscado a una expresión MATCH de FTS5.
+        
+        Cada palabra se cita (para neutralizar la sintaxis de FTS5) y se
+        busca como prefijo; todas deben aparecer en el mensaje.
+        
+        Returns:
+            Expresión MATCH, o None si debe usarse LIKE
+        """
+        if not text_query or not _full_text_search:
+            return None
+        
+        terms = _FTS_TERM_PATTERN.findall(text_query)
+        if not terms:
+            return None
+        
+        return ' '.join(f'"{term}"*' for term in terms)
+    
+    @staticmethod
+    def _search_query(query, session_id, filters, match, hits=None):
+        """
+        Aplica los filtros de búsqueda a una consulta sobre messages.
         
-        if filters.get('query'):
-            query = query.filter(Message.content.like(f"%{filters['query']}%"))
+        Con FTS5 se une a hits (subconsulta de coincidencias ya filtrada por
+        MATCH) o, si no se indica, directamente a messages_fts.
+        """
+        if match is not None:
+            if hits is not None:
+                query = query.join(hits, hits.c.rowid == Message.id)
+            else:
+                query = query.join(_messages_fts, _messages_fts.c.rowid == Message.id)
+                query = query.filter(literal_column('messages_fts').op('MATCH')(match))
+            # "session_id || ''" evita que SQLite recorra la sesión por su índice
+            # evaluando MATCH fila por fila; así parte de las coincidencias de
+            # messages_fts y filtra la sesión por clave primaria.
+            query = query.filter(Message.session_id.concat('') == session_id)
+        else:
+            query = query.filter(Message.session_id == session_id)
+            if filters.get('query'):
+                query = query.filter(Message.content.like(f"%{filters['query']}%"))
         
-        if filters.get('start_date'):
-            query = query.filter(Message.timestamp >= filters['start_date'])
+        if filters.get('start_ms') is not None:
+            query = query.filter(Message.timestamp_epoch_ms >= filters['start_ms'])
         
-        if filters.get('end_date'):
-            query = query.filter(Message.timestamp <= filters['end_date'])
+        if filters.get('end_ms') is not None:
+            query = query.filter(Message.timestamp_epoch_ms <= filters['end_ms'])
         
         if filters.get('sender'):
-            query = query.filter_by(sender=filters['sender'])
+            query = query.filter(Message.sender == filters['sender'])
         
-        return query.count()
+        return query
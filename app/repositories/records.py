@@ -0,0 +1,136 @@
+"""
+Registros de solo lectura para el camino de lectura con SQLAlchemy Core.
+Evitan construir instancias ORM (identity map, estado de sesión) cuando
+los mensajes solo se leen para serializarlos.
+"""
+from app.models import Message
+
+
+class MessageRecord:
+    """
+    Mensaje de solo lectura construido a partir de una fila de Core.
+    
+    Expone los mismos atributos que Message y su to_dict() produce
+    exactamente la misma estructura. Con un subconjunto de campos, los
+    atributos no seleccionados quedan en None.
+    """
+    
+    __slots__ = (
+        'id', 'message_id', 'session_id', 'content', 'timestamp', 'sender',
+        'word_count', 'character_count', 'processed_at'
+    )
+    
+    def __init__(self, id=None, message_id=None, session_id=None, content=None, timestamp=None, sender=None,
+                 word_count=None, character_count=None, processed_at=None):
+        self.id = id
+        self.message_id = message_id
+        self.session_id = session_id
+        self.content = content
+        self.timestamp = timestamp
+        self.sender = sender
+        self.word_count = word_count
+        self.character_count = character_count
+        self.processed_at = processed_at
+    
+    def to_dict(self):
+        """
+        Convierte el registro a diccionario para serialización JSON.
+        
+        Returns:
+            Representación del mensaje como diccionario
+        """
+        return {
+            'message_id': self.message_id,
+            'session_id': self.session_id,
+            'content': self.content,
+            'timestamp': self.timestamp,
+            'sender': self.sender,
+            'metadata': {
+                'word_count': self.word_count,
+                'character_count': self.character_count,
+                'processed_at': self.processed_at
+            }
+        }
+    
+    def __repr__(self):
+        return f'<MessageRecord {self.message_id}>'
+
+
+# Columnas seleccionadas para construir un MessageRecord, en el orden de __init__
+MESSAGE_RECORD_COLUMNS = (
+    Message.id,
+    Message.message_id,
+    Message.session_id,
+    Message.content,
+    Message.timestamp,
+    Message.sender,
+    Message.word_count,
+    Message.character_count,
+    Message.processed_at,
+)
+
+
+# Campos públicos de un mensaje (claves de to_dict) y las columnas que requiere cada uno
+FIELD_COLUMNS = {
+    'message_id': (Message.message_id,),
+    'session_id': (Message.session_id,),
+    'content': (Message.content,),
+    'timestamp': (Message.timestamp,),
+    'sender': (Message.sender,),
+    'metadata': (Message.word_count, Message.character_count, Message.processed_at),
+}
+
+MESSAGE_FIELDS = tuple(FIELD_COLUMNS)
+
+
+def columns_for_fields(fields):
+    """
+    Columnas necesarias para un subconjunto de campos.
+    
+    Message.id se incluye siempre porque lo usan el orden, los cursores y
+    los fragmentos de búsqueda.
+    
+    Args:
+        fields: Tupla de campos de MESSAGE_FIELDS, o None para todos
+        
+    Returns:
+        Tupla de columnas de Message
+    """
+    if fields is None:
+        return MESSAGE_RECORD_COLUMNS
+    columns = [Message.id]
+    for field in fields:
+        columns.extend(FIELD_COLUMNS[field])
+    return tuple(columns)
+
+
+def message_to_dict(message, fields=None):
+    """
+    Serializa un Message o MessageRecord con solo los campos indicados.
+    
+    Solo accede a los atributos de los campos pedidos, de modo que no
+    dispara cargas de columnas que no se seleccionaron.
+    
+    Args:
+        message: Message o MessageRecord
+        fields: Tupla de campos de MESSAGE_FIELDS, o None para todos
+        
+    Returns:
+        Diccionario con las claves de to_dict() en su orden habitual
+    """
+    if fields is None:
+        return message.to_dict()
+    
+    result = {}
+    for field in MESSAGE_FIELDS:
+        if field not in fields:
+            continue
+        if field == 'metadata':
+            result['metadata'] = {
+                'word_count': message.word_count,
+                'character_count': message.character_count,
+                'processed_at': message.processed_at
+            }
+        else:
+            result[field] = getattr(message, field)
+    return result
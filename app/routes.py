@@ -2,10 +2,19 @@
 Rutas de la API de Chat.
 Define todos los endpoints de la API.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
 from app.services.message_service import MessageService
-from app.services.api_key_service import create_api_key, list_api_keys, revoke_api_key
+from app.services.broadcast_dispatcher import broadcast_dispatcher
+from app.services.ingestion_service import ingestion_service
+from app.services.validation_service import ValidationService
+from app.services.api_key_service import create_api_key, list_api_keys, revoke_api_key, update_api_key_rate_limit
 from app.utils.api_key_middleware import optional_api_key
+from app.utils.cache import session_page_cache
+from app.utils.http_cache import session_etag, is_not_modified, not_modified_response, apply_cache_headers
+from app.utils.ndjson import iter_lines, dumps_line
+from app.utils.replay_buffer import replay_buffer
+from app.utils.streaming import accepts_gzip, gzip_chunks
+from app.utils.validators import ValidationError
 from app import limiter
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -16,8 +25,26 @@ message_service = MessageService()
 @limiter.limit("20 per minute")
 @optional_api_key
 def create_message():
-
+    """
+    Crea un nuevo mensaje.
+    
+    Con ASYNC_INGESTION_ENABLED el mensaje solo se valida y se encola;
+    la respuesta es 202 y el estado se consulta en /api/ingestion/<message_id>.
+    """
     data = request.get_json()
+    
+    if current_app.config['ASYNC_INGESTION_ENABLED']:
+        ingestion_service.enqueue(data)
+        response = {
+            'status': 'accepted',
+            'data': {
+                'message_id': data['message_id'],
+                'ingestion_status': ingestion_service.STATUS_QUEUED
+            }
+        }
+        location = url_for('api.get_message_status', message_id=data['message_id'])
+        return jsonify(response), 202, {'Location': location}
+    
     result = message_service.process_and_save_message(data)
     
     response = {
@@ -28,6 +55,111 @@ def create_message():
     return jsonify(response), 201
 
 
+@api_bp.route('/messages/batch', methods=['POST'])
+@limiter.limit("20 per minute")
+@optional_api_key
+def create_messages_batch():
+    """
+    Crea varios mensajes en una sola solicitud.
+    
+    Body:
+        - Lista JSON de mensajes con el mismo formato que POST /api/messages
+    
+    Retorna 201 si todos los mensajes se guardaron y 207 si alguno falló.
+    """
+    items = request.get_json()
+    
+    if not isinstance(items, list):
+        raise ValidationError('INVALID_FORMAT', 'El cuerpo de la solicitud debe ser una lista JSON de mensajes')
+    
+    if not items:
+        raise ValidationError('EMPTY_BATCH', 'El lote debe contener al menos un mensaje')
+    
+    max_size = current_app.config['BATCH_MAX_SIZE']
+    if len(items) > max_size:
+        raise ValidationError(
+            'BATCH_TOO_LARGE',
+            f'El lote no puede contener más de {max_size} mensajes',
+            {'max_size': max_size, 'received': len(items)}
+        )
+    
+    results = message_service.process_and_save_batch(items)
+    saved = sum(1 for result in results if result['status'] == 'success')
+    
+    response = {
+        'status': 'success' if saved == len(results) else 'partial',
+        'data': results,
+        'summary': {
+            'received': len(results),
+            'saved': saved,
+            'failed': len(results) - saved
+        }
+    }
+    
+    return jsonify(response), 201 if saved == len(results) else 207
+
+
+@api_bp.route('/messages/import', methods=['POST'])
+@limiter.limit("5 per minute")
+@optional_api_key
+def import_messages():
+    """
+    Importa mensajes desde un cuerpo application/x-ndjson (un mensaje por línea).
+    
+    El cuerpo se lee línea a línea y los mensajes se guardan en bloques de
+    IMPORT_CHUNK_SIZE. La respuesta es un flujo NDJSON con eventos de error,
+    de progreso y un resumen final.
+    """
+    if request.mimetype != 'application/x-ndjson':
+        raise ValidationError(
+            'INVALID_CONTENT_TYPE',
+            'El cuerpo debe enviarse como application/x-ndjson',
+            {'expected_content_type': 'application/x-ndjson'}
+        )
+    
+    lines = iter_lines(request.stream, current_app.config['IMPORT_MAX_LINE_BYTES'])
+    events = message_service.import_messages(lines, current_app.config['IMPORT_CHUNK_SIZE'])
+    
+    def generate():
+        for event in events:
+            yield dumps_line(event)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@api_bp.route('/ingestion/<message_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+@optional_api_key
+def get_message_status(message_id):
+    """
+    Consulta el estado de ingesta de un mensaje.
+    
+    Estados posibles: queued, processing, persisted, failed.
+    """
+    status = ingestion_service.get_status(message_id)
+    
+    if status is None:
+        from app.repositories.message_repository import MessageRepository
+        if not MessageRepository().message_exists(message_id):
+            return jsonify({
+                'status': 'error',
+                'error': {
+                    'code': 'NOT_FOUND',
+                    'message': 'No hay registro de un mensaje con ese ID'
+                }
+            }), 404
+        status = {'status': ingestion_service.STATUS_PERSISTED}
+    
+    data = {
+        'message_id': message_id,
+        'ingestion_status': status['status']
+    }
+    if 'error' in status:
+        data['error'] = status['error']
+    
+    return jsonify({'status': 'success', 'data': data}), 200
+
+
 @api_bp.route('/messages/<session_id>', methods=['GET'])
 @limiter.limit("60 per minute")
 @optional_api_key
@@ -39,10 +171,17 @@ def get_messages(session_id):
         - limit: Número máximo de mensajes a retornar (por defecto: 10)
         - offset: Número de mensajes a omitir (por defecto: 0)
         - sender: Filtrar por remitente ('user' o 'system', opcional)
+        - cursor: Cursor opaco (next_cursor/prev_cursor de una respuesta anterior).
+          Si se indica, se usa paginación keyset y se ignora offset.
+        - count: exact (por defecto), estimate o none para omitir el total
+        - fields: Campos a incluir, separados por comas (ej. message_id,sender,timestamp)
     """
     limit = request.args.get('limit', default=10, type=int)
     offset = request.args.get('offset', default=0, type=int)
     sender = request.args.get('sender', default=None, type=str)
+    cursor = request.args.get('cursor', default=None, type=str) or None
+    count = request.args.get('count', default='exact', type=str)
+    fields = ValidationService.parse_fields(request.args.get('fields', default=None, type=str))
     
     # Validar parámetros de paginación
     if limit < 1 or limit > 100:
@@ -52,35 +191,251 @@ def get_messages(session_id):
     
     # Validar parámetro sender si se proporciona
     if sender and sender not in ['user', 'system']:
-        from app.utils.validators import ValidationError
         raise ValidationError(
             'INVALID_SENDER',
             'El parámetro "sender" debe ser "user" o "system"',
             {'field': 'sender', 'valid_values': ['user', 'system']}
         )
     
-    messages = message_service.get_messages_by_session(
+    ValidationService.validate_count_mode(count)
+    
+    # Responder 304 antes de ejecutar la consulta paginada
+    etag = session_etag(*message_service.get_session_high_water(session_id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    cache_key = (session_id, sender, limit, cursor, None if cursor else offset, count, fields)
+    cached = session_page_cache.get(cache_key)
+    # Una página guardada con otro ETag es anterior a escrituras aún no
+    # invalidadas (en curso o de otro worker) y no se sirve
+    if cached is not None and cached[2] == etag:
+        cached_body, immutable, _ = cached
+        return apply_cache_headers(Response(cached_body, status=200, mimetype='application/json'), etag, immutable)
+    cache_generation = session_page_cache.generation(session_id)
+    
+    page = message_service.get_messages_page(
         session_id=session_id,
         limit=limit,
         offset=offset,
-        sender=sender
+        cursor=cursor,
+        sender=sender,
+        fields=fields
     )
     
-    from app.repositories.message_repository import MessageRepository
-    repository = MessageRepository()
-    total = repository.get_message_count_by_session(session_id, sender)
+    if cursor:
+        pagination = {
+            'limit': limit,
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor'],
+            'has_more': page['has_more']
+        }
+    else:
+        # El total sale de los contadores de session_stats, exactos y sin recorrer
+        # la sesión; por eso exact y estimate responden lo mismo
+        total = None
+        if count != 'none':
+            from app.repositories.message_repository import MessageRepository
+            total = MessageRepository().get_message_count_by_session(session_id, sender)
+        
+        pagination = {
+            'limit': limit,
+            'offset': offset,
+            'total': total,
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        }
     
     response = {
         'status': 'success',
-        'data': messages,
+        'data': page['data'],
+        'pagination': pagination
+    }
+    
+    http_response = jsonify(response)
+    session_page_cache.set(cache_key, (http_response.get_data(), page['immutable'], etag), cache_generation)
+    
+    return apply_cache_headers(http_response, etag, page['immutable']), 200
+
+
+@api_bp.route('/messages/sessions', methods=['POST'])
+@limiter.limit("60 per minute")
+@optional_api_key
+def get_messages_for_sessions():
+    """
+    Recupera una página de mensajes de cada una de varias sesiones.
+    
+    Todas las páginas se leen con una consulta y los totales con otra, sin
+    importar cuántas sesiones se pidan.
+    
+    Body:
+        - sessions: Lista de objetos {session_id, limit (opcional, por defecto 10),
+          cursor (opcional)}. Sin cursor se retornan los mensajes más recientes.
+        - sender: Filtrar por remitente ('user' o 'system', opcional)
+        - fields: Campos a incluir, separados por comas o como lista (opcional)
+        - count: exact (por defecto), estimate o none para omitir los totales
+    """
+    body = request.get_json()
+    
+    if not isinstance(body, dict) or not isinstance(body.get('sessions'), list):
+        raise ValidationError('INVALID_FORMAT', 'El cuerpo debe ser un objeto JSON con una lista "sessions"')
+    
+    sessions = body['sessions']
+    if not sessions:
+        raise ValidationError('EMPTY_BATCH', 'La lista "sessions" debe contener al menos una sesión')
+    
+    max_sessions = current_app.config['SESSIONS_READ_MAX_SESSIONS']
+    if len(sessions) > max_sessions:
+        raise ValidationError(
+            'BATCH_TOO_LARGE',
+            f'No se pueden leer más de {max_sessions} sesiones por solicitud',
+            {'max_size': max_sessions, 'received': len(sessions)}
+        )
+    
+    sender = body.get('sender')
+    count = body.get('count', 'exact')
+    fields = ValidationService.parse_fields(body.get('fields'))
+    
+    if sender and sender not in ['user', 'system']:
+        raise ValidationError(
+            'INVALID_SENDER',
+            'El parámetro "sender" debe ser "user" o "system"',
+            {'field': 'sender', 'valid_values': ['user', 'system']}
+        )
+    
+    ValidationService.validate_count_mode(count)
+    
+    pages = []
+    seen = set()
+    for index, entry in enumerate(sessions):
+        session_id = entry.get('session_id') if isinstance(entry, dict) else None
+        if not isinstance(session_id, str) or not session_id:
+            raise ValidationError(
+                'INVALID_FORMAT',
+                'Cada elemento de "sessions" debe ser un objeto con un "session_id" no vacío',
+                {'index': index}
+            )
+        if session_id in seen:
+            raise ValidationError(
+                'DUPLICATE_SESSION_ID',
+                f'La sesión "{session_id}" aparece más de una vez',
+                {'index': index}
+            )
+        seen.add(session_id)
+        
+        limit = entry.get('limit', 10)
+        if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1 or limit > 100:
+            limit = 10
+        
+        pages.append((session_id, limit, entry.get('cursor') or None))
+    
+    data = message_service.get_sessions_pages(pages, sender=sender, fields=fields, count=count)
+    
+    return jsonify({'status': 'success', 'data': data}), 200
+
+
+@api_bp.route('/messages/<session_id>/export', methods=['GET'])
+@limiter.limit("10 per minute")
+@optional_api_key
+def export_messages(session_id):
+    """
+    Exporta todos los mensajes de una sesión como un flujo NDJSON o CSV.
+    
+    Los mensajes se leen de la base de datos en bloques de EXPORT_BATCH_SIZE
+    y se envían a medida que se leen. Si el cliente envía
+    Accept-Encoding: gzip, el flujo se comprime.
+    
+    Parámetros de consulta:
+        - format: ndjson (por defecto) o csv
+        - sender: Filtrar por remitente ('user' o 'system', opcional)
+        - fields: Campos a exportar, separados por comas
+    """
+    from app.services.export_service import EXPORT_MIMETYPES, export_session, validate_export_format
+    
+    export_format = request.args.get('format', default='ndjson', type=str)
+    sender = request.args.get('sender', default=None, type=str)
+    fields = ValidationService.parse_fields(request.args.get('fields', default=None, type=str))
+    
+    validate_export_format(export_format)
+    
+    if sender and sender not in ['user', 'system']:
+        raise ValidationError(
+            'INVALID_SENDER',
+            'El parámetro "sender" debe ser "user" o "system"',
+            {'field': 'sender', 'valid_values': ['user', 'system']}
+        )
+    
+    chunks = export_session(session_id, export_format, sender, current_app.config['EXPORT_BATCH_SIZE'], fields)
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="{session_id}.{export_format}"',
+        'Vary': 'Accept-Encoding'
+    }
+    if accepts_gzip(request):
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[export_format], headers=headers)
+
+
+@api_bp.route('/messages/<session_id>/since/<int:last_id>', methods=['GET'])
+@limiter.limit("60 per minute")
+@optional_api_key
+def get_messages_since(session_id, last_id):
+    """
+    Long-polling: retorna los mensajes de una sesión posteriores a last_id.
+    
+    Si ya hay mensajes nuevos responde de inmediato; si no, espera hasta
+    timeout segundos a que se guarde uno sin retener una conexión a la base
+    de datos. last_id es pagination.last_id de la respuesta anterior (0 para
+    empezar desde el principio). La notificación es local al proceso: con
+    varios workers, un mensaje guardado en otro se detecta al volver a
+    consultar, cada LONG_POLL_RECHECK_SECONDS.
+    
+    Parámetros de consulta:
+        - timeout: Segundos máximos de espera (por defecto LONG_POLL_TIMEOUT_SECONDS,
+          máximo LONG_POLL_MAX_TIMEOUT_SECONDS; 0 para no esperar)
+        - limit: Número máximo de mensajes a retornar (por defecto: 50, máximo 100)
+        - sender: Filtrar por remitente ('user' o 'system', opcional)
+        - fields: Campos a incluir, separados por comas
+    """
+    timeout = request.args.get('timeout', default=current_app.config['LONG_POLL_TIMEOUT_SECONDS'], type=float)
+    limit = request.args.get('limit', default=50, type=int)
+    sender = request.args.get('sender', default=None, type=str)
+    fields = ValidationService.parse_fields(request.args.get('fields', default=None, type=str))
+    
+    timeout = min(max(timeout, 0), current_app.config['LONG_POLL_MAX_TIMEOUT_SECONDS'])
+    if limit < 1 or limit > 100:
+        limit = 50
+    
+    if sender and sender not in ['user', 'system']:
+        raise ValidationError(
+            'INVALID_SENDER',
+            'El parámetro "sender" debe ser "user" o "system"',
+            {'field': 'sender', 'valid_values': ['user', 'system']}
+        )
+    
+    result = message_service.wait_for_messages(
+        session_id=session_id,
+        last_id=last_id,
+        timeout=timeout,
+        limit=limit,
+        sender=sender,
+        fields=fields
+    )
+    
+    response = {
+        'status': 'success',
+        'data': result['data'],
         'pagination': {
             'limit': limit,
-            'offset': offset,
-            'total': total
+            'last_id': result['last_id'],
+            'has_more': result['has_more']
         }
     }
     
-    return jsonify(response), 200
+    http_response = jsonify(response)
+    http_response.headers['Cache-Control'] = 'no-store'
+    return http_response, 200
 
 
 @api_bp.route('/messages/<session_id>/search', methods=['GET'])
@@ -97,37 +452,59 @@ def search_messages(session_id):
         - sender: Filtrar por remitente
         - limit: Número máximo de resultados
         - offset: Número de resultados a omitir
+        - sort: relevance (por defecto con q) o chronological
+        - highlight: true para incluir un fragmento con los términos resaltados
+        - count: exact (por defecto), estimate (conteo acotado) o none para omitir el total
+        - fields: Campos a incluir en cada resultado, separados por comas
     """
     from app.services.search_service import search_messages as search_service
     
+    etag = session_etag(*message_service.get_session_high_water(session_id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
     query = request.args.get('q', default='', type=str)
     start_date = request.args.get('start_date', default=None, type=str)
     end_date = request.args.get('end_date', default=None, type=str)
     sender = request.args.get('sender', default=None, type=str)
     limit = request.args.get('limit', default=10, type=int)
     offset = request.args.get('offset', default=0, type=int)
+    sort = request.args.get('sort', default=None, type=str)
+    highlight = request.args.get('highlight', default='false', type=str).lower() == 'true'
+    count = request.args.get('count', default='exact', type=str)
+    fields = ValidationService.parse_fields(request.args.get('fields', default=None, type=str))
     
-    results, total = search_service(
+    results, total, has_more = search_service(
         session_id=session_id,
         query=query,
         start_date=start_date,
         end_date=end_date,
         sender=sender,
         limit=limit,
-        offset=offset
+        offset=offset,
+        sort=sort,
+        highlight=highlight,
+        count=count,
+        fields=fields
     )
     
+    pagination = {
+        'limit': limit,
+        'offset': offset,
+        'total': total,
+        'has_more': has_more
+    }
+    if count == 'estimate':
+        # El conteo se detiene en SEARCH_COUNT_ESTIMATE_CAP: al alcanzarlo es un mínimo
+        pagination['total_exact'] = total < current_app.config['SEARCH_COUNT_ESTIMATE_CAP']
+    
     response = {
         'status': 'success',
         'data': results,
-        'pagination': {
-            'limit': limit,
-            'offset': offset,
-            'total': total
-        }
+        'pagination': pagination
     }
     
-    return jsonify(response), 200
+    return apply_cache_headers(jsonify(response), etag), 200
 
 
 @api_bp.route('/auth/keys', methods=['POST'])
@@ -137,6 +514,8 @@ def create_new_api_key():
     
     Body:
         - name: Nombre descriptivo para la API Key
+        - rate_limit_per_minute: Cuota por minuto propia (opcional)
+        - rate_limit_burst: Ráfaga máxima propia (opcional)
     """
     data = request.get_json()
     
@@ -160,7 +539,8 @@ def create_new_api_key():
             }
         }), 400
     
-    api_key_plain, api_key_obj = create_api_key(name)
+    quota = ValidationService.validate_rate_limit(data)
+    api_key_plain, api_key_obj = create_api_key(name, **quota)
     
     response = {
         'status': 'success',
@@ -189,6 +569,39 @@ def get_api_keys():
     return jsonify(response), 200
 
 
+@api_bp.route('/auth/keys/<int:key_id>', methods=['PATCH'])
+def update_api_key(key_id):
+    """
+    Cambia la cuota de rate limiting de una API Key.
+    
+    Body:
+        - rate_limit_per_minute: Cuota por minuto (null: RATE_LIMIT_PER_MINUTE)
+        - rate_limit_burst: Ráfaga máxima (null: igual a la cuota por minuto)
+    """
+    data = request.get_json(silent=True)
+    
+    if not isinstance(data, dict):
+        raise ValidationError('INVALID_FORMAT', 'El cuerpo de la solicitud debe ser un objeto JSON')
+    
+    api_key = update_api_key_rate_limit(key_id, **ValidationService.validate_rate_limit(data))
+    
+    if not api_key:
+        return jsonify({
+            'status': 'error',
+            'error': {
+                'code': 'NOT_FOUND',
+                'message': 'API Key no encontrada'
+            }
+        }), 404
+    
+    response = {
+        'status': 'success',
+        'data': api_key.to_dict()
+    }
+    
+    return jsonify(response), 200
+
+
 @api_bp.route('/auth/keys/<int:key_id>', methods=['DELETE'])
 def delete_api_key(key_id):
     """
@@ -213,6 +626,29 @@ def delete_api_key(key_id):
     return jsonify(response), 200
 
 
+@api_bp.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Retorna los contadores de la caché de páginas por sesión.
+    """
+    return jsonify({
+        'status': 'success',
+        'data': session_page_cache.stats()
+    }), 200
+
+
+@api_bp.route('/stats/websocket', methods=['GET'])
+def get_websocket_stats():
+    """
+    Retorna la profundidad de la cola de emisiones WebSocket, sus latencias
+    y el estado del historial de reproducción.
+    """
+    return jsonify({
+        'status': 'success',
+        'data': {**broadcast_dispatcher.stats(), 'replay': replay_buffer.stats()}
+    }), 200
+
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     
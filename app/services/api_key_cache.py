@@ -0,0 +1,273 @@
+"""
+Caché de API Keys validadas y escritura diferida de last_used_at.
+Evita que cada solicitud autenticada consulte api_keys y abra una
+transacción de escritura solo para actualizar la fecha de último uso.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import bindparam, or_, update
+from app import db
+from app.models import APIKey
+
+
+class CachedAPIKey:
+    """
+    Copia de solo lectura de una API Key activa.
+    
+    No está ligada a ninguna sesión de SQLAlchemy, por lo que puede
+    compartirse entre solicitudes e hilos.
+    """
+    
+    __slots__ = (
+        'id', 'name', 'key_hash', 'created_at', 'last_used_at', 'rate_limit_per_minute', 'rate_limit_burst'
+    )
+    
+    is_active = True
+    
+    def __init__(self, id, name, key_hash, created_at, last_used_at=None, rate_limit_per_minute=None,
+                 rate_limit_burst=None):
+        self.id = id
+        self.name = name
+        self.key_hash = key_hash
+        self.created_at = created_at
+        self.last_used_at = last_used_at
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.rate_limit_burst = rate_limit_burst
+    
+    @classmethod
+    def from_model(cls, api_key):
+        """Construye la copia a partir de un objeto APIKey."""
+        return cls(
+            api_key.id, api_key.name, api_key.key_hash, api_key.created_at, api_key.last_used_at,
+            api_key.rate_limit_per_minute, api_key.rate_limit_burst
+        )
+    
+    def __repr__(self):
+        return f'<CachedAPIKey {self.name}>'
+
+
+class APIKeyCache:
+    """
+    Caché LRU con TTL de API Keys activas, indexada por hash.
+    
+    Solo se guardan keys válidas. Al revocar una key su entrada se elimina
+    de inmediato; como en SessionPageCache, un contador de generación
+    impide que una validación que leyó la key antes de la revocación la
+    vuelva a guardar. La invalidación es local a cada proceso; con varios
+    workers, el TTL acota cuánto tiempo otro proceso acepta una key revocada.
+    """
+    
+    def __init__(self):
+        """Inicializa la caché desactivada hasta llamar a init_app."""
+        self.enabled = False
+        self.max_entries = 0
+        self.ttl_seconds = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """
+        Configura la caché desde la aplicación y la vacía.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        """
+        self.enabled = app.config['API_KEY_CACHE_ENABLED']
+        self.max_entries = app.config['API_KEY_CACHE_MAX_ENTRIES']
+        self.ttl_seconds = app.config['API_KEY_CACHE_TTL_SECONDS']
+        self.clear()
+    
+    def clear(self):
+        """Elimina todas las entradas."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+    
+    def generation(self):
+        """Retorna la generación actual; cambia con cada invalidación."""
+        with self._lock:
+            return self._generation
+    
+    def get(self, key_hash):
+        """
+        Busca una key validada.
+        
+        Args:
+            key_hash: Hash SHA-256 de la API Key
+        
+        Returns:
+            CachedAPIKey, o None si no está o expiró
+        """
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key_hash]
+                return None
+            
+            self._entries.move_to_end(key_hash)
+            return entry[1]
+    
+    def set(self, key_hash, api_key, generation):
+        """
+        Guarda una key validada si no hubo invalidaciones desde que se leyó.
+        
+        Args:
+            key_hash: Hash SHA-256 de la API Key
+            api_key: CachedAPIKey a guardar
+            generation: Valor de generation() obtenido antes de leer la base de datos
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            if self._generation != generation:
+                return
+            
+            self._entries[key_hash] = (time.monotonic() + self.ttl_seconds, api_key)
+            self._entries.move_to_end(key_hash)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key_hash):
+        """
+        Elimina una key de la caché.
+        
+        Args:
+            key_hash: Hash SHA-256 de la API Key
+        """
+        with self._lock:
+            self._entries.pop(key_hash, None)
+            self._generation += 1
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class LastUsedBuffer:
+    """
+    Buffer de escritura diferida para api_keys.last_used_at.
+    
+    Cada validación solo registra la fecha en memoria; un hilo en segundo
+    plano escribe las fechas acumuladas cada API_KEY_LAST_USED_FLUSH_SECONDS
+    con un único UPDATE por lotes. Con un intervalo de 0 se escribe en cada
+    validación, como antes de existir el buffer. Si el proceso termina, se
+    pierden como mucho las fechas del último intervalo.
+    """
+    
+    def __init__(self):
+        """Inicializa el buffer sin aplicación asociada."""
+        self.app = None
+        self.interval = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+    
+    def init_app(self, app):
+        """
+        Asocia el buffer a una aplicación y descarta lo pendiente.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        """
+        self._stop_flusher()
+        self.app = app
+        self.interval = app.config['API_KEY_LAST_USED_FLUSH_SECONDS']
+        with self._lock:
+            self._pending.clear()
+    
+    def record(self, key_id, used_at):
+        """
+        Registra un uso de una API Key.
+        
+        Args:
+            key_id: ID de la API Key
+            used_at: Fecha y hora del uso
+        """
+        with self._lock:
+            previous = self._pending.get(key_id)
+            if previous is None or previous < used_at:
+                self._pending[key_id] = used_at
+        
+        if self.interval <= 0:
+            self.flush()
+        else:
+            self._ensure_flusher()
+    
+    def pending(self):
+        """Número de keys con una fecha de uso aún no escrita."""
+        with self._lock:
+            return len(self._pending)
+    
+    def flush(self):
+        """
+        Escribe las fechas pendientes en una sola transacción.
+        
+        Nunca retrocede una fecha ya guardada. Usa una conexión propia, de
+        modo que no interfiere con la sesión de la solicitud en curso.
+        
+        Returns:
+            Número de keys actualizadas
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        
+        if not pending:
+            return 0
+        
+        table = APIKey.__table__
+        stmt = update(table).where(
+            table.c.id == bindparam('key_id'),
+            or_(table.c.last_used_at.is_(None), table.c.last_used_at < bindparam('used_at'))
+        ).values(last_used_at=bindparam('used_at'))
+        rows = [{'key_id': key_id, 'used_at': used_at} for key_id, used_at in pending.items()]
+        
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(stmt, rows)
+        
+        return len(rows)
+    
+    def _ensure_flusher(self):
+        """Arranca el hilo de escritura la primera vez que se registra un uso."""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                args=(self._stop,),
+                name='api-key-last-used-flusher',
+                daemon=True
+            )
+            self._flusher.start()
+    
+    def _stop_flusher(self):
+        """Detiene el hilo de escritura; lo pendiente se descarta en init_app."""
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        
+        if flusher is not None:
+            self._stop.set()
+            flusher.join()
+    
+    def _flush_loop(self, stop):
+        """Escribe lo pendiente cada intervalo hasta que se pida detenerse."""
+        while not stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as error:
+                print(f"API key last_used_at flush error: {str(error)}")
+
+
+# Instancias compartidas, inicializadas en create_app
+api_key_cache = APIKeyCache()
+last_used_buffer = LastUsedBuffer()
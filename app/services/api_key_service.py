@@ -7,6 +7,8 @@ import hashlib
 from datetime import datetime, timezone
 from app import db
 from app.models import APIKey
+from app.services.api_key_cache import CachedAPIKey, api_key_cache, last_used_buffer
+from app.utils.rate_limit import token_bucket_limiter
 
 
 def generate_api_key():
@@ -32,12 +34,14 @@ def hash_api_key(api_key):
     return hashlib.sha256(api_key.encode()).hexdigest()
 
 
-def create_api_key(name):
+def create_api_key(name, rate_limit_per_minute=None, rate_limit_burst=None):
     """
     Crea una nueva API Key en la base de datos.
     
     Args:
         name: Nombre descriptivo para la API Key
+        rate_limit_per_minute: Cuota por minuto propia (None: la global)
+        rate_limit_burst: Ráfaga máxima propia (None: igual a la cuota)
         
     Returns:
         Tupla (api_key_plain, api_key_object)
@@ -48,7 +52,9 @@ def create_api_key(name):
     api_key = APIKey(
         key_hash=key_hash,
         name=name,
-        is_active=True
+        is_active=True,
+        rate_limit_per_minute=rate_limit_per_minute,
+        rate_limit_burst=rate_limit_burst
     )
     
     db.session.add(api_key)
@@ -59,31 +65,44 @@ def create_api_key(name):
 
 def validate_api_key(api_key):
     """
-    Valida una API Key y actualiza last_used_at.
+    Valida una API Key y registra su uso.
+    
+    Las keys válidas se guardan en api_key_cache, de modo que las
+    validaciones repetidas no consultan la base de datos. last_used_at se
+    escribe de forma diferida con last_used_buffer.
     
     Args:
         api_key: API Key en texto plano
         
     Returns:
-        APIKey object si es válida, None si no
+        CachedAPIKey si es válida, None si no
     """
     if not api_key:
         return None
     
     key_hash = hash_api_key(api_key)
-    api_key_obj = APIKey.query.filter_by(key_hash=key_hash, is_active=True).first()
+    cached = api_key_cache.get(key_hash)
+    
+    if cached is None:
+        generation = api_key_cache.generation()
+        api_key_obj = APIKey.query.filter_by(key_hash=key_hash, is_active=True).first()
+        if not api_key_obj:
+            return None
+        cached = CachedAPIKey.from_model(api_key_obj)
+        api_key_cache.set(key_hash, cached, generation)
     
-    if api_key_obj:
-        api_key_obj.last_used_at = datetime.now(timezone.utc)
-        db.session.commit()
+    cached.last_used_at = datetime.now(timezone.utc)
+    last_used_buffer.record(cached.id, cached.last_used_at)
     
-    return api_key_obj
+    return cached
 
 
 def revoke_api_key(key_id):
     """
     Revoca una API Key existente.
     
+    La key se elimina de api_key_cache en cuanto se confirma la revocación.
+    
     Args:
         key_id: ID de la API Key a revocar
         
@@ -96,14 +115,45 @@ def revoke_api_key(key_id):
     
     api_key.is_active = False
     db.session.commit()
+    api_key_cache.invalidate(api_key.key_hash)
     return True
 
 
+def update_api_key_rate_limit(key_id, **quota):
+    """
+    Cambia la cuota de rate limiting de una API Key.
+    
+    La key se elimina de api_key_cache y su bucket se rellena, de modo que
+    la nueva cuota se aplica desde la siguiente solicitud.
+    
+    Args:
+        key_id: ID de la API Key
+        quota: rate_limit_per_minute y/o rate_limit_burst (None: valor por defecto)
+        
+    Returns:
+        Objeto APIKey actualizado, o None si no existe
+    """
+    api_key = APIKey.query.get(key_id)
+    if not api_key:
+        return None
+    
+    for field, value in quota.items():
+        setattr(api_key, field, value)
+    db.session.commit()
+    api_key_cache.invalidate(api_key.key_hash)
+    token_bucket_limiter.reset(f'key:{api_key.id}')
+    return api_key
+
+
 def list_api_keys():
     """
     Lista todas las API Keys.
     
+    Antes de leer se escriben los usos pendientes, para que last_used_at
+    esté al día; populate_existing refresca las keys ya cargadas en la sesión.
+    
     Returns:
         Lista de objetos APIKey
     """
-    return APIKey.query.all()
+    last_used_buffer.flush()
+    return APIKey.query.populate_existing().all()
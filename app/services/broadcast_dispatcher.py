@@ -0,0 +1,360 @@
+"""
+Despachador de emisiones WebSocket en segundo plano.
+Saca del camino de la solicitud el envío de mensajes nuevos a los rooms:
+la solicitud encola (session_id, mensajes) y uno o más hilos emisores
+vacían la cola y agrupan los mensajes de los rooms con new_messages.
+"""
+import threading
+import time
+import zlib
+from collections import deque
+
+
+class _Shard:
+    """Cola acotada de un hilo emisor."""
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = deque()
+        # Última entrada aún no tomada de cada sesión, para coalescer
+        self.pending = {}
+        # Mensajes por sesión para new_messages: session_id -> [plazo, mensajes]
+        self.batches = {}
+        self.condition = threading.Condition()
+        self.busy = False
+        self.stopped = False
+        self.thread = None
+
+
+class BroadcastDispatcher:
+    """
+    Cola de emisiones WebSocket con un pool de hilos emisores.
+    
+    Cada hilo tiene su propia cola y las sesiones se reparten entre ellos
+    por hash, de modo que los mensajes de una sesión se emiten siempre en
+    el orden en que se guardaron. Con la cola de un hilo llena se aplica
+    WS_DISPATCHER_OVERFLOW:
+    
+    - block: la solicitud espera hasta WS_DISPATCHER_BLOCK_TIMEOUT_SECONDS
+      a que haya espacio y, si no lo hay, descarta los mensajes.
+    - drop: descarta los mensajes de inmediato.
+    - coalesce: une los mensajes a la entrada pendiente de la misma sesión,
+      que se emite completa; si la sesión no tiene ninguna, los descarta.
+    
+    Los mensajes descartados se guardan igualmente; solo no se emiten, y
+    los clientes pueden recuperarlos por HTTP.
+    
+    Además de un new_message por mensaje, cada hilo acumula los mensajes de
+    las sesiones con clientes en modo agrupado y los emite en un solo
+    new_messages al cumplirse WS_BATCH_WINDOW_MS desde el primero, o antes
+    si reúne WS_BATCH_MAX_MESSAGES.
+    """
+    
+    OVERFLOW_POLICIES = ('block', 'drop', 'coalesce')
+    
+    def __init__(self):
+        """Inicializa el despachador sin aplicación asociada."""
+        self.enabled = False
+        self.overflow = 'block'
+        self.block_timeout = 0
+        self.batch_window = 0
+        self.batch_max_messages = 0
+        self._shards = []
+        self._lock = threading.Lock()
+        self._reset_counters()
+    
+    def init_app(self, app):
+        """
+        Configura el despachador desde la aplicación y crea sus colas.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        
+        Raises:
+            ValueError: Si WS_DISPATCHER_OVERFLOW no es una política conocida
+        """
+        overflow = app.config['WS_DISPATCHER_OVERFLOW']
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f'WS_DISPATCHER_OVERFLOW debe ser uno de {", ".join(self.OVERFLOW_POLICIES)}')
+        
+        self._stop_workers()
+        self.enabled = app.config['WS_DISPATCHER_ENABLED']
+        self.overflow = overflow
+        self.block_timeout = app.config['WS_DISPATCHER_BLOCK_TIMEOUT_SECONDS']
+        self.batch_window = app.config['WS_BATCH_WINDOW_MS'] / 1000
+        self.batch_max_messages = app.config['WS_BATCH_MAX_MESSAGES']
+        self._shards = [
+            _Shard(app.config['WS_DISPATCHER_QUEUE_SIZE']) for _ in range(app.config['WS_DISPATCHER_WORKERS'])
+        ]
+        with self._lock:
+            self._reset_counters()
+    
+    def dispatch(self, session_id, messages):
+        """
+        Encola mensajes de una sesión para emitirlos a su room.
+        
+        Desactivado, los emite en el hilo actual, también a los clientes en
+        modo agrupado, sin esperar a la ventana.
+        
+        Args:
+            session_id: ID de la sesión
+            messages: Diccionarios de los mensajes, en orden de inserción
+        
+        Returns:
+            True si los mensajes se encolaron o emitieron, False si se descartaron
+        """
+        if not messages:
+            return True
+        
+        if not self.enabled:
+            self._emit(session_id, messages)
+            if self._has_batch_clients(session_id):
+                self._emit_batch(session_id, messages)
+            return True
+        
+        shard = self._shards[zlib.crc32(session_id.encode()) % len(self._shards)]
+        
+        with shard.condition:
+            if len(shard.entries) >= shard.capacity:
+                pending = shard.pending.get(session_id)
+                if self.overflow == 'coalesce' and pending is not None:
+                    pending[1].extend(messages)
+                    self._count('coalesced', len(messages))
+                    return True
+                if self.overflow == 'block':
+                    shard.condition.wait_for(lambda: len(shard.entries) < shard.capacity, self.block_timeout)
+                if len(shard.entries) >= shard.capacity:
+                    self._count('dropped', len(messages))
+                    return False
+            
+            entry = [session_id, list(messages), time.monotonic(), None]
+            shard.entries.append(entry)
+            shard.pending[session_id] = entry
+            shard.condition.notify_all()
+        
+        self._count('enqueued', len(messages))
+        self._ensure_workers()
+        return True
+    
+    def run_in_order(self, session_id, callback):
+        """
+        Ejecuta una función en el hilo emisor de la sesión, después de emitir
+        los mensajes de la sesión encolados antes, incluido su new_messages
+        pendiente.
+        
+        No se descarta con la cola llena, y los mensajes encolados después
+        no se coalescen con los anteriores. Desactivado, se ejecuta de
+        inmediato en el hilo actual.
+        
+        Args:
+            session_id: ID de la sesión
+            callback: Función sin argumentos
+        """
+        if not self.enabled:
+            callback()
+            return
+        
+        shard = self._shards[zlib.crc32(session_id.encode()) % len(self._shards)]
+        
+        with shard.condition:
+            shard.entries.append([session_id, [], time.monotonic(), callback])
+            shard.pending.pop(session_id, None)
+            shard.condition.notify_all()
+        
+        self._ensure_workers()
+    
+    def join(self, timeout=None):
+        """
+        Bloquea hasta que todas las colas estén vacías, sin emisiones en curso
+        ni mensajes agrupados pendientes.
+        
+        Args:
+            timeout: Segundos máximos de espera por cola, o None sin límite
+        """
+        for shard in self._shards:
+            with shard.condition:
+                shard.condition.wait_for(lambda: not shard.entries and not shard.busy and not shard.batches, timeout)
+    
+    def stats(self):
+        """Retorna la profundidad de las colas y los contadores de emisión."""
+        depth = 0
+        pending_messages = 0
+        for shard in self._shards:
+            with shard.condition:
+                depth += len(shard.entries)
+                pending_messages += sum(len(entry[1]) for entry in shard.entries)
+        
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'workers': len(self._shards),
+                'overflow': self.overflow,
+                'queue_capacity': sum(shard.capacity for shard in self._shards),
+                'queue_depth': depth,
+                'pending_messages': pending_messages,
+                'enqueued': self.enqueued,
+                'emitted': self.emitted,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches_emitted': self.batches_emitted,
+                'emit_latency_ms': self._timing(self._latency),
+                'emit_duration_ms': self._timing(self._duration)
+            }
+    
+    def _emit(self, session_id, messages):
+        """Emite los mensajes al room de la sesión."""
+        from app import socketio
+        from app.websocket_handlers import emit_new_messages
+        emit_new_messages(socketio, session_id, messages)
+    
+    def _emit_batch(self, session_id, messages):
+        """Emite los mensajes en un único new_messages al room agrupado de la sesión."""
+        from app import socketio
+        from app.websocket_handlers import emit_message_batch
+        emit_message_batch(socketio, session_id, messages)
+        self._count('batches_emitted', 1)
+    
+    def _has_batch_clients(self, session_id):
+        """Indica si la sesión tiene clientes en modo agrupado en este proceso."""
+        from app import socketio
+        from app.websocket_handlers import batch_room, room_has_clients
+        return room_has_clients(socketio, batch_room(session_id))
+    
+    def _count(self, counter, amount):
+        """Suma a un contador de mensajes."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+    
+    def _reset_counters(self):
+        """Pone a cero los contadores. Requiere el lock."""
+        self.enqueued = 0
+        self.emitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches_emitted = 0
+        # [emisiones, suma, máximo] en segundos
+        self._latency = [0, 0.0, 0.0]
+        self._duration = [0, 0.0, 0.0]
+    
+    @staticmethod
+    def _timing(timing):
+        """Convierte [emisiones, suma, máximo] en promedio y máximo en milisegundos."""
+        count, total, maximum = timing
+        return {
+            'avg': round(total / count * 1000, 3) if count else 0.0,
+            'max': round(maximum * 1000, 3)
+        }
+    
+    def _ensure_workers(self):
+        """Arranca los hilos emisores la primera vez que se encola una emisión."""
+        with self._lock:
+            for index, shard in enumerate(self._shards):
+                if shard.thread is not None:
+                    continue
+                shard.thread = threading.Thread(
+                    target=self._worker_loop,
+                    args=(shard,),
+                    name=f'websocket-emitter-{index}',
+                    daemon=True
+                )
+                shard.thread.start()
+    
+    def _stop_workers(self):
+        """Detiene los hilos emisores después de vaciar sus colas."""
+        for shard in self._shards:
+            with shard.condition:
+                shard.stopped = True
+                shard.condition.notify_all()
+            if shard.thread is not None:
+                shard.thread.join()
+    
+    def _worker_loop(self, shard):
+        """Emite las entradas de una cola hasta que se detenga y quede vacía."""
+        while True:
+            with shard.condition:
+                while not shard.entries and not shard.stopped:
+                    deadline = min((batch[0] for batch in shard.batches.values()), default=None)
+                    if deadline is not None and deadline <= time.monotonic():
+                        break
+                    shard.condition.wait(None if deadline is None else deadline - time.monotonic())
+                
+                if not shard.entries and shard.stopped and not shard.batches:
+                    return
+                
+                entry = shard.entries.popleft() if shard.entries else None
+                if entry is not None and shard.pending.get(entry[0]) is entry:
+                    del shard.pending[entry[0]]
+                shard.busy = True
+                shard.condition.notify_all()
+            
+            try:
+                if entry is not None and entry[3] is not None:
+                    self._run_callback(shard, entry[0], entry[3])
+                elif entry is not None:
+                    self._emit_entry(shard, *entry[:3])
+                self._flush_batches(shard)
+            finally:
+                with shard.condition:
+                    shard.busy = False
+                    shard.condition.notify_all()
+    
+    def _emit_entry(self, shard, session_id, messages, enqueued_at):
+        """Emite una entrada como new_message y la acumula para new_messages."""
+        started = time.monotonic()
+        try:
+            self._emit(session_id, messages)
+        except Exception as error:
+            print(f"WebSocket dispatcher error: {str(error)}")
+            self._count('failed', len(messages))
+        else:
+            finished = time.monotonic()
+            with self._lock:
+                self.emitted += len(messages)
+                for timing, seconds in ((self._latency, finished - enqueued_at), (self._duration, finished - started)):
+                    timing[0] += 1
+                    timing[1] += seconds
+                    timing[2] = max(timing[2], seconds)
+        
+        if not self._has_batch_clients(session_id):
+            return
+        
+        with shard.condition:
+            batch = shard.batches.setdefault(session_id, [started + self.batch_window, []])
+            batch[1].extend(messages)
+            if len(batch[1]) >= self.batch_max_messages:
+                batch[0] = started
+    
+    def _run_callback(self, shard, session_id, callback):
+        """Emite el new_messages pendiente de la sesión y ejecuta una función de run_in_order."""
+        with shard.condition:
+            batch = shard.batches.pop(session_id, None)
+        
+        try:
+            if batch is not None:
+                self._emit_batch(session_id, batch[1])
+            callback()
+        except Exception as error:
+            print(f"WebSocket dispatcher error: {str(error)}")
+    
+    def _flush_batches(self, shard):
+        """Emite los new_messages cuyo plazo se cumplió, o todos si el hilo se detiene."""
+        now = time.monotonic()
+        with shard.condition:
+            due = [
+                session_id for session_id, batch in shard.batches.items()
+                if shard.stopped or batch[0] <= now
+            ]
+            batches = [(session_id, shard.batches.pop(session_id)[1]) for session_id in due]
+        
+        for session_id, messages in batches:
+            try:
+                self._emit_batch(session_id, messages)
+            except Exception as error:
+                print(f"WebSocket dispatcher error: {str(error)}")
+                self._count('failed', len(messages))
+
+
+# Instancia compartida, inicializada en create_app
+broadcast_dispatcher = BroadcastDispatcher()
@@ -0,0 +1,123 @@
+"""
+Motor de filtrado de contenido.
+Compila la lista de términos prohibidos en una sola expresión regular
+para recorrer cada mensaje una única vez.
+"""
+import re
+import threading
+
+
+# Términos prohibidos incluidos por defecto
+DEFAULT_BLOCKLIST = ['spam', 'malware', 'phishing', 'scam']
+
+
+class ContentFilter:
+    """
+    Filtro de términos prohibidos basado en una expresión regular compilada.
+    
+    Los términos se organizan en un trie y se renderizan como alternativas
+    factorizadas por prefijo (por ejemplo "sca(?:m|mmer)"), de modo que el
+    costo de cada posición del texto depende de la longitud del término y
+    no del tamaño de la lista. La coincidencia es insensible a mayúsculas y
+    respeta límites de palabra.
+    """
+    
+    def __init__(self, terms=None):
+        """
+        Inicializa el filtro.
+        
+        Args:
+            terms: Iterable de términos prohibidos
+        """
+        self._lock = threading.Lock()
+        self._pattern = None
+        self.blocklist_path = None
+        self.load(terms or DEFAULT_BLOCKLIST)
+    
+    def init_app(self, app):
+        """
+        Carga la lista por defecto más la de CONTENT_FILTER_BLOCKLIST_PATH.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        """
+        self.blocklist_path = app.config.get('CONTENT_FILTER_BLOCKLIST_PATH')
+        self.reload()
+    
+    def reload(self):
+        """Recompila el filtro releyendo el archivo de términos configurado."""
+        terms = list(DEFAULT_BLOCKLIST)
+        
+        if self.blocklist_path:
+            with open(self.blocklist_path, encoding='utf-8') as blocklist:
+                terms.extend(line.strip() for line in blocklist if line.strip() and not line.startswith('#'))
+        
+        self.load(terms)
+    
+    def load(self, terms):
+        """
+        Compila una nueva lista de términos y la activa de forma atómica.
+        
+        Args:
+            terms: Iterable de términos prohibidos
+        """
+        pattern = self._compile(terms)
+        with self._lock:
+            self._pattern = pattern
+    
+    def filter(self, content):
+        """
+        Reemplaza cada término prohibido por asteriscos de la misma longitud.
+        
+        Args:
+            content: Texto original
+        
+        Returns:
+            Texto filtrado
+        """
+        pattern = self._pattern
+        if pattern is None:
+            return content
+        return pattern.sub(lambda match: '*' * len(match.group()), content)
+    
+    @classmethod
+    def _compile(cls, terms):
+        """Construye la expresión regular a partir de un trie de términos."""
+        trie = {}
+        for term in terms:
+            term = term.strip().lower()
+            if not term:
+                continue
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = True
+        
+        if not trie:
+            return None
+        
+        return re.compile(r'(?<!\w)' + cls._render(trie) + r'(?!\w)', re.IGNORECASE)
+    
+    @classmethod
+    def _render(cls, node):
+        """Renderiza un nodo del trie como alternativas factorizadas por prefijo."""
+        branches = [
+            re.escape(char) + cls._render(child)
+            for char, child in sorted(node.items())
+            if char != ''
+        ]
+        
+        if not branches:
+            return ''
+        
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        
+        if len(branches) == 1:
+            return branches[0]
+        
+        return '(?:' + '|'.join(branches) + ')'
+
+
+# Instancia compartida, inicializada en create_app
+content_filter = ContentFilter()
@@ -0,0 +1,91 @@
+"""
+Servicio de exportación de sesiones.
+Genera el contenido completo de una sesión como NDJSON o CSV sin
+cargarlo en memoria.
+"""
+import csv
+import io
+from app.repositories.message_repository import MessageRepository
+from app.repositories.records import MESSAGE_FIELDS, message_to_dict
+from app.utils.ndjson import dumps_line
+from app.utils.validators import ValidationError
+
+
+# Tipo de contenido de cada formato de exportación
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Columnas del CSV por campo; la metadata se aplana en columnas propias
+CSV_FIELD_COLUMNS = {
+    'metadata': ['word_count', 'character_count', 'processed_at']
+}
+
+
+def validate_export_format(export_format):
+    """
+    Valida el formato de exportación solicitado.
+    
+    Args:
+        export_format: 'ndjson' o 'csv'
+    
+    Raises:
+        ValidationError: Si el formato no está soportado
+    """
+    if export_format not in EXPORT_MIMETYPES:
+        raise ValidationError(
+            'INVALID_EXPORT_FORMAT',
+            'El parámetro "format" debe ser "ndjson" o "csv"',
+            {'field': 'format', 'valid_values': list(EXPORT_MIMETYPES)}
+        )
+
+
+def export_session(session_id, export_format='ndjson', sender=None, batch_size=1000, fields=None):
+    """
+    Genera la exportación de una sesión bloque a bloque.
+    
+    Cada bloque de batch_size mensajes leído de la base de datos produce un
+    único fragmento de salida.
+    
+    Args:
+        session_id: ID de la sesión
+        export_format: 'ndjson' o 'csv'
+        sender: Filtrar por remitente
+        batch_size: Mensajes por bloque
+        fields: Campos a exportar, o None para todos
+    
+    Yields:
+        Fragmentos de la exportación en bytes
+    """
+    batches = MessageRepository().iter_messages_by_session(session_id, sender, batch_size, fields)
+    
+    if export_format == 'csv':
+        yield from _csv_chunks(batches, fields)
+    else:
+        for messages in batches:
+            yield b''.join(dumps_line(message_to_dict(message, fields)) for message in messages)
+
+
+def _csv_chunks(batches, fields=None):
+    """Serializa los bloques de mensajes como CSV, con encabezado al inicio."""
+    columns = [
+        column
+        for field in (fields or MESSAGE_FIELDS)
+        for column in CSV_FIELD_COLUMNS.get(field, [field])
+    ]
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    
+    for messages in batches:
+        for message in messages:
+            writer.writerow([getattr(message, column) for column in columns])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Sesión vacía: solo el encabezado
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,195 @@
+"""
+Servicio de ingesta asíncrona de mensajes.
+Valida en el hilo de la solicitud y delega filtrado, guardado y emisión
+a un pool de workers alimentado por una cola acotada.
+"""
+import queue
+import threading
+from collections import OrderedDict
+from werkzeug.exceptions import ServiceUnavailable
+from app.services.message_service import MessageService
+from app.services.validation_service import ValidationService
+from app.utils.validators import ValidationError
+
+
+class IngestionService:
+    """Cola acotada de mensajes con un pool de workers en segundo plano."""
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PERSISTED = 'persisted'
+    STATUS_FAILED = 'failed'
+    
+    def __init__(self):
+        """Inicializa el servicio sin aplicación asociada."""
+        self.app = None
+        self._queue = None
+        self._stopping = None
+        self._workers = []
+        self._statuses = OrderedDict()
+        self._lock = threading.Lock()
+        self.message_service = MessageService()
+    
+    def init_app(self, app):
+        """
+        Asocia el servicio a una aplicación y crea su cola.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        """
+        self._stop_workers()
+        self.app = app
+        self._queue = queue.Queue(maxsize=app.config['INGESTION_QUEUE_SIZE'])
+        self._stopping = threading.Event()
+        with self._lock:
+            self._statuses.clear()
+    
+    def enqueue(self, data):
+        """
+        Valida un mensaje y lo encola para procesamiento en segundo plano.
+        
+        Args:
+            data: Diccionario con los datos del mensaje
+        
+        Raises:
+            ValidationError: Si la validación falla o el message_id ya está en cola
+            ServiceUnavailable: Si la cola está llena
+        """
+        timestamp_epoch_ms = ValidationService.parse_message(data)
+        message_id = data['message_id']
+        
+        with self._lock:
+            if self._statuses.get(message_id, {}).get('status') in (self.STATUS_QUEUED, self.STATUS_PROCESSING):
+                raise ValidationError(
+                    'DUPLICATE_MESSAGE_ID',
+                    f'Ya existe un mensaje con el ID "{message_id}"',
+                    {'field': 'message_id'}
+                )
+            
+            try:
+                self._queue.put_nowait((data, timestamp_epoch_ms))
+            except queue.Full:
+                raise ServiceUnavailable(
+                    'La cola de ingesta está llena. Por favor intenta más tarde.',
+                    retry_after=1
+                )
+            
+            self._set_status(message_id, self.STATUS_QUEUED)
+        
+        self._ensure_workers()
+    
+    def get_status(self, message_id):
+        """
+        Retorna el estado de ingesta conocido para un message_id.
+        
+        Args:
+            message_id: Identificador del mensaje
+        
+        Returns:
+            Diccionario con el estado, o None si el mensaje no pasó por la cola
+        """
+        with self._lock:
+            status = self._statuses.get(message_id)
+            return dict(status) if status else None
+    
+    def join(self):
+        """Bloquea hasta que todos los mensajes encolados se hayan procesado."""
+        self._queue.join()
+    
+    def _set_status(self, message_id, status, error=None):
+        """Registra el estado de un mensaje descartando los más antiguos. Requiere el lock."""
+        entry = {'status': status}
+        if error is not None:
+            entry['error'] = error
+        
+        self._statuses[message_id] = entry
+        self._statuses.move_to_end(message_id)
+        
+        while len(self._statuses) > self.app.config['INGESTION_STATUS_RETENTION']:
+            self._statuses.popitem(last=False)
+    
+    def _ensure_workers(self):
+        """Arranca el pool de workers la primera vez que se encola un mensaje."""
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.app.config['INGESTION_WORKERS']):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    args=(self._queue, self._stopping),
+                    name=f'ingestion-worker-{index}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+    
+    def _stop_workers(self):
+        """
+        Detiene los workers de la cola anterior sin esperar por ellos.
+        
+        Los mensajes ya encolados se procesan antes de que terminen. Con la
+        cola llena no se espera a que haya lugar para los centinelas: los
+        workers ven el evento de parada cuando la vacían.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        if not workers:
+            return
+        
+        self._stopping.set()
+        for _ in workers:
+            if not self._wake_worker(self._queue):
+                break
+    
+    def _worker_loop(self, work_queue, stopping):
+        """Consume mensajes de la cola hasta recibir el centinela o vaciarla tras la parada."""
+        while True:
+            item = work_queue.get()
+            try:
+                if item is None:
+                    return
+                with self.app.app_context():
+                    self._process(*item)
+            finally:
+                work_queue.task_done()
+            
+            if stopping.is_set() and work_queue.empty():
+                # Otro worker puede seguir esperando en get() sin centinela
+                self._wake_worker(work_queue)
+                return
+    
+    @staticmethod
+    def _wake_worker(work_queue):
+        """Encola un centinela sin bloquear; retorna False si la cola está llena."""
+        try:
+            work_queue.put_nowait(None)
+            return True
+        except queue.Full:
+            return False
+    
+    def _process(self, data, timestamp_epoch_ms):
+        """Filtra, guarda y emite un mensaje ya validado."""
+        message_id = data['message_id']
+        
+        with self._lock:
+            self._set_status(message_id, self.STATUS_PROCESSING)
+        
+        try:
+            self.message_service.save_validated_message(data, timestamp_epoch_ms)
+        except ValidationError as error:
+            with self._lock:
+                self._set_status(message_id, self.STATUS_FAILED, error.to_dict())
+        except Exception as error:
+            print(f"Ingestion worker error: {str(error)}")
+            with self._lock:
+                self._set_status(message_id, self.STATUS_FAILED, {
+                    'code': 'INTERNAL_SERVER_ERROR',
+                    'message': 'Error interno del servidor'
+                })
+        else:
+            with self._lock:
+                self._set_status(message_id, self.STATUS_PERSISTED)
+
+
+# Instancia compartida, inicializada en create_app
+ingestion_service = IngestionService()
@@ -2,16 +2,28 @@
 Servicio de procesamiento de mensajes.
 Maneja el pipeline de procesamiento incluyendo filtrado y generación de metadata.
 """
+import json
+import time
 from datetime import datetime, timezone
+from flask import current_app
+from app.services.broadcast_dispatcher import broadcast_dispatcher
+from app.services.content_filter import content_filter, DEFAULT_BLOCKLIST
 from app.services.validation_service import ValidationService
 from app.repositories.message_repository import MessageRepository
+from app.repositories.records import message_to_dict
+from app.utils.cache import session_page_cache
+from app.utils.cursors import encode_cursor, decode_cursor, NEXT, PREV
+from app.utils.ndjson import LineTooLongError
+from app.utils.notifier import session_notifier
+from app.utils.replay_buffer import replay_buffer
+from app.utils.validators import ValidationError
 
 
 class MessageService:
     """Servicio para procesar y gestionar mensajes."""
     
-    # Lista de palabras prohibidas para filtrado de contenido
-    BAD_WORDS = ['spam', 'malware', 'phishing', 'scam']
+    # Lista de palabras prohibidas por defecto para filtrado de contenido
+    BAD_WORDS = DEFAULT_BLOCKLIST
     
     def __init__(self):
         """Inicializa el servicio de mensajes."""
@@ -28,30 +40,387 @@ class MessageService:
         Returns:
             Diccionario con los datos del mensaje procesado
         """
-        self.validation_service.validate_message(data)
-        processed_content = self._filter_content(data['content'])
-        metadata = self._generate_metadata(processed_content)
+        timestamp_epoch_ms = self.validation_service.parse_message(data)
+        return self.save_validated_message(data, timestamp_epoch_ms)
+    
+    def save_validated_message(self, data, timestamp_epoch_ms):
+        """
+        Filtra, guarda y emite un mensaje que ya pasó la validación.
         
-        message_data = {
-            'message_id': data['message_id'],
-            'session_id': data['session_id'],
-            'content': processed_content,
-            'timestamp': data['timestamp'],
-            'sender': data['sender'],
-            'word_count': metadata['word_count'],
-            'character_count': metadata['character_count'],
-            'processed_at': metadata['processed_at']
+        Args:
+            data: Diccionario con los datos del mensaje validado
+            timestamp_epoch_ms: Timestamp retornado por ValidationService.parse_message
+            
+        Returns:
+            Diccionario con los datos del mensaje procesado
+        """
+        message_data = self._build_message_data(data, timestamp_epoch_ms)
+        
+        with replay_buffer.writing([data['session_id']]) as in_order:
+            message = self.repository.save_message(message_data)
+            message_dict = message.to_dict()
+            
+            with in_order(message.id):
+                self._on_messages_saved(data['session_id'], [message_dict])
+        
+        return message_dict
+    
+    def process_and_save_batch(self, items):
+        """
+        Procesa y guarda un lote de mensajes en una única transacción.
+        
+        Cada elemento se valida por separado; los errores de validación y los
+        message_id duplicados se reportan por elemento sin afectar al resto.
+        
+        Args:
+            items: Lista de diccionarios con los datos de cada mensaje
+            
+        Returns:
+            Lista de resultados por elemento, en el mismo orden de entrada
+        """
+        results = [None] * len(items)
+        valid = []
+        
+        for index, data in enumerate(items):
+            try:
+                timestamp_epoch_ms = self.validation_service.parse_message(data)
+            except ValidationError as error:
+                results[index] = self._batch_error(index, error)
+                continue
+            valid.append((index, self._build_message_data(data, timestamp_epoch_ms)))
+        
+        with replay_buffer.writing([message_data['session_id'] for _, message_data in valid]) as in_order:
+            saved = self.repository.save_messages_bulk([message_data for _, message_data in valid])
+            
+            messages_by_session = {}
+            row_ids = []
+            for (index, message_data), outcome in zip(valid, saved):
+                if isinstance(outcome, ValidationError):
+                    results[index] = self._batch_error(index, outcome)
+                    continue
+                message_dict = outcome.to_dict()
+                results[index] = {'index': index, 'status': 'success', 'data': message_dict}
+                messages_by_session.setdefault(message_data['session_id'], []).append(message_dict)
+                row_ids.append(outcome.id)
+            
+            # Emitir los mensajes agrupados por room una vez confirmada la transacción
+            if row_ids:
+                with in_order(min(row_ids)):
+                    for session_id, messages in messages_by_session.items():
+                        self._on_messages_saved(session_id, messages)
+        
+        return results
+    
+    def get_messages_page(self, session_id, limit=10, offset=0, cursor=None, sender=None, fields=None):
+        """
+        Recupera una página de mensajes con cursores de navegación.
+        
+        Con cursor se usa paginación keyset; sin él se mantiene LIMIT/OFFSET,
+        pero la respuesta igualmente incluye cursores para pasar al modo keyset.
+        
+        Args:
+            session_id: Identificador de sesión
+            limit: Número máximo de mensajes a retornar
+            offset: Número de mensajes a omitir (solo sin cursor)
+            cursor: Cursor opaco de una respuesta anterior
+            sender: Filtro opcional por remitente
+            fields: Campos a incluir en cada mensaje, o None para todos
+            
+        Returns:
+            Diccionario con 'data', 'next_cursor', 'prev_cursor', 'has_more' e
+            'immutable' (la página ya no puede cambiar)
+        """
+        if cursor is None:
+            messages = self.repository.get_messages_by_session(
+                session_id=session_id,
+                limit=limit,
+                offset=offset,
+                sender=sender,
+                fields=fields
+            )
+            has_more = None
+            has_previous = offset > 0
+            direction = NEXT
+        else:
+            message_pk, direction = decode_cursor(cursor)
+            messages, has_more = self.repository.get_messages_by_session_keyset(
+                session_id=session_id,
+                limit=limit,
+                after_id=message_pk if direction == NEXT else None,
+                before_id=message_pk if direction == PREV else None,
+                sender=sender,
+                fields=fields
+            )
+            has_previous = direction == NEXT or has_more
+        
+        next_cursor, prev_cursor = self._page_cursors(messages, cursor, direction, has_previous)
+        
+        # Los mensajes nuevos siempre tienen ids mayores: una página hacia atrás,
+        # o una página hacia adelante seguida de más mensajes, ya no puede cambiar
+        immutable = cursor is not None and (direction == PREV or bool(has_more))
+        
+        return {
+            'data': [message_to_dict(msg, fields) for msg in messages],
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'has_more': has_more,
+            'immutable': immutable
         }
+    
+    def get_sessions_pages(self, pages, sender=None, fields=None, count='exact'):
+        """
+        Recupera una página de mensajes de cada una de varias sesiones.
         
-        message = self.repository.save_message(message_data)
-        message_dict = message.to_dict()
+        Todas las páginas se leen con una sola consulta y los totales con otra,
+        sin importar cuántas sesiones se pidan. Sin cursor, la página de una
+        sesión son sus limit mensajes más recientes.
+        
+        Args:
+            pages: Lista de tuplas (session_id, limit, cursor o None), sin sesiones repetidas
+            sender: Filtro opcional por remitente
+            fields: Campos a incluir en cada mensaje, o None para todos
+            count: 'none' para omitir los totales
         
-        # Emitir mensaje via WebSocket a todos los clientes en el room
-        from app import socketio
-        from app.websocket_handlers import emit_new_message
-        emit_new_message(socketio, data['session_id'], message_dict)
+        Returns:
+            Diccionario session_id -> {'data', 'pagination'}, en el orden de pages
+        """
+        bounds = []
+        for session_id, limit, cursor in pages:
+            if cursor is None:
+                bounds.append((session_id, limit, None, None, PREV))
+                continue
+            message_pk, direction = decode_cursor(cursor)
+            bounds.append((
+                session_id,
+                limit,
+                message_pk if direction == NEXT else None,
+                message_pk if direction == PREV else None,
+                direction
+            ))
         
-        return message_dict
+        results = self.repository.get_messages_by_sessions(
+            [bound[:4] for bound in bounds],
+            sender=sender,
+            fields=fields
+        )
+        stats = {} if count == 'none' else self.repository.get_sessions_stats([page[0] for page in pages])
+        
+        response = {}
+        for (session_id, limit, cursor), bound, (messages, has_more) in zip(pages, bounds, results):
+            direction = bound[4]
+            has_previous = direction == NEXT or has_more
+            next_cursor, prev_cursor = self._page_cursors(messages, cursor, direction, has_previous)
+            
+            pagination = {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor,
+                'has_more': has_more
+            }
+            if count != 'none':
+                session_stats = stats.get(session_id)
+                pagination['total'] = session_stats.count_for(sender) if session_stats else 0
+            
+            response[session_id] = {
+                'data': [message_to_dict(msg, fields) for msg in messages],
+                'pagination': pagination
+            }
+        
+        return response
+    
+    def wait_for_messages(self, session_id, last_id=0, timeout=0, limit=50, sender=None, fields=None):
+        """
+        Recupera los mensajes posteriores a last_id, esperando si aún no hay.
+        
+        Si ya existen mensajes más nuevos se retornan de inmediato. Si no, se
+        libera la conexión a la base de datos y se espera hasta timeout
+        segundos una notificación de mensaje guardado en la sesión. La
+        suscripción se registra antes de consultar, de modo que un mensaje
+        guardado entre la consulta y la espera no se pierde.
+        
+        La notificación es local al proceso: con SOCKETIO_MESSAGE_QUEUE (varios
+        workers) la espera se corta además cada LONG_POLL_RECHECK_SECONDS para
+        volver a consultar, y un mensaje guardado en otro worker llega con ese
+        retraso como máximo.
+        
+        Args:
+            session_id: Identificador de sesión
+            last_id: Id interno del último mensaje que ya tiene el cliente
+            timeout: Segundos máximos de espera
+            limit: Número máximo de mensajes a retornar
+            sender: Filtro opcional por remitente
+            fields: Campos a incluir en cada mensaje, o None para todos
+        
+        Returns:
+            Diccionario con 'data', 'last_id' (id desde el que continuar) y 'has_more'
+        """
+        deadline = time.monotonic() + timeout
+        recheck = None
+        if current_app.config['SOCKETIO_MESSAGE_QUEUE']:
+            recheck = current_app.config['LONG_POLL_RECHECK_SECONDS']
+        
+        while True:
+            with session_notifier.subscribe(session_id) as subscription:
+                messages, has_more = self.repository.get_messages_by_session_keyset(
+                    session_id=session_id,
+                    limit=limit,
+                    after_id=last_id,
+                    sender=sender,
+                    fields=fields
+                )
+                remaining = deadline - time.monotonic()
+                if messages or remaining <= 0:
+                    break
+                
+                self.repository.release_connection()
+                # Tras una notificación se vuelve a consultar: con filtro por
+                # remitente el mensaje nuevo puede no corresponder
+                wait = remaining if recheck is None else min(remaining, recheck)
+                if not subscription.wait(wait) and wait == remaining:
+                    break
+        
+        return {
+            'data': [message_to_dict(msg, fields) for msg in messages],
+            'last_id': messages[-1].id if messages else last_id,
+            'has_more': has_more
+        }
+    
+    def get_replay(self, session_id, since_id=None, last_n=None):
+        """
+        Obtiene los mensajes a reproducir a un cliente que se une a una sesión.
+        
+        Se sirven desde replay_buffer si contiene since_id (o más de last_n
+        mensajes) y, si no, desde la base de datos. Debe llamarse dentro de
+        replay_buffer.replay_point(session_id): así el resultado incluye
+        exactamente los mensajes encolados para emitir hasta ese momento.
+        
+        Args:
+            session_id: Identificador de sesión
+            since_id: message_id del último mensaje que ya tiene el cliente
+            last_n: Número máximo de mensajes (como mucho WS_REPLAY_MAX_MESSAGES)
+        
+        Returns:
+            Diccionario con 'messages' (del más antiguo al más reciente) y
+            'has_more' (hay mensajes anteriores sin reproducir)
+        
+        Raises:
+            ValidationError: Si since_id no es un mensaje de la sesión
+        """
+        max_messages = current_app.config['WS_REPLAY_MAX_MESSAGES']
+        limit = min(last_n or max_messages, max_messages)
+        recent = replay_buffer.recent(session_id)
+        
+        missed = None
+        if since_id is None:
+            missed = recent if len(recent) > limit else None
+        else:
+            message_ids = [message['message_id'] for message in recent]
+            if since_id in message_ids:
+                missed = recent[message_ids.index(since_id) + 1:]
+        
+        replay_buffer.count(hit=missed is not None)
+        if missed is not None:
+            return {'messages': missed[-limit:], 'has_more': len(missed) > limit}
+        
+        after_id = None
+        if since_id is not None:
+            after_id = self.repository.get_message_row_id(session_id, since_id)
+            if after_id is None:
+                raise ValidationError(
+                    'MESSAGE_NOT_FOUND',
+                    f'No existe el mensaje "{since_id}" en la sesión',
+                    {'field': 'since_id'}
+                )
+        
+        messages, has_more = self.repository.get_latest_messages(session_id, limit, after_id)
+        return {'messages': [message_to_dict(msg) for msg in messages], 'has_more': has_more}
+    
+    def get_session_high_water(self, session_id):
+        """
+        Obtiene el high-water mark de una sesión desde sus contadores.
+        
+        Args:
+            session_id: Identificador de sesión
+            
+        Returns:
+            Tupla (id del último mensaje, número total de mensajes); (0, 0) si no hay mensajes
+        """
+        stats = self.repository.get_session_stats(session_id)
+        if stats is None:
+            return 0, 0
+        return stats.last_id or 0, stats.total_count
+    
+    def import_messages(self, lines, chunk_size):
+        """
+        Importa mensajes históricos desde un flujo NDJSON.
+        
+        Cada línea se valida y filtra igual que el tráfico en vivo; los mensajes
+        válidos se guardan en bloques de chunk_size con un INSERT masivo. Solo
+        se mantiene en memoria el bloque actual. Los mensajes importados no se
+        emiten por WebSocket.
+        
+        Args:
+            lines: Iterable de tuplas (número de línea, bytes de la línea)
+            chunk_size: Número de mensajes por transacción
+            
+        Yields:
+            Eventos de error por línea, de progreso por bloque y un resumen final
+        """
+        counts = {'processed': 0, 'saved': 0, 'failed': 0}
+        chunk = []
+        
+        for line_number, line in lines:
+            counts['processed'] += 1
+            try:
+                if isinstance(line, LineTooLongError):
+                    raise ValidationError('LINE_TOO_LONG', str(line))
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    raise ValidationError('INVALID_JSON', 'La línea no contiene un JSON válido')
+                timestamp_epoch_ms = self.validation_service.parse_message(data)
+            except ValidationError as error:
+                counts['failed'] += 1
+                yield {'type': 'error', 'line': line_number, 'error': error.to_dict()}
+                continue
+            
+            chunk.append((line_number, self._build_message_data(data, timestamp_epoch_ms)))
+            if len(chunk) >= chunk_size:
+                yield from self._save_import_chunk(chunk, counts)
+                chunk = []
+        
+        if chunk:
+            yield from self._save_import_chunk(chunk, counts)
+        
+        yield dict(counts, type='summary')
+    
+    def _save_import_chunk(self, chunk, counts):
+        """Guarda un bloque de la importación y genera sus eventos."""
+        errors = []
+        
+        # Dentro de writing(): ningún join calcula su reproducción entre el
+        # guardado y el descarte del buffer de las sesiones
+        with replay_buffer.writing([message_data['session_id'] for _, message_data in chunk]) as in_order:
+            saved = self.repository.save_messages_bulk([message_data for _, message_data in chunk])
+            
+            sessions = set()
+            row_ids = []
+            for (line_number, message_data), outcome in zip(chunk, saved):
+                if isinstance(outcome, ValidationError):
+                    counts['failed'] += 1
+                    errors.append({'type': 'error', 'line': line_number, 'error': outcome.to_dict()})
+                else:
+                    counts['saved'] += 1
+                    sessions.add(message_data['session_id'])
+                    row_ids.append(outcome.id)
+            
+            if row_ids:
+                with in_order(min(row_ids)):
+                    for session_id in sessions:
+                        self._on_messages_saved(session_id, [], broadcast=False)
+        
+        yield from errors
+        yield dict(counts, type='progress')
     
     def get_messages_by_session(self, session_id, limit=10, offset=0, sender=None):
         """
@@ -75,6 +444,84 @@ class MessageService:
         
         return [msg.to_dict() for msg in messages]
     
+    @staticmethod
+    def _page_cursors(messages, cursor, direction, has_previous):
+        """
+        Calcula los cursores de navegación de una página.
+        
+        Args:
+            messages: Mensajes de la página en orden ascendente
+            cursor: Cursor con el que se leyó la página, o None
+            direction: Dirección de lectura (NEXT o PREV)
+            has_previous: Si hay mensajes anteriores a la página
+        
+        Returns:
+            Tupla (next_cursor, prev_cursor)
+        """
+        if not messages:
+            # Página vacía: al avanzar se conserva la posición para volver a consultar
+            return (cursor if direction == NEXT else None), None
+        
+        next_cursor = encode_cursor(messages[-1].id, NEXT)
+        prev_cursor = encode_cursor(messages[0].id, PREV) if has_previous else None
+        return next_cursor, prev_cursor
+    
+    def _on_messages_saved(self, session_id, messages, broadcast=True):
+        """
+        Ejecuta los efectos posteriores a guardar mensajes de una sesión.
+        
+        Invalida las páginas cacheadas de la sesión y, si corresponde, encola
+        los mensajes en broadcast_dispatcher para emitirlos via WebSocket a
+        todos los clientes en el room y los agrega a replay_buffer. Sin
+        emisión, descarta el buffer de la sesión. Debe llamarse dentro del
+        turno de la escritura (in_order de replay_buffer.writing()), para
+        que el buffer y la cola de emisión reciban los mensajes en orden de id.
+        
+        Args:
+            session_id: ID de la sesión
+            messages: Diccionarios de los mensajes guardados, en orden de inserción
+            broadcast: Si se deben emitir los mensajes por WebSocket
+        """
+        session_page_cache.invalidate_session(session_id)
+        session_notifier.notify(session_id)
+        
+        if broadcast:
+            replay_buffer.record(session_id, messages)
+            broadcast_dispatcher.dispatch(session_id, messages)
+        else:
+            replay_buffer.discard(session_id)
+    
+    def _build_message_data(self, data, timestamp_epoch_ms):
+        """
+        Aplica filtrado y metadata a un mensaje ya validado.
+        
+        Args:
+            data: Diccionario con los datos del mensaje validado
+            timestamp_epoch_ms: Timestamp retornado por ValidationService.parse_message
+            
+        Returns:
+            Diccionario listo para persistir
+        """
+        processed_content = self._filter_content(data['content'])
+        metadata = self._generate_metadata(processed_content)
+        
+        return {
+            'message_id': data['message_id'],
+            'session_id': data['session_id'],
+            'content': processed_content,
+            'timestamp': data['timestamp'],
+            'timestamp_epoch_ms': timestamp_epoch_ms,
+            'sender': data['sender'],
+            'word_count': metadata['word_count'],
+            'character_count': metadata['character_count'],
+            'processed_at': metadata['processed_at']
+        }
+    
+    @staticmethod
+    def _batch_error(index, error):
+        """Construye el resultado de error de un elemento del lote."""
+        return {'index': index, 'status': 'error', 'error': error.to_dict()}
+    
     def _filter_content(self, content):
         """
         Filtra contenido inapropiado del mensaje.
@@ -85,25 +532,8 @@ class MessageService:
         Returns:
             Contenido filtrado
         """
-        filtered_content = content
-        
-        # Filtrado simple de palabras (insensible a mayúsculas)
-        for bad_word in self.BAD_WORDS:
-            # Reemplazar palabras prohibidas con asteriscos
-            filtered_content = filtered_content.replace(
-                bad_word, 
-                '*' * len(bad_word)
-            )
-            filtered_content = filtered_content.replace(
-                bad_word.capitalize(), 
-                '*' * len(bad_word)
-            )
-            filtered_content = filtered_content.replace(
-                bad_word.upper(), 
-                '*' * len(bad_word)
-            )
-        
-        return filtered_content
+        # Una sola pasada, insensible a mayúsculas y con límites de palabra
+        return content_filter.filter(content)
     
     def _generate_metadata(self, content):
         """
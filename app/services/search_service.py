@@ -2,10 +2,22 @@
 Servicio de búsqueda de mensajes.
 Permite buscar mensajes por contenido y filtros.
 """
-from app.repositories.message_repository import MessageRepository
+import html
+import re
+from flask import current_app
+from app.repositories.message_repository import HIGHLIGHT_END, HIGHLIGHT_START, MessageRepository
+from app.repositories.records import message_to_dict
+from app.services.validation_service import ValidationService
+from app.utils.timestamps import to_epoch_ms
+from app.utils.validators import ValidationError
 
 
-def search_messages(session_id, query='', start_date=None, end_date=None, sender=None, limit=10, offset=0):
+# Órdenes aceptados por el parámetro sort
+SORT_OPTIONS = ('relevance', 'chronological')
+
+
+def search_messages(session_id, query='', start_date=None, end_date=None, sender=None, limit=10, offset=0,
+                    sort=None, highlight=False, count='exact', fields=None):
     """
     Busca mensajes en una sesión con múltiples filtros.
     
@@ -17,20 +29,103 @@ def search_messages(session_id, query='', start_date=None, end_date=None, sender
         sender: Filtrar por remitente
         limit: Número máximo de resultados
         offset: Número de resultados a omitir
+        sort: 'relevance' (por defecto con texto) o 'chronological'
+        highlight: Si es True, cada resultado incluye el campo highlight
+        count: 'exact', 'estimate' (conteo acotado) o 'none' (sin total)
+        fields: Campos a incluir en cada mensaje, o None para todos
         
     Returns:
-        Tupla (lista de mensajes, total de resultados)
+        Tupla (lista de mensajes, total de resultados o None, hay más resultados)
+        
+    Raises:
+        ValidationError: Si una fecha, el orden o el modo de conteo no son válidos
     """
     repository = MessageRepository()
+    ValidationService.validate_count_mode(count)
+    
+    if sort and sort not in SORT_OPTIONS:
+        raise ValidationError(
+            'INVALID_SORT',
+            f'El parámetro "sort" debe ser uno de: {", ".join(SORT_OPTIONS)}',
+            {'field': 'sort', 'allowed_values': list(SORT_OPTIONS)}
+        )
     
     filters = {
         'query': query,
-        'start_date': start_date,
-        'end_date': end_date,
+        'start_ms': _date_param_to_epoch_ms('start_date', start_date),
+        'end_ms': _date_param_to_epoch_ms('end_date', end_date),
         'sender': sender
     }
     
-    messages = repository.search_messages(session_id, filters, limit, offset)
-    total = repository.count_search_results(session_id, filters)
+    # El resaltado sin FTS5 se calcula sobre content aunque no se devuelva
+    load_fields = fields
+    if highlight and fields is not None and 'content' not in fields:
+        load_fields = fields + ('content',)
+    
+    rows, total, has_more = repository.search_messages_page(
+        session_id, filters, limit, offset,
+        sort=sort,
+        highlight=highlight,
+        count=count,
+        estimate_cap=current_app.config['SEARCH_COUNT_ESTIMATE_CAP'],
+        fields=load_fields
+    )
+    
+    results = []
+    for message, snippet in rows:
+        result = message_to_dict(message, fields)
+        if highlight:
+            result['highlight'] = snippet if snippet is not None else _highlight_like(message.content, query)
+        results.append(result)
+    
+    return results, total, has_more
+
+
+def _highlight_like(content, query):
+    """
+    Resalta las apariciones literales de query cuando la búsqueda usó LIKE.
+    
+    Args:
+        content: Contenido del mensaje
+        query: Texto buscado
+        
+    Returns:
+        Contenido escapado como HTML con cada aparición envuelta en los
+        marcadores de resaltado
+    """
+    if not query:
+        return html.escape(content)
+    
+    # Con el grupo de captura, split alterna texto y apariciones
+    parts = re.split(f'({re.escape(query)})', content, flags=re.IGNORECASE)
+    return ''.join(
+        f'{HIGHLIGHT_START}{html.escape(part)}{HIGHLIGHT_END}' if index % 2 else html.escape(part)
+        for index, part in enumerate(parts)
+    )
+
+
+def _date_param_to_epoch_ms(field, value):
+    """
+    Normaliza un parámetro de fecha a milisegundos epoch UTC.
+    
+    Args:
+        field: Nombre del parámetro (para el mensaje de error)
+        value: Fecha ISO 8601 o None
+        
+    Returns:
+        Entero con milisegundos epoch, o None si no se indicó fecha
+        
+    Raises:
+        ValidationError: Si la fecha no está en formato ISO 8601
+    """
+    if not value:
+        return None
     
-    return [msg.to_dict() for msg in messages], total
+    try:
+        return to_epoch_ms(value)
+    except (ValueError, TypeError, OverflowError):
+        raise ValidationError(
+            'INVALID_DATE',
+            f'El parámetro "{field}" debe estar en formato ISO 8601',
+            {'field': field, 'expected_format': 'ISO 8601'}
+        )
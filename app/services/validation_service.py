@@ -2,8 +2,8 @@
 Servicio de validación para mensajes.
 Maneja toda la lógica de validación para mensajes entrantes.
 """
-from datetime import datetime
-from dateutil import parser
+from app.repositories.records import MESSAGE_FIELDS
+from app.utils.timestamps import parse_iso_timestamp, to_epoch_ms
 from app.utils.validators import ValidationError
 
 
@@ -12,6 +12,7 @@ class ValidationService:
     
     REQUIRED_FIELDS = ['message_id', 'session_id', 'content', 'timestamp', 'sender']
     VALID_SENDERS = ['user', 'system']
+    COUNT_MODES = ['exact', 'estimate', 'none']
     
     @staticmethod
     def validate_message(data):
@@ -27,16 +28,155 @@ class ValidationService:
         Returns:
             True si la validación es exitosa
         """
+        ValidationService.parse_message(data)
+        return True
+    
+    @staticmethod
+    def parse_message(data):
+        """
+        Valida los datos del mensaje y retorna su timestamp normalizado.
+        
+        El timestamp se interpreta una sola vez; quien guarda el mensaje
+        reutiliza el resultado en lugar de volver a parsearlo.
+        
+        Args:
+            data: Diccionario con los datos del mensaje
+            
+        Raises:
+            ValidationError: Si la validación falla
+            
+        Returns:
+            Timestamp en milisegundos desde epoch (UTC)
+        """
         if not isinstance(data, dict):
             raise ValidationError('INVALID_FORMAT', 'El cuerpo de la solicitud debe ser un objeto JSON')
         
         ValidationService._validate_required_fields(data)
         ValidationService._validate_field_types(data)
-        ValidationService._validate_timestamp(data['timestamp'])
+        timestamp_epoch_ms = ValidationService._validate_timestamp(data['timestamp'])
         ValidationService._validate_sender(data['sender'])
         ValidationService._validate_content(data['content'])
         
-        return True
+        return timestamp_epoch_ms
+    
+    @staticmethod
+    def validate_count_mode(count):
+        """
+        Valida el parámetro count de los endpoints paginados.
+        
+        Args:
+            count: 'exact', 'estimate' o 'none'
+            
+        Raises:
+            ValidationError: Si el modo no es válido
+        """
+        if count not in ValidationService.COUNT_MODES:
+            raise ValidationError(
+                'INVALID_COUNT_MODE',
+                'El parámetro "count" debe ser "exact", "estimate" o "none"',
+                {'field': 'count', 'valid_values': ValidationService.COUNT_MODES}
+            )
+    
+    @staticmethod
+    def parse_fields(fields):
+        """
+        Interpreta el parámetro fields (lista de campos separada por comas).
+        
+        Args:
+            fields: Valor del parámetro, por ejemplo "message_id,sender,timestamp",
+                o lista de campos si viene en un cuerpo JSON
+            
+        Returns:
+            Tupla de campos en el orden de MESSAGE_FIELDS, o None si no se indicó
+            
+        Raises:
+            ValidationError: Si no es un texto o una lista de textos, o si algún campo no existe
+        """
+        if not fields:
+            return None
+        
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        elif not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+            raise ValidationError(
+                'INVALID_FIELDS',
+                'El campo "fields" debe ser un texto separado por comas o una lista de textos',
+                {'field': 'fields', 'valid_values': list(MESSAGE_FIELDS)}
+            )
+        
+        requested = {field.strip() for field in fields if field.strip()}
+        unknown = sorted(requested - set(MESSAGE_FIELDS))
+        if unknown:
+            raise ValidationError(
+                'INVALID_FIELDS',
+                f'Campos desconocidos en "fields": {", ".join(unknown)}',
+                {'field': 'fields', 'valid_values': list(MESSAGE_FIELDS)}
+            )
+        
+        return tuple(field for field in MESSAGE_FIELDS if field in requested) or None
+    
+    @staticmethod
+    def validate_rate_limit(data):
+        """
+        Valida la cuota de rate limiting de una API Key.
+        
+        Args:
+            data: Cuerpo de la solicitud con rate_limit_per_minute y
+                rate_limit_burst opcionales (null restaura el valor por defecto)
+        
+        Returns:
+            Diccionario solo con los campos presentes en data
+        
+        Raises:
+            ValidationError: Si algún valor no es un entero positivo o null
+        """
+        quota = {}
+        for field in ('rate_limit_per_minute', 'rate_limit_burst'):
+            if field not in data:
+                continue
+            value = data[field]
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+                raise ValidationError(
+                    'INVALID_RATE_LIMIT',
+                    f'El campo "{field}" debe ser un entero positivo o null',
+                    {'field': field}
+                )
+            quota[field] = value
+        
+        return quota
+    
+    @staticmethod
+    def validate_replay(data):
+        """
+        Valida los parámetros de reproducción de un join por WebSocket.
+        
+        Args:
+            data: Datos del join con since_id y last_n opcionales
+        
+        Returns:
+            Tupla (since_id, last_n), con None para los ausentes
+        
+        Raises:
+            ValidationError: Si since_id no es un string no vacío o last_n no
+                es un entero positivo
+        """
+        since_id = data.get('since_id')
+        if since_id is not None and (not isinstance(since_id, str) or not since_id):
+            raise ValidationError(
+                'INVALID_REPLAY',
+                'El campo "since_id" debe ser el message_id del último mensaje recibido',
+                {'field': 'since_id'}
+            )
+        
+        last_n = data.get('last_n')
+        if last_n is not None and (isinstance(last_n, bool) or not isinstance(last_n, int) or last_n < 1):
+            raise ValidationError(
+                'INVALID_REPLAY',
+                'El campo "last_n" debe ser un entero positivo',
+                {'field': 'last_n'}
+            )
+        
+        return since_id, last_n
     
     @staticmethod
     def _validate_required_fields(data):
@@ -65,10 +205,10 @@ class ValidationService:
     
     @staticmethod
     def _validate_timestamp(timestamp):
-        """Valida que el timestamp esté en formato ISO."""
+        """Valida que el timestamp esté en formato ISO y lo retorna en milisegundos epoch."""
         try:
-            parser.isoparse(timestamp)
-        except (ValueError, TypeError):
+            return to_epoch_ms(parse_iso_timestamp(timestamp))
+        except (ValueError, TypeError, OverflowError):
             raise ValidationError(
                 'INVALID_TIMESTAMP',
                 'El campo "timestamp" debe estar en formato ISO datetime (ej: 2023-06-15T14:30:00Z)',
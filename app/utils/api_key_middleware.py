@@ -3,10 +3,28 @@ Middleware de autenticación con API Keys.
 Proporciona decorador para proteger endpoints.
 """
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
 from app.services.api_key_service import validate_api_key
 
 
+def get_request_api_key():
+    """
+    Valida la API Key del header X-API-Key una sola vez por solicitud.
+    
+    El rate limiting y los decoradores comparten el resultado, guardado en g
+    junto con la solicitud que lo produjo (g puede sobrevivir a la solicitud
+    si el contexto de aplicación ya estaba activo, como en las pruebas).
+    
+    Returns:
+        CachedAPIKey si el header contiene una key válida, None si no
+    """
+    current = request._get_current_object()
+    if g.get('api_key_request') is not current:
+        g.api_key = validate_api_key(request.headers.get('X-API-Key'))
+        g.api_key_request = current
+    return g.api_key
+
+
 def require_api_key(f):
     """
     Decorador que requiere una API Key válida en el header X-API-Key.
@@ -30,9 +48,7 @@ def require_api_key(f):
                 }
             }), 401
         
-        api_key_obj = validate_api_key(api_key)
-        
-        if not api_key_obj:
+        if not get_request_api_key():
             return jsonify({
                 'status': 'error',
                 'error': {
@@ -53,10 +69,7 @@ def optional_api_key(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        api_key = request.headers.get('X-API-Key')
-        
-        if api_key:
-            validate_api_key(api_key)
+        get_request_api_key()
         
         return f(*args, **kwargs)
     
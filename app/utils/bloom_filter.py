@@ -0,0 +1,51 @@
+"""
+Filtro Bloom en memoria.
+Responde "definitivamente no está" o "posiblemente está" para un conjunto de strings.
+"""
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    Filtro Bloom con doble hashing sobre un digest BLAKE2b.
+    
+    Nunca produce falsos negativos; la tasa de falsos positivos se mantiene
+    cerca de error_rate mientras no se superen capacity elementos.
+    """
+    
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Dimensiona el filtro.
+        
+        Args:
+            capacity: Número de elementos esperados
+            error_rate: Probabilidad objetivo de falsos positivos
+        """
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+    
+    def add(self, item):
+        """Agrega un elemento al filtro."""
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, item):
+        """Indica si el elemento posiblemente está en el filtro."""
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+    
+    def _positions(self, item):
+        """Calcula las posiciones de bits de un elemento."""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
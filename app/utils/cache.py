@@ -0,0 +1,154 @@
+"""
+Caché LRU con TTL para respuestas de lectura por sesión.
+Guarda cuerpos de respuesta ya serializados e invalida por sesión.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionPageCache:
+    """
+    Caché LRU acotada de respuestas serializadas, agrupadas por sesión.
+    
+    Las claves son tuplas cuyo primer elemento es el session_id. Cada sesión
+    tiene un número de generación que se incrementa al invalidarla; una
+    lectura que empezó antes de una invalidación no puede guardar su
+    resultado, lo que evita reinsertar páginas obsoletas.
+    """
+    
+    def __init__(self):
+        """Inicializa la caché desactivada hasta llamar a init_app."""
+        self.enabled = False
+        self.max_entries = 0
+        self.ttl_seconds = 0
+        self._entries = OrderedDict()
+        self._keys_by_session = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._reset_counters()
+    
+    def init_app(self, app):
+        """
+        Configura la caché desde la aplicación y la vacía.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        """
+        self.enabled = app.config['PAGE_CACHE_ENABLED']
+        self.max_entries = app.config['PAGE_CACHE_MAX_ENTRIES']
+        self.ttl_seconds = app.config['PAGE_CACHE_TTL_SECONDS']
+        self.clear()
+    
+    def clear(self):
+        """Elimina todas las entradas y reinicia los contadores."""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_session.clear()
+            self._generations.clear()
+            self._reset_counters()
+    
+    def generation(self, session_id):
+        """Retorna la generación actual de una sesión."""
+        with self._lock:
+            return self._generations.get(session_id, 0)
+    
+    def get(self, key):
+        """
+        Busca una respuesta en la caché.
+        
+        Args:
+            key: Tupla (session_id, ...) que identifica la página
+            
+        Returns:
+            Cuerpo serializado, o None si no está o expiró
+        """
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key, value, generation):
+        """
+        Guarda una respuesta si la sesión no se invalidó desde que se leyó.
+        
+        Args:
+            key: Tupla (session_id, ...) que identifica la página
+            value: Cuerpo serializado
+            generation: Valor de generation() obtenido antes de leer la base de datos
+        """
+        if not self.enabled:
+            return
+        
+        session_id = key[0]
+        with self._lock:
+            if self._generations.get(session_id, 0) != generation:
+                return
+            
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._keys_by_session.setdefault(session_id, set()).add(key)
+            
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+    
+    def invalidate_session(self, session_id):
+        """
+        Elimina todas las páginas de una sesión.
+        
+        Args:
+            session_id: Identificador de sesión
+        """
+        with self._lock:
+            self._generations[session_id] = self._generations.get(session_id, 0) + 1
+            for key in self._keys_by_session.pop(session_id, ()):
+                self._entries.pop(key, None)
+            self.invalidations += 1
+    
+    def stats(self):
+        """Retorna los contadores de uso de la caché."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+    
+    def _discard(self, key):
+        """Elimina una entrada y su referencia por sesión. Requiere el lock."""
+        self._entries.pop(key, None)
+        session_keys = self._keys_by_session.get(key[0])
+        if session_keys is not None:
+            session_keys.discard(key)
+            if not session_keys:
+                del self._keys_by_session[key[0]]
+    
+    def _reset_counters(self):
+        """Reinicia los contadores de aciertos y fallos."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+# Instancia compartida, inicializada en create_app
+session_page_cache = SessionPageCache()
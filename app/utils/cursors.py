@@ -0,0 +1,52 @@
+"""
+Cursores opacos para paginación keyset.
+Un cursor codifica la clave primaria de un mensaje y la dirección de lectura.
+"""
+import base64
+import json
+from app.utils.validators import ValidationError
+
+
+NEXT = 'next'
+PREV = 'prev'
+
+
+def encode_cursor(message_pk, direction):
+    """
+    Codifica un cursor opaco.
+    
+    Args:
+        message_pk: Clave primaria (Message.id) del mensaje frontera
+        direction: NEXT para leer después del mensaje, PREV para leer antes
+        
+    Returns:
+        String base64 url-safe sin relleno
+    """
+    raw = json.dumps({'id': message_pk, 'd': direction}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica un cursor generado por encode_cursor.
+    
+    Args:
+        cursor: String del cursor
+        
+    Returns:
+        Tupla (clave primaria, dirección)
+        
+    Raises:
+        ValidationError: Si el cursor está mal formado
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        message_pk, direction = payload['id'], payload['d']
+    except (ValueError, TypeError, KeyError):
+        raise ValidationError('INVALID_CURSOR', 'El cursor de paginación no es válido', {'field': 'cursor'})
+    
+    if not isinstance(message_pk, int) or isinstance(message_pk, bool) or direction not in (NEXT, PREV):
+        raise ValidationError('INVALID_CURSOR', 'El cursor de paginación no es válido', {'field': 'cursor'})
+    
+    return message_pk, direction
@@ -69,7 +69,21 @@ def register_error_handlers(app):
                 'message': 'Demasiadas solicitudes. Por favor intenta más tarde.'
             }
         }
-        return jsonify(response), 429
+        headers = {'Retry-After': str(error.retry_after)} if getattr(error, 'retry_after', None) else {}
+        return jsonify(response), 429, headers
+    
+    @app.errorhandler(503)
+    def handle_service_unavailable(error):
+        """Maneja errores 503 por saturación del servicio."""
+        response = {
+            'status': 'error',
+            'error': {
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'El servicio está saturado. Por favor intenta más tarde.'
+            }
+        }
+        headers = {'Retry-After': str(error.retry_after)} if getattr(error, 'retry_after', None) else {}
+        return jsonify(response), 503, headers
     
     @app.errorhandler(Exception)
     def handle_unexpected_error(error):
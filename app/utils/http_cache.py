@@ -0,0 +1,59 @@
+"""
+Utilidades de caché HTTP (ETag, If-None-Match y Cache-Control).
+"""
+from flask import Response
+
+
+# Páginas que nunca cambian: todos sus mensajes están por debajo del
+# high-water mark de la sesión y los mensajes nunca se modifican
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Páginas que pueden cambiar con nuevos mensajes: revalidar con ETag
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+def session_etag(last_id, total_count):
+    """
+    Construye el ETag de una sesión a partir de su high-water mark.
+    
+    Como los mensajes solo se agregan, el último id y el conteo bastan
+    para identificar el estado de la sesión.
+    
+    Args:
+        last_id: Clave primaria del último mensaje (0 si no hay mensajes)
+        total_count: Número de mensajes de la sesión
+        
+    Returns:
+        Valor del ETag sin comillas
+    """
+    return f's{last_id}-{total_count}'
+
+
+def is_not_modified(request, etag):
+    """Indica si el If-None-Match de la solicitud coincide con el ETag."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    """Construye una respuesta 304 Not Modified con el ETag actual."""
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def apply_cache_headers(response, etag, immutable=False):
+    """
+    Agrega ETag y Cache-Control a una respuesta.
+    
+    Args:
+        response: Respuesta Flask
+        etag: Valor del ETag sin comillas
+        immutable: Si la página nunca cambiará
+        
+    Returns:
+        La misma respuesta
+    """
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return response
@@ -0,0 +1,372 @@
+"""
+Cola de mensajes entre procesos para Socket.IO.
+Retransmite las emisiones a rooms entre varios workers. El broker se elige
+por la URL de SOCKETIO_MESSAGE_QUEUE: redis://, kafka://, zmq+tcp:// y el
+resto (amqp://, ...) usan los gestores de python-socketio; unix:// usa el
+broker local incluido, sobre un socket Unix, sin servicios externos.
+"""
+import fcntl
+import os
+import pickle
+import queue
+import socket
+import struct
+import threading
+import time
+import socketio
+from socketio import PubSubManager
+
+
+# Longitud de cada trama, antepuesta al contenido serializado
+_HEADER = struct.Struct('!I')
+
+# Saludo de cada conexión al broker: un byte de modo (publica y recibe, o
+# solo publica) y el host_id del gestor, para no devolverle sus mensajes
+_SUBSCRIBER = b'S'
+_PUBLISHER = b'P'
+_HOST_ID_SIZE = 32
+
+# Tramas pendientes por conexión en el broker antes de cortarla por lenta
+_CLIENT_QUEUE_SIZE = 10000
+
+
+def _read_exactly(connection, size):
+    """Lee size bytes de la conexión, o retorna None si se cerró."""
+    chunks = []
+    while size:
+        chunk = connection.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _read_frame(connection):
+    """Lee una trama completa (cabecera incluida), o retorna None si se cerró."""
+    header = _read_exactly(connection, _HEADER.size)
+    if header is None:
+        return None
+    body = _read_exactly(connection, _HEADER.unpack(header)[0])
+    return None if body is None else header + body
+
+
+class UnixSocketBroker:
+    """
+    Broker pub/sub sobre un socket Unix de flujo.
+    
+    Solo un proceso por ruta actúa como broker: el que obtiene el lock
+    exclusivo de ruta + '.lock'. Cada trama recibida de una conexión se
+    reenvía a las conexiones suscritas de los demás gestores, cada una con su propia
+    cola y su propio hilo de escritura, de modo que un worker lento no
+    retrasa al resto; si su cola se llena, se le corta la conexión.
+    """
+    
+    def __init__(self, path):
+        """
+        Inicializa el broker sin iniciarlo.
+        
+        Args:
+            path: Ruta del socket Unix
+        """
+        self.path = path
+        self._lock_file = None
+        self._server = None
+        self._connections = set()
+        self._subscribers = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self):
+        """Indica si este proceso es el broker de la ruta."""
+        return self._server is not None
+    
+    def try_start(self):
+        """
+        Inicia el broker si ningún otro proceso lo es.
+        
+        Returns:
+            True si este proceso es el broker
+        """
+        if self.running:
+            return True
+        
+        lock_file = open(self.path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        
+        # Con el lock, un socket existente es de un broker que ya terminó.
+        # Se crea con otro nombre y permisos 0600 antes de publicarlo con
+        # rename, para que nunca sea accesible a otros usuarios
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        staging_path = f'{self.path}.{os.getpid()}'
+        if os.path.exists(staging_path):
+            os.unlink(staging_path)
+        server.bind(staging_path)
+        os.chmod(staging_path, 0o600)
+        os.replace(staging_path, self.path)
+        server.listen(128)
+        
+        self._lock_file = lock_file
+        self._server = server
+        threading.Thread(target=self._accept_loop, args=(server,), name='socketio-unix-broker', daemon=True).start()
+        return True
+    
+    def stop(self):
+        """Deja de ser el broker y cierra todas sus conexiones."""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        
+        # shutdown despierta al hilo bloqueado en accept; sin el socket, los
+        # clientes buscan un nuevo broker en lugar de quedar en la cola de listen
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        try:
+            server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        server.close()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            self._close(connection)
+        
+        self._lock_file.close()
+        self._lock_file = None
+    
+    def _accept_loop(self, server):
+        """Acepta conexiones hasta que se cierre el socket del broker."""
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._connections.add(connection)
+            threading.Thread(
+                target=self._read_loop,
+                args=(connection,),
+                name='socketio-unix-broker-reader',
+                daemon=True
+            ).start()
+    
+    def _read_loop(self, connection):
+        """Reenvía las tramas de una conexión a los demás suscriptores."""
+        try:
+            greeting = _read_exactly(connection, 1 + _HOST_ID_SIZE)
+            if greeting is None:
+                return
+            mode, host_id = greeting[:1], greeting[1:]
+            if mode == _SUBSCRIBER:
+                outbox = queue.Queue(maxsize=_CLIENT_QUEUE_SIZE)
+                with self._lock:
+                    self._subscribers[connection] = (host_id, outbox)
+                threading.Thread(
+                    target=self._write_loop,
+                    args=(connection, outbox),
+                    name='socketio-unix-broker-writer',
+                    daemon=True
+                ).start()
+            
+            while True:
+                frame = _read_frame(connection)
+                if frame is None:
+                    break
+                with self._lock:
+                    targets = [
+                        (other, outbox) for other, (other_host_id, outbox) in self._subscribers.items()
+                        if other_host_id != host_id
+                    ]
+                for other, outbox in targets:
+                    try:
+                        outbox.put_nowait(frame)
+                    except queue.Full:
+                        print("Socket.IO broker: suscriptor lento desconectado")
+                        self._close(other)
+        except OSError:
+            pass
+        finally:
+            self._close(connection)
+    
+    def _write_loop(self, connection, outbox):
+        """Envía a un suscriptor las tramas de su cola."""
+        while True:
+            frame = outbox.get()
+            if frame is None:
+                return
+            try:
+                connection.sendall(frame)
+            except OSError:
+                self._close(connection)
+                return
+    
+    def _close(self, connection):
+        """Retira una conexión y detiene su hilo de escritura."""
+        with self._lock:
+            self._connections.discard(connection)
+            _, outbox = self._subscribers.pop(connection, (None, None))
+        if outbox is not None:
+            # El centinela debe entrar aunque la cola esté llena
+            while True:
+                try:
+                    outbox.put_nowait(None)
+                    break
+                except queue.Full:
+                    outbox.get_nowait()
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.close()
+
+
+class UnixSocketManager(PubSubManager):
+    """
+    Gestor de clientes de Socket.IO con pub/sub sobre un socket Unix local.
+    
+    Todos los workers del host usan la misma URL (unix:///ruta/al.sock). El
+    primero en arrancar actúa además como broker (ver UnixSocketBroker); si
+    ese proceso termina, otro worker toma su lugar y los demás se
+    reconectan solos. Los mensajes publicados mientras no hay conexión se
+    pierden, como con los demás brokers.
+    
+    Las tramas son pickle, como en los gestores de python-socketio; el
+    socket solo admite conexiones del mismo usuario.
+    """
+    
+    name = 'unix'
+    
+    def __init__(self, url='unix:///tmp/socketio.sock', channel='socketio', write_only=False, logger=None):
+        """
+        Inicializa el gestor sin conectarse todavía.
+        
+        Args:
+            url: unix:// seguido de la ruta del socket
+            channel: Canal compartido por todos los workers
+            write_only: Solo publicar, sin recibir
+            logger: Logger de python-socketio
+        """
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = url.split('://', 1)[1]
+        self.broker = UnixSocketBroker(self.path)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+        self._closed = False
+    
+    def close(self):
+        """Cierra las conexiones y, si lo era, deja de ser el broker."""
+        self._closed = True
+        with self._publish_lock:
+            if self._publisher is not None:
+                self._publisher.close()
+                self._publisher = None
+        self.broker.stop()
+    
+    def _connect(self, mode):
+        """
+        Conecta con el broker, iniciándolo si no hay ninguno.
+        
+        Raises:
+            OSError: Si no hay broker y otro proceso tiene el lock
+        """
+        self.broker.try_start()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.path)
+            connection.sendall(mode + self.host_id.encode())
+        except OSError:
+            connection.close()
+            raise
+        return connection
+    
+    def _publish(self, data):
+        """Envía un mensaje a los demás workers a través del broker."""
+        frame = pickle.dumps({'channel': self.channel, 'data': data})
+        frame = _HEADER.pack(len(frame)) + frame
+        
+        with self._publish_lock:
+            # Un reintento con conexión nueva si el broker cambió
+            for _ in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect(_PUBLISHER)
+                    self._publisher.sendall(frame)
+                    return
+                except OSError:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                        self._publisher = None
+        
+        self._get_logger().error('No se pudo publicar en el broker ' + self.path)
+    
+    def _listen(self):
+        """Genera los mensajes del canal publicados por los demás workers."""
+        retry_delay = 0.05
+        while not self._closed:
+            try:
+                connection = self._connect(_SUBSCRIBER)
+            except OSError:
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 1)
+                continue
+            
+            retry_delay = 0.05
+            try:
+                while True:
+                    frame = _read_frame(connection)
+                    if frame is None:
+                        break
+                    message = pickle.loads(frame[_HEADER.size:])
+                    if message.get('channel') == self.channel:
+                        yield message['data']
+            except OSError:
+                pass
+            finally:
+                connection.close()
+
+
+# Esquema de URL -> gestor de clientes; el resto de URLs usa KombuManager
+MESSAGE_QUEUE_BACKENDS = {
+    'redis': socketio.RedisManager,
+    'rediss': socketio.RedisManager,
+    'kafka': socketio.KafkaManager,
+    'zmq+tcp': socketio.ZmqManager,
+    'unix': UnixSocketManager,
+}
+
+
+def register_message_queue(scheme, manager_class):
+    """
+    Registra un broker para un esquema de URL de SOCKETIO_MESSAGE_QUEUE.
+    
+    Args:
+        scheme: Esquema de la URL (por ejemplo 'nats')
+        manager_class: Subclase de socketio.PubSubManager que recibe
+            (url, channel=..., write_only=...)
+    """
+    MESSAGE_QUEUE_BACKENDS[scheme] = manager_class
+
+
+def create_client_manager(url, channel='flask-socketio', write_only=False):
+    """
+    Crea el gestor de clientes de Socket.IO para una URL de cola.
+    
+    Args:
+        url: URL de SOCKETIO_MESSAGE_QUEUE, o None para un solo proceso
+        channel: Canal compartido por todos los workers
+        write_only: Solo publicar, sin recibir
+    
+    Returns:
+        Gestor de clientes, o None para el gestor en memoria por defecto
+    """
+    if not url:
+        return None
+    
+    manager_class = MESSAGE_QUEUE_BACKENDS.get(url.split('://', 1)[0], socketio.KombuManager)
+    return manager_class(url, channel=channel, write_only=write_only)
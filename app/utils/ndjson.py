@@ -0,0 +1,46 @@
+"""
+Utilidades para NDJSON (JSON delimitado por saltos de línea).
+"""
+from app.utils.serialization import dumps_bytes
+
+
+class LineTooLongError(ValueError):
+    """Una línea del flujo supera el tamaño máximo permitido."""
+
+
+def iter_lines(stream, max_line_bytes):
+    """
+    Lee un flujo binario línea a línea sin cargarlo completo en memoria.
+    
+    Las líneas vacías se omiten. Una línea que supera max_line_bytes se
+    descarta hasta el siguiente salto de línea y se reporta con
+    LineTooLongError en lugar de su contenido.
+    
+    Args:
+        stream: Objeto tipo archivo con método readline
+        max_line_bytes: Tamaño máximo de una línea
+        
+    Yields:
+        Tuplas (número de línea, bytes de la línea o LineTooLongError)
+    """
+    line_number = 0
+    
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield line_number, LineTooLongError(f'La línea supera {max_line_bytes} bytes')
+            continue
+        
+        if line.strip():
+            yield line_number, line
+
+
+def dumps_line(obj):
+    """Serializa un objeto como una línea NDJSON en bytes."""
+    return dumps_bytes(obj) + b'\n'
@@ -0,0 +1,101 @@
+"""
+Notificaciones en proceso de mensajes nuevos por sesión.
+Permite que una solicitud de long-polling espere sin consultar la base
+de datos hasta que se guarde un mensaje en su sesión.
+"""
+import threading
+
+
+class _Subscription:
+    """Suscripción de un solo uso a la próxima notificación de una sesión."""
+    
+    def __init__(self, notifier, session_id):
+        self._notifier = notifier
+        self.session_id = session_id
+        self.event = threading.Event()
+    
+    def wait(self, timeout):
+        """
+        Espera una notificación.
+        
+        Args:
+            timeout: Segundos máximos de espera
+        
+        Returns:
+            True si llegó una notificación, False si se agotó el tiempo
+        """
+        return self.event.wait(timeout)
+    
+    def close(self):
+        """Cancela la suscripción si sigue registrada."""
+        self._notifier._unsubscribe(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SessionNotifier:
+    """
+    Registro de suscriptores por sesión.
+    
+    La suscripción debe crearse antes de consultar la base de datos: así un
+    mensaje guardado entre la consulta y la espera despierta igualmente al
+    suscriptor. Las notificaciones son locales al proceso.
+    """
+    
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+    
+    def subscribe(self, session_id):
+        """
+        Registra una suscripción a la próxima notificación de la sesión.
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Returns:
+            Suscripción utilizable como context manager
+        """
+        subscription = _Subscription(self, session_id)
+        with self._lock:
+            self._subscriptions.setdefault(session_id, set()).add(subscription)
+        return subscription
+    
+    def notify(self, session_id):
+        """
+        Despierta a todos los suscriptores de una sesión.
+        
+        Args:
+            session_id: ID de la sesión
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.pop(session_id, ())
+        
+        for subscription in subscriptions:
+            subscription.event.set()
+    
+    def waiting(self, session_id=None):
+        """Número de suscriptores en espera, de una sesión o en total."""
+        with self._lock:
+            if session_id is not None:
+                return len(self._subscriptions.get(session_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+    
+    def _unsubscribe(self, subscription):
+        """Elimina una suscripción del registro."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.session_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.session_id]
+
+
+# Instancia compartida por el proceso
+session_notifier = SessionNotifier()
@@ -0,0 +1,272 @@
+"""
+Rate limiting por API Key con contadores compartidos entre procesos.
+Define el almacenamiento SQLite para Flask-Limiter (esquema sqlite://),
+la clave de rate limiting y el token bucket con cuotas por API Key.
+"""
+import math
+import sqlite3
+import threading
+import time
+from flask import request
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+from werkzeug.exceptions import TooManyRequests
+
+
+# Filas escritas entre limpiezas de contadores expirados
+_PURGE_EVERY = 1000
+
+
+class SQLiteStorage(Storage):
+    """
+    Almacenamiento de límites en un archivo SQLite local.
+    
+    Todos los procesos del host que usan el mismo archivo comparten los
+    contadores, sin servidor externo ni salto de red. El archivo se abre en
+    modo WAL y sin fsync: un contador perdido en una caída no es grave.
+    Cada actualización es una única sentencia UPSERT ... RETURNING, de modo
+    que es atómica también entre procesos.
+    
+    URI: sqlite:///ruta/relativa.db, sqlite:////ruta/absoluta.db o
+    sqlite:///:memory: (solo para pruebas; no se comparte).
+    """
+    
+    STORAGE_SCHEME = ['sqlite']
+    
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        """
+        Abre el archivo y crea las tablas si no existen.
+        
+        Args:
+            uri: URI sqlite:// del archivo
+            wrap_exceptions: Envolver errores en limits.errors.StorageError
+            options: busy_timeout (segundos de espera ante un bloqueo, por defecto 5)
+        """
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        path = uri.split('://', 1)[1][1:] or ':memory:'
+        
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._connection = sqlite3.connect(
+            path,
+            timeout=float(options.get('busy_timeout', 5)),
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=OFF')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_counters '
+            '(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_buckets '
+            '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+    
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+    
+    def incr(self, key, expiry, amount=1, **kwargs):
+        """
+        Incrementa el contador de una ventana fija y retorna su valor.
+        
+        Si la ventana anterior expiró, el contador se reinicia.
+        """
+        now = time.time()
+        row = self._execute(
+            'INSERT INTO rate_limit_counters (key, count, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END, '
+            'expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END '
+            'RETURNING count',
+            (key, amount, now + expiry, now, now),
+            write=True
+        )
+        return row[0]
+    
+    def get(self, key):
+        """Retorna el contador vigente de una ventana, o 0."""
+        row = self._execute(
+            'SELECT count FROM rate_limit_counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        )
+        return row[0] if row else 0
+    
+    def get_expiry(self, key):
+        """Retorna el instante (epoch) en que expira la ventana."""
+        now = time.time()
+        row = self._execute('SELECT expires_at FROM rate_limit_counters WHERE key = ? AND expires_at > ?', (key, now))
+        return row[0] if row else now
+    
+    def check(self):
+        """Indica si el archivo responde."""
+        try:
+            self._execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def reset(self):
+        """Elimina todos los contadores y buckets."""
+        with self._lock:
+            removed = self._connection.execute('DELETE FROM rate_limit_counters').rowcount
+            removed += self._connection.execute('DELETE FROM rate_limit_buckets').rowcount
+        return removed
+    
+    def clear(self, key):
+        """Elimina el contador y el bucket de una clave."""
+        with self._lock:
+            self._connection.execute('DELETE FROM rate_limit_counters WHERE key = ?', (key,))
+            self._connection.execute('DELETE FROM rate_limit_buckets WHERE key = ?', (key,))
+    
+    def consume_token(self, key, rate, capacity, cost=1):
+        """
+        Consume fichas de un token bucket.
+        
+        El bucket se rellena a razón de rate fichas por segundo hasta
+        capacity. La recarga y el consumo se calculan en la misma sentencia,
+        que no modifica la fila si no hay fichas suficientes.
+        
+        Args:
+            key: Clave del bucket
+            rate: Fichas que se recuperan por segundo
+            capacity: Fichas máximas (ráfaga)
+            cost: Fichas a consumir
+        
+        Returns:
+            Tupla (permitido, fichas restantes, segundos hasta tener cost fichas)
+        """
+        now = time.time()
+        refilled = 'min(?, tokens + (? - updated_at) * ?)'
+        row = self._execute(
+            'INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) '
+            f'ON CONFLICT(key) DO UPDATE SET tokens = {refilled} - ?, updated_at = ? '
+            f'WHERE {refilled} >= ? '
+            'RETURNING tokens',
+            (key, capacity - cost, now, capacity, now, rate, cost, now, capacity, now, rate, cost),
+            write=True
+        )
+        if row is not None:
+            return True, int(row[0]), 0.0
+        
+        row = self._execute('SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?', (key,))
+        tokens = min(capacity, row[0] + (now - row[1]) * rate) if row else capacity
+        return False, int(tokens), (cost - tokens) / rate
+    
+    def _execute(self, sql, parameters=(), write=False):
+        """Ejecuta una sentencia y retorna su primera fila."""
+        with self._lock:
+            row = self._connection.execute(sql, parameters).fetchone()
+            if write:
+                self._writes += 1
+                if self._writes % _PURGE_EVERY == 0:
+                    self._purge()
+        return row
+    
+    def _purge(self):
+        """Elimina contadores expirados y buckets llenos hace tiempo. Requiere el lock."""
+        now = time.time()
+        self._connection.execute('DELETE FROM rate_limit_counters WHERE expires_at <= ?', (now,))
+        # Un bucket sin uso en una hora está lleno en la práctica: equivale a no tener fila
+        self._connection.execute('DELETE FROM rate_limit_buckets WHERE updated_at < ?', (now - 3600,))
+
+
+def rate_limit_key():
+    """
+    Clave de rate limiting de la solicitud actual.
+    
+    Las solicitudes con una API Key válida se limitan por key; el resto por
+    dirección IP.
+    """
+    from app.utils.api_key_middleware import get_request_api_key
+    
+    api_key = get_request_api_key()
+    if api_key is not None:
+        return f'key:{api_key.id}'
+    return f'ip:{get_remote_address()}'
+
+
+class TokenBucketLimiter:
+    """
+    Cuota global de solicitudes por API Key (o por IP) con token bucket.
+    
+    Cada clave dispone de rate_limit_per_minute solicitudes por minuto con
+    ráfagas de hasta rate_limit_burst; los valores se toman de la API Key o,
+    si no los tiene o no hay key, de RATE_LIMIT_PER_MINUTE y RATE_LIMIT_BURST.
+    Los buckets se guardan en el mismo almacenamiento SQLite que los límites
+    por ruta de Flask-Limiter.
+    """
+    
+    def __init__(self):
+        """Inicializa el limitador desactivado hasta llamar a init_app."""
+        self.enabled = False
+        self.per_minute = 0
+        self.burst = None
+        self.storage = None
+    
+    def init_app(self, app, storage):
+        """
+        Configura el limitador y registra la verificación antes de cada solicitud.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+            storage: Almacenamiento de Flask-Limiter (limiter.storage)
+        
+        Raises:
+            RuntimeError: Si el almacenamiento no admite token buckets
+        """
+        self.enabled = app.config['RATE_LIMIT_TOKEN_BUCKET_ENABLED']
+        self.per_minute = app.config['RATE_LIMIT_PER_MINUTE']
+        self.burst = app.config['RATE_LIMIT_BURST']
+        self.storage = storage
+        
+        if self.enabled and not hasattr(storage, 'consume_token'):
+            raise RuntimeError('RATE_LIMIT_TOKEN_BUCKET_ENABLED requiere RATELIMIT_STORAGE_URI sqlite://')
+        
+        app.before_request(self.check_request)
+    
+    def quota(self, api_key=None):
+        """
+        Cuota aplicable a una API Key.
+        
+        Args:
+            api_key: CachedAPIKey de la solicitud, o None
+        
+        Returns:
+            Tupla (solicitudes por minuto, ráfaga)
+        """
+        if api_key is not None and api_key.rate_limit_per_minute:
+            return api_key.rate_limit_per_minute, api_key.rate_limit_burst or api_key.rate_limit_per_minute
+        return self.per_minute, (api_key and api_key.rate_limit_burst) or self.burst or self.per_minute
+    
+    def reset(self, key):
+        """
+        Rellena el bucket de una clave, por ejemplo al cambiar su cuota.
+        
+        Args:
+            key: Clave de rate limiting ('key:<id>' o 'ip:<dirección>')
+        """
+        if hasattr(self.storage, 'consume_token'):
+            self.storage.clear(f'bucket:{key}')
+    
+    def check_request(self):
+        """
+        Consume una ficha para la solicitud actual.
+        
+        Raises:
+            TooManyRequests: Si el bucket de la clave está vacío
+        """
+        if not self.enabled or request.blueprint != 'api':
+            return
+        
+        from app.utils.api_key_middleware import get_request_api_key
+        
+        per_minute, burst = self.quota(get_request_api_key())
+        allowed, _, retry_after = self.storage.consume_token(f'bucket:{rate_limit_key()}', per_minute / 60, burst)
+        if not allowed:
+            raise TooManyRequests(retry_after=math.ceil(retry_after))
+
+
+# Instancia compartida, inicializada en create_app
+token_bucket_limiter = TokenBucketLimiter()
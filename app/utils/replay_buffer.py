@@ -0,0 +1,262 @@
+"""
+Historial en memoria de los mensajes emitidos por sesión.
+Permite que un cliente que se une a una sesión por WebSocket reciba los
+mensajes que se perdió sin consultar la base de datos, sin huecos ni
+duplicados respecto de los que luego recibe en vivo.
+"""
+import threading
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class _Gate:
+    """
+    Lock compartido/exclusivo de un grupo de sesiones.
+    
+    Las escrituras lo toman compartido y guardan en paralelo; un join con
+    reproducción lo toma exclusivo. Mientras un exclusivo espera no entran
+    nuevas escrituras, de modo que el tráfico continuo no lo retrasa
+    indefinidamente.
+    
+    Tras guardar, cada escritura espera su turno para registrar y encolar
+    sus mensajes: antes que ella pasan las escrituras de sus mismas sesiones
+    con ids menores y las que aún no conocen su id.
+    """
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.writers = 0
+        self.exclusive = False
+        # Escrituras sin publicar: escritor -> (sesiones, primer id o None)
+        self.pending = {}
+    
+    def acquire_shared(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.exclusive)
+            self.writers += 1
+    
+    def register(self, writer, session_ids):
+        with self.condition:
+            self.pending[writer] = (session_ids, None)
+    
+    def wait_turn(self, writer, row_id):
+        with self.condition:
+            session_ids = self.pending[writer][0]
+            self.pending[writer] = (session_ids, row_id)
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: all(
+                other_id is not None and other_id > row_id
+                for other, (other_sessions, other_id) in self.pending.items()
+                if other is not writer and not other_sessions.isdisjoint(session_ids)
+            ))
+    
+    def finish_turn(self, writer):
+        with self.condition:
+            self.pending.pop(writer, None)
+            self.condition.notify_all()
+    
+    def release_shared(self, writer):
+        with self.condition:
+            self.writers -= 1
+            self.pending.pop(writer, None)
+            self.condition.notify_all()
+    
+    def acquire_exclusive(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.exclusive)
+            self.exclusive = True
+            self.condition.wait_for(lambda: self.writers == 0)
+    
+    def release_exclusive(self):
+        with self.condition:
+            self.exclusive = False
+            self.condition.notify_all()
+
+
+class ReplayBuffer:
+    """
+    Buffers circulares con los últimos mensajes encolados para emitir de
+    cada sesión.
+    
+    Guarda hasta WS_REPLAY_BUFFER_SIZE mensajes por sesión, en el orden en
+    que se encolaron en broadcast_dispatcher, para las WS_REPLAY_MAX_SESSIONS
+    sesiones usadas más recientemente. Un message_id presente en el buffer
+    garantiza que el buffer tiene todos los mensajes posteriores.
+    
+    Para que una reproducción sea exacta, guardar un mensaje y encolarlo
+    debe ocurrir dentro de writing() y la reproducción dentro de
+    replay_point(): así ningún mensaje queda confirmado en la base de datos
+    sin estar aún en la cola de emisión. Además, el registro y el encolado
+    van dentro del turno de la escritura (in_order(id)), de modo que el
+    buffer, la cola de emisión y la base de datos tienen los mensajes de
+    cada sesión en el mismo orden, el de sus ids.
+    """
+    
+    # Grupos de sesiones que comparten lock, como los hilos del despachador
+    GATE_STRIPES = 64
+    
+    def __init__(self):
+        """Inicializa el historial desactivado hasta llamar a init_app."""
+        self.enabled = False
+        self.buffer_size = 0
+        self.max_sessions = 0
+        self._buffers = OrderedDict()
+        self._gates = [_Gate() for _ in range(self.GATE_STRIPES)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def init_app(self, app):
+        """
+        Configura el historial desde la aplicación y lo vacía.
+        
+        Con una cola de mensajes entre workers se desactiva: el buffer de un
+        proceso no incluye los mensajes emitidos por los demás.
+        
+        Args:
+            app: Instancia de la aplicación Flask
+        """
+        self.enabled = app.config['WS_REPLAY_BUFFER_ENABLED'] and not app.config['SOCKETIO_MESSAGE_QUEUE']
+        self.buffer_size = app.config['WS_REPLAY_BUFFER_SIZE']
+        self.max_sessions = app.config['WS_REPLAY_MAX_SESSIONS']
+        with self._lock:
+            self._buffers.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    @contextmanager
+    def writing(self, session_ids):
+        """
+        Retiene los joins con reproducción de las sesiones mientras se
+        guardan y encolan sus mensajes.
+        
+        Produce in_order: un context manager que recibe el id del primer
+        mensaje guardado y espera a que se publiquen las escrituras
+        anteriores de las mismas sesiones. Registrar y encolar los mensajes
+        debe hacerse dentro de él.
+        
+        Args:
+            session_ids: IDs de las sesiones que se van a escribir
+        """
+        session_ids = frozenset(session_ids)
+        writer = object()
+        # Orden fijo entre grupos para no bloquearse con otra escritura
+        indexes = sorted({self._gate_index(session_id) for session_id in session_ids})
+        acquired = []
+        try:
+            for index in indexes:
+                self._gates[index].acquire_shared()
+                acquired.append(index)
+            # Solo se esperan turnos de escrituras que ya tienen todos sus
+            # grupos: una que aún espera uno no ha guardado y tendrá un id mayor
+            for index in indexes:
+                self._gates[index].register(writer, session_ids)
+            yield lambda row_id: self._in_order(writer, indexes, row_id)
+        finally:
+            for index in reversed(acquired):
+                self._gates[index].release_shared(writer)
+    
+    @contextmanager
+    def _in_order(self, writer, indexes, row_id):
+        """Turno de publicación de una escritura dentro de writing()."""
+        for index in indexes:
+            self._gates[index].wait_turn(writer, row_id)
+        try:
+            yield
+        finally:
+            for index in indexes:
+                self._gates[index].finish_turn(writer)
+    
+    @contextmanager
+    def replay_point(self, session_id):
+        """
+        Espera a que terminen las escrituras en curso de la sesión y
+        detiene las nuevas mientras se calcula la reproducción.
+        
+        Args:
+            session_id: ID de la sesión
+        """
+        gate = self._gates[self._gate_index(session_id)]
+        gate.acquire_exclusive()
+        try:
+            yield
+        finally:
+            gate.release_exclusive()
+    
+    def record(self, session_id, messages):
+        """
+        Agrega mensajes encolados para emitir al buffer de su sesión.
+        
+        Args:
+            session_id: ID de la sesión
+            messages: Diccionarios de los mensajes, en orden de inserción
+        """
+        if not self.enabled or not messages:
+            return
+        
+        with self._lock:
+            buffer = self._buffers.get(session_id)
+            if buffer is None:
+                buffer = self._buffers[session_id] = deque(maxlen=self.buffer_size)
+                if len(self._buffers) > self.max_sessions:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(session_id)
+            buffer.extend(messages)
+    
+    def discard(self, session_id):
+        """
+        Descarta el buffer de una sesión, para que la próxima reproducción se
+        lea de la base de datos.
+        
+        Se usa cuando se guardan mensajes que no se encolan para emitir (la
+        importación): un buffer que no los incluye ya no garantiza tener
+        todos los mensajes posteriores a los suyos.
+        
+        Args:
+            session_id: ID de la sesión
+        """
+        with self._lock:
+            self._buffers.pop(session_id, None)
+    
+    def recent(self, session_id):
+        """
+        Retorna los mensajes guardados de una sesión.
+        
+        Args:
+            session_id: ID de la sesión
+        
+        Returns:
+            Lista de mensajes del más antiguo al más reciente (vacía si no hay)
+        """
+        with self._lock:
+            buffer = self._buffers.get(session_id)
+            return list(buffer) if buffer else []
+    
+    def count(self, hit):
+        """Registra una reproducción servida desde el buffer (hit) o desde la base de datos."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def stats(self):
+        """Retorna el tamaño del historial y los aciertos de reproducción."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'sessions': len(self._buffers),
+                'messages': sum(len(buffer) for buffer in self._buffers.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+    
+    def _gate_index(self, session_id):
+        """Grupo de lock de una sesión."""
+        return zlib.crc32(session_id.encode()) % self.GATE_STRIPES
+
+
+# Instancia compartida, inicializada en create_app
+replay_buffer = ReplayBuffer()
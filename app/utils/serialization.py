@@ -0,0 +1,108 @@
+"""
+Backends de serialización JSON.
+Permite reemplazar el proveedor JSON de Flask por uno basado en orjson,
+que serializa directamente a bytes, y controlar el formato compacto.
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es una dependencia opcional
+    orjson = None
+
+
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+
+
+def _stdlib_dumps_bytes(obj):
+    """Serializa obj como JSON compacto en bytes UTF-8 con la librería estándar."""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+# Serializador compacto a bytes del backend activo; lo fija init_json
+_dumps_bytes = _stdlib_dumps_bytes
+
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask respaldado por orjson.
+    
+    Las respuestas se generan como bytes sin pasar por str. Los tipos que
+    orjson no serializa por sí mismo (fechas, Decimal, objetos con __html__)
+    se delegan al mismo default que usa Flask, de modo que la salida es
+    equivalente a la del proveedor estándar.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        """Serializa obj como JSON a str (interfaz de JSONProvider)."""
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode()
+    
+    def dumps_bytes(self, obj, indent=False):
+        """
+        Serializa obj como JSON directamente a bytes.
+        
+        Args:
+            obj: Objeto a serializar
+            indent: Si es True, indenta la salida con dos espacios
+        
+        Returns:
+            JSON en bytes UTF-8
+        """
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+    
+    def loads(self, s, **kwargs):
+        """Deserializa JSON desde str o bytes."""
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Construye una respuesta application/json sin convertir a str."""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app):
+    """
+    Instala el proveedor JSON indicado por JSON_BACKEND.
+    
+    'auto' usa orjson si está instalado y la librería estándar si no.
+    JSON_COMPACT fija el formato de las respuestas (None: indentado solo en
+    modo debug) y JSON_SORT_KEYS el orden de las claves.
+    
+    Args:
+        app: Instancia de la aplicación Flask
+    
+    Raises:
+        RuntimeError: Si se pide orjson y no está instalado
+        ValueError: Si JSON_BACKEND no es un backend conocido
+    """
+    global _dumps_bytes
+    
+    backend = app.config['JSON_BACKEND']
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f'JSON_BACKEND debe ser uno de: {", ".join(JSON_BACKENDS)}')
+    if backend == 'auto':
+        backend = 'orjson' if orjson is not None else 'json'
+    
+    if backend == 'orjson':
+        if orjson is None:
+            raise RuntimeError('JSON_BACKEND=orjson requiere instalar el paquete orjson')
+        app.json = OrjsonJSONProvider(app)
+        _dumps_bytes = orjson.dumps
+    else:
+        app.json = DefaultJSONProvider(app)
+        _dumps_bytes = _stdlib_dumps_bytes
+    
+    app.json.sort_keys = app.config['JSON_SORT_KEYS']
+    app.json.compact = app.config['JSON_COMPACT']
+
+
+def dumps_bytes(obj):
+    """Serializa obj como JSON compacto en bytes con el backend activo."""
+    return _dumps_bytes(obj)
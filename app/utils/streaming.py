@@ -0,0 +1,34 @@
+"""
+Utilidades para respuestas en streaming.
+"""
+import zlib
+
+
+def accepts_gzip(request):
+    """Indica si el cliente acepta respuestas comprimidas con gzip."""
+    return request.accept_encodings.quality('gzip') > 0
+
+
+def gzip_chunks(chunks, compresslevel=6):
+    """
+    Comprime un flujo de fragmentos en formato gzip sin acumularlo.
+    
+    Tras cada fragmento se hace un flush de sincronización para que el
+    cliente pueda descomprimir lo recibido hasta el momento.
+    
+    Args:
+        chunks: Iterable de fragmentos en bytes
+        compresslevel: Nivel de compresión de zlib (1-9)
+    
+    Yields:
+        Fragmentos comprimidos en bytes
+    """
+    # wbits=31: cabecera y checksum gzip en lugar de zlib
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    
+    yield compressor.flush()
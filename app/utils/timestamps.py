@@ -0,0 +1,58 @@
+"""
+Utilidades para timestamps ISO 8601.
+Incluye un parser rápido para la forma más común y la conversión a epoch.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from dateutil import parser
+
+
+# Forma canónica enviada por la mayoría de clientes: 2023-06-15T14:30:00Z
+_CANONICAL_ISO = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})Z\Z', re.ASCII)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def parse_iso_timestamp(value):
+    """
+    Convierte un string ISO 8601 en datetime.
+    
+    La forma YYYY-MM-DDTHH:MM:SSZ se resuelve sin pasar por dateutil;
+    cualquier otra variante (offsets, fracciones, fechas sin hora) usa
+    dateutil.parser.isoparse.
+    
+    Args:
+        value: Timestamp en formato ISO 8601
+        
+    Returns:
+        Objeto datetime (con zona horaria si el string la incluye)
+        
+    Raises:
+        ValueError: Si el string no es un timestamp ISO válido
+        TypeError: Si value no es un string
+    """
+    match = _CANONICAL_ISO.match(value)
+    if match:
+        return datetime(*map(int, match.groups()), tzinfo=timezone.utc)
+    return parser.isoparse(value)
+
+
+def to_epoch_ms(value):
+    """
+    Convierte un datetime o un string ISO 8601 a milisegundos desde epoch (UTC).
+    
+    Los valores sin zona horaria se interpretan como UTC.
+    
+    Args:
+        value: datetime o string ISO 8601
+        
+    Returns:
+        Entero con milisegundos desde 1970-01-01T00:00:00Z
+    """
+    if isinstance(value, str):
+        value = parse_iso_timestamp(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MILLISECOND
+
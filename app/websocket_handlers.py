@@ -2,7 +2,48 @@
 Handlers de WebSocket para actualizaciones en tiempo real.
 Gestiona conexiones y emisión de eventos.
 """
+from functools import partial
+from flask import request
 from flask_socketio import emit, join_room, leave_room
+from socketio import PubSubManager
+from app.services.broadcast_dispatcher import broadcast_dispatcher
+from app.services.message_service import MessageService
+from app.services.validation_service import ValidationService
+from app.utils.replay_buffer import replay_buffer
+from app.utils.validators import ValidationError
+
+# Prefijo de los rooms de clientes que reciben new_messages; el separador de
+# control evita colisiones con session_id reales
+BATCH_ROOM_PREFIX = 'batch\x1f'
+
+
+def batch_room(session_id):
+    """
+    Room de los clientes de una sesión que reciben mensajes agrupados.
+    
+    Args:
+        session_id: ID de la sesión
+    
+    Returns:
+        Nombre del room
+    """
+    return BATCH_ROOM_PREFIX + session_id
+
+
+def session_rooms(session_id, batch):
+    """
+    Rooms de una sesión según el modo del cliente.
+    
+    Args:
+        session_id: ID de la sesión
+        batch: Si el cliente recibe mensajes agrupados
+    
+    Returns:
+        Tupla (room al que se une, room del otro modo)
+    """
+    if batch:
+        return batch_room(session_id), session_id
+    return session_id, batch_room(session_id)
 
 
 def register_websocket_handlers(socketio):
@@ -12,6 +53,7 @@ def register_websocket_handlers(socketio):
     Args:
         socketio: Instancia de SocketIO
     """
+    message_service = MessageService()
     
     @socketio.on('connect')
     def handle_connect():
@@ -28,13 +70,46 @@ def register_websocket_handlers(socketio):
         """
         Cliente se une a un room de sesión.
         
+        Con batch el cliente recibe un evento new_messages por ventana de
+        emisión, con todos los mensajes nuevos de la sesión, en lugar de un
+        new_message por mensaje.
+        
+        Con since_id (message_id del último mensaje recibido) o last_n, tras
+        joined el cliente recibe un evento history con los mensajes
+        anteriores, y solo después los mensajes en vivo: ninguno falta ni se
+        repite entre ambos. La garantía cubre solo las escrituras de este
+        proceso: con SOCKETIO_MESSAGE_QUEUE, los mensajes guardados en otro
+        worker durante el join pueden llegar en history y también en vivo,
+        o solo en vivo antes que history.
+        
         Args:
-            data: {'session_id': 'session-123'}
+            data: {'session_id': 'session-123', 'batch': false, 'since_id': 'msg-1', 'last_n': 50}
         """
         session_id = data.get('session_id')
-        if session_id:
-            join_room(session_id)
-            emit('joined', {'session_id': session_id})
+        if not session_id:
+            return
+        
+        batch = bool(data.get('batch'))
+        if 'since_id' not in data and 'last_n' not in data:
+            room, other_room = session_rooms(session_id, batch)
+            leave_room(other_room)
+            join_room(room)
+            emit('joined', {'session_id': session_id, 'batch': batch})
+            return
+        
+        try:
+            since_id, last_n = ValidationService.validate_replay(data)
+            # Sin escrituras en curso, la reproducción incluye justo los
+            # mensajes encolados para emitir antes de unirse al room
+            with replay_buffer.replay_point(session_id):
+                replay = message_service.get_replay(session_id, since_id, last_n)
+                emit('joined', {'session_id': session_id, 'batch': batch})
+                broadcast_dispatcher.run_in_order(
+                    session_id,
+                    partial(join_with_history, socketio, request.sid, session_id, batch, replay)
+                )
+        except ValidationError as error:
+            emit('error', error.to_dict())
     
     @socketio.on('leave')
     def handle_leave(data):
@@ -47,9 +122,33 @@ def register_websocket_handlers(socketio):
         session_id = data.get('session_id')
         if session_id:
             leave_room(session_id)
+            leave_room(batch_room(session_id))
             emit('left', {'session_id': session_id})
 
 
+def join_with_history(socketio, sid, session_id, batch, replay):
+    """
+    Une un cliente al room de la sesión y le emite history.
+    
+    Se ejecuta con BroadcastDispatcher.run_in_order: los mensajes de la
+    reproducción ya se emitieron al room y los siguientes aún no.
+    
+    Args:
+        socketio: Instancia de SocketIO
+        sid: ID de Socket.IO del cliente
+        session_id: ID de la sesión
+        batch: Si el cliente recibe mensajes agrupados
+        replay: Resultado de MessageService.get_replay
+    """
+    if not socketio.server.manager.is_connected(sid, '/'):
+        return
+    
+    room, other_room = session_rooms(session_id, batch)
+    socketio.server.leave_room(sid, other_room, namespace='/')
+    socketio.server.enter_room(sid, room, namespace='/')
+    socketio.emit('history', {'session_id': session_id, **replay}, room=sid)
+
+
 def emit_new_message(socketio, session_id, message_data):
     """
     Emite un nuevo mensaje a todos los clientes en el room de la sesión.
@@ -60,3 +159,53 @@ def emit_new_message(socketio, session_id, message_data):
         message_data: Datos del mensaje
     """
     socketio.emit('new_message', message_data, room=session_id)
+
+
+def emit_new_messages(socketio, session_id, messages):
+    """
+    Emite un grupo de mensajes de la misma sesión a su room.
+    
+    Args:
+        socketio: Instancia de SocketIO
+        session_id: ID de la sesión
+        messages: Lista de datos de mensajes, en orden de inserción
+    """
+    if not room_has_clients(socketio, session_id):
+        return
+    
+    for message_data in messages:
+        emit_new_message(socketio, session_id, message_data)
+
+
+def emit_message_batch(socketio, session_id, messages):
+    """
+    Emite un único evento new_messages con la lista de mensajes al room
+    agrupado de la sesión.
+    
+    El paquete se serializa una sola vez y se envía igual a cada cliente
+    del room.
+    
+    Args:
+        socketio: Instancia de SocketIO
+        session_id: ID de la sesión
+        messages: Lista de datos de mensajes, en orden de inserción
+    """
+    socketio.emit('new_messages', messages, room=batch_room(session_id))
+
+
+def room_has_clients(socketio, room):
+    """
+    Indica si algún cliente puede estar en un room.
+    
+    Permite no serializar mensajes para rooms vacíos. Con una cola de
+    mensajes entre workers, los clientes de otros procesos no son visibles
+    desde aquí y siempre se emite.
+    
+    Args:
+        socketio: Instancia de SocketIO
+        room: Nombre del room
+    """
+    manager = socketio.server.manager
+    if isinstance(manager, PubSubManager):
+        return True
+    return bool(manager.rooms.get('/', {}).get(room))
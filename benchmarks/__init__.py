@@ -0,0 +1 @@
+"""Paquete de benchmarks de rendimiento."""
@@ -0,0 +1,62 @@
+"""
+Benchmark de la emisión WebSocket de una ráfaga de mensajes a un room.
+Compara un new_message por mensaje frente a un new_messages por ventana,
+con clientes de prueba y sin enviar nada por red: se cuentan las tramas
+y se mide el tiempo de serialización y reparto del servidor.
+
+Uso:
+    python -m benchmarks.bench_broadcast [--clients 200] [--messages 500]
+"""
+import argparse
+import time
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=500)
+    args = parser.parse_args()
+    
+    from app import create_app, socketio
+    from app.services.broadcast_dispatcher import broadcast_dispatcher
+    
+    app = create_app('testing')
+    app.config.update(WS_BATCH_WINDOW_MS=1000, WS_BATCH_MAX_MESSAGES=args.messages)
+    messages = [
+        {
+            'message_id': f'bench-{i}',
+            'session_id': 'bench-room',
+            'content': f'Mensaje de prueba número {i} con algo de texto e información',
+            'timestamp': '2025-12-04T10:00:00Z',
+            'sender': 'user' if i % 2 == 0 else 'system',
+            'metadata': {'word_count': 10, 'character_count': 60, 'processed_at': '2025-12-04T10:00:00Z'}
+        }
+        for i in range(args.messages)
+    ]
+    
+    frames = []
+    socketio.server._send_eio_packet = lambda eio_sid, eio_pkt: frames.append(eio_pkt)
+    
+    print(f'{args.messages} mensajes a un room de {args.clients} clientes')
+    for label, batch in (('new_message', False), ('new_messages', True)):
+        broadcast_dispatcher.init_app(app)
+        clients = [socketio.test_client(app) for _ in range(args.clients)]
+        for ws_client in clients:
+            ws_client.emit('join', {'session_id': 'bench-room', 'batch': batch})
+        frames.clear()
+        
+        start = time.perf_counter()
+        for message in messages:
+            broadcast_dispatcher.dispatch('bench-room', [message])
+        broadcast_dispatcher.join()
+        elapsed = time.perf_counter() - start
+        
+        # WS_BATCH_MAX_MESSAGES cubre la ráfaga: el lote se emite sin esperar a la ventana
+        print(f'  {label:<14} {len(frames):8d} tramas {elapsed * 1000:10.1f} ms')
+        for ws_client in clients:
+            ws_client.disconnect()
+
+
+if __name__ == '__main__':
+    main()
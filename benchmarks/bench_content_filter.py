@@ -0,0 +1,73 @@
+"""
+Benchmark del filtro de contenido.
+Compara el bucle original de str.replace con el motor compilado.
+
+Uso:
+    python -m benchmarks.bench_content_filter [--terms 20000] [--messages 2000]
+"""
+import argparse
+import random
+import string
+import time
+from app.services.content_filter import ContentFilter, DEFAULT_BLOCKLIST
+
+
+def legacy_filter(content, bad_words):
+    """Implementación original: tres str.replace por término."""
+    filtered_content = content
+    for bad_word in bad_words:
+        filtered_content = filtered_content.replace(bad_word, '*' * len(bad_word))
+        filtered_content = filtered_content.replace(bad_word.capitalize(), '*' * len(bad_word))
+        filtered_content = filtered_content.replace(bad_word.upper(), '*' * len(bad_word))
+    return filtered_content
+
+
+def random_word(rng, min_length=4, max_length=12):
+    """Genera una palabra aleatoria en minúsculas."""
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_length, max_length)))
+
+
+def build_messages(rng, terms, count, words_per_message=40):
+    """Genera mensajes con algunos términos prohibidos intercalados."""
+    messages = []
+    for _ in range(count):
+        words = [random_word(rng, 2, 9) for _ in range(words_per_message)]
+        for _ in range(2):
+            words[rng.randrange(len(words))] = rng.choice(terms).capitalize()
+        messages.append(' '.join(words))
+    return messages
+
+
+def timed(label, func, messages):
+    """Ejecuta func sobre todos los mensajes y muestra el tiempo por mensaje."""
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    elapsed = time.perf_counter() - start
+    print(f'  {label:<10} {elapsed * 1000:10.1f} ms total  {elapsed / len(messages) * 1e6:10.1f} µs/mensaje')
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--terms', type=int, nargs='+', default=[4, 1000, 20000])
+    parser.add_argument('--messages', type=int, default=2000)
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    
+    for term_count in args.terms:
+        terms = list(DEFAULT_BLOCKLIST) + [random_word(rng) for _ in range(max(term_count - len(DEFAULT_BLOCKLIST), 0))]
+        messages = build_messages(rng, terms, args.messages)
+        
+        start = time.perf_counter()
+        engine = ContentFilter(terms)
+        compile_ms = (time.perf_counter() - start) * 1000
+        
+        print(f'{len(terms)} términos, {len(messages)} mensajes (compilación: {compile_ms:.1f} ms)')
+        timed('legacy', lambda message: legacy_filter(message, terms), messages)
+        timed('compilado', engine.filter, messages)
+
+
+if __name__ == '__main__':
+    main()
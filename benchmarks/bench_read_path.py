@@ -0,0 +1,51 @@
+"""
+Benchmark del camino de lectura: ORM frente a SQLAlchemy Core.
+Mide la lectura de una página de 100 mensajes convertida con to_dict()
+y el endpoint GET /api/messages/<session_id>?limit=100 completo.
+
+Uso:
+    python -m benchmarks.bench_read_path [--requests 1000]
+"""
+import argparse
+from benchmarks.bench_serialization import populate, timed
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+    
+    from app import create_app, db, limiter
+    from app.utils.rate_limit import token_bucket_limiter
+    from app.repositories.message_repository import MessageRepository
+    from app.utils.cache import session_page_cache
+    
+    app = create_app('testing')
+    session_page_cache.enabled = False
+    limiter.enabled = False
+    token_bucket_limiter.enabled = False
+    client = app.test_client()
+    session_id = 'bench-session'
+    url = f'/api/messages/{session_id}?limit=100'
+    repository = MessageRepository()
+    
+    with app.app_context():
+        populate(client, session_id)
+        
+        def read_page():
+            messages = repository.get_messages_by_session(session_id, limit=100)
+            result = [message.to_dict() for message in messages]
+            # Cada solicitud real termina con una sesión nueva
+            db.session.remove()
+            return result
+        
+        for mode in ('orm', 'core'):
+            app.config['REPOSITORY_READ_MODE'] = mode
+            print(f'REPOSITORY_READ_MODE={mode}')
+            timed('lectura+to_dict', read_page, args.requests)
+            timed('endpoint', lambda: client.get(url), args.requests)
+
+
+if __name__ == '__main__':
+    main()
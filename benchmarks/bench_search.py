@@ -0,0 +1,119 @@
+"""
+Benchmark de la búsqueda de mensajes.
+Compara LIKE con el índice FTS5 sobre una sesión con muchos mensajes.
+
+Uso:
+    python -m benchmarks.bench_search [--messages 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+
+# Consultas con distinta selectividad: término raro, común y dos términos
+QUERIES = ['facturacion', 'ayuda', 'cuenta bloqueada']
+
+# Vocabulario de relleno de los mensajes generados
+COMMON_WORDS = ['ayuda', 'cuenta', 'pedido', 'envio', 'producto', 'gracias', 'hola', 'problema']
+
+
+def random_word(rng, min_length=3, max_length=9):
+    """Genera una palabra aleatoria en minúsculas."""
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_length, max_length)))
+
+
+def build_rows(rng, count, session_id, words_per_message=12):
+    """Genera filas de mensajes listas para un INSERT masivo."""
+    for index in range(count):
+        words = [random_word(rng) for _ in range(words_per_message)]
+        for _ in range(2):
+            words[rng.randrange(len(words))] = rng.choice(COMMON_WORDS)
+        if rng.random() < 0.001:
+            words[rng.randrange(len(words))] = 'facturacion'
+        if rng.random() < 0.01:
+            words[-2:] = ['cuenta', 'bloqueada']
+        content = ' '.join(words)
+        yield {
+            'message_id': f'bench-{index}',
+            'session_id': session_id,
+            'content': content,
+            'timestamp': '2025-12-04T10:00:00Z',
+            'timestamp_epoch_ms': 1764842400000,
+            'sender': 'user',
+            'word_count': words_per_message,
+            'character_count': len(content),
+            'processed_at': '2025-12-04T10:00:01Z'
+        }
+
+
+def populate(db, Message, rows, chunk_size=20000):
+    """Inserta las filas en bloques para acotar la memoria."""
+    from sqlalchemy import insert
+    
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(insert(Message), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(insert(Message), chunk)
+        db.session.commit()
+
+
+def timed(label, func, repeat):
+    """Ejecuta func varias veces y muestra el mejor tiempo."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'  {label:<6} {best * 1000:10.1f} ms  ({result} resultados)')
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='bench-search-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    
+    from app import create_app, db
+    from app.models import Message
+    from app.repositories.message_repository import MessageRepository
+    
+    app = create_app('production')
+    session_id = 'bench-session'
+    
+    with app.app_context():
+        start = time.perf_counter()
+        populate(db, Message, build_rows(random.Random(42), args.messages, session_id))
+        print(f'{args.messages} mensajes insertados en {time.perf_counter() - start:.1f} s')
+        
+        repository = MessageRepository()
+        for text_query in QUERIES:
+            filters = {'query': text_query}
+            print(f'q="{text_query}" (primera página de 10 + total)')
+            
+            for label, enabled in (('LIKE', False), ('FTS5', True)):
+                app.config['SEARCH_FULL_TEXT_ENABLED'] = enabled
+                repository.detect_full_text_search()
+                
+                def run():
+                    _, total, _ = repository.search_messages_page(session_id, filters, limit=10)
+                    return total
+                
+                timed(label, run, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
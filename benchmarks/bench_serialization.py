@@ -0,0 +1,80 @@
+"""
+Microbenchmark del endpoint de listado según el backend JSON.
+Mide GET /api/messages/<session_id>?limit=100 con la caché de páginas
+desactivada, y por separado solo la serialización del cuerpo.
+
+Uso:
+    python -m benchmarks.bench_serialization [--requests 500]
+"""
+import argparse
+import time
+
+
+# (etiqueta, JSON_BACKEND, JSON_COMPACT)
+VARIANTS = [
+    ('json indentado', 'json', False),
+    ('json compacto', 'json', True),
+    ('orjson compacto', 'orjson', True),
+]
+
+
+def populate(client, session_id, count=100):
+    """Crea una sesión con count mensajes."""
+    batch = [
+        {
+            'message_id': f'bench-{i}',
+            'session_id': session_id,
+            'content': f'Mensaje de prueba número {i} con algo de texto e información',
+            'timestamp': '2025-12-04T10:00:00Z',
+            'sender': 'user' if i % 2 == 0 else 'system'
+        }
+        for i in range(count)
+    ]
+    client.post('/api/messages/batch', json=batch)
+
+
+def timed(label, func, repeat):
+    """Ejecuta func repeat veces y muestra el tiempo medio."""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f'  {label:<18} {elapsed / repeat * 1e6:10.1f} µs/solicitud')
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    
+    from app import create_app, limiter
+    from app.utils.rate_limit import token_bucket_limiter
+    from app.utils.cache import session_page_cache
+    from app.utils.serialization import init_json
+    
+    app = create_app('testing')
+    session_page_cache.enabled = False
+    limiter.enabled = False
+    token_bucket_limiter.enabled = False
+    client = app.test_client()
+    session_id = 'bench-session'
+    url = f'/api/messages/{session_id}?limit=100'
+    
+    with app.app_context():
+        populate(client, session_id)
+        body = client.get(url).get_json()
+        
+        for label, backend, compact in VARIANTS:
+            app.config.update(JSON_BACKEND=backend, JSON_COMPACT=compact)
+            init_json(app)
+            size = len(client.get(url).get_data())
+            
+            print(f'{label} ({size} bytes)')
+            timed('endpoint', lambda: client.get(url), args.requests)
+            timed('serialización', lambda: app.json.response(body), args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark de la lectura de varias sesiones.
+Compara una solicitud GET /api/messages/<session_id> (con su total) por
+sesión frente a una sola solicitud POST /api/messages/sessions.
+
+Uso:
+    python -m benchmarks.bench_sessions_read [--sessions 40] [--messages 500] [--requests 50]
+"""
+import argparse
+from benchmarks.bench_serialization import timed
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+    
+    from app import create_app, limiter
+    from app.utils.rate_limit import token_bucket_limiter
+    from app.utils.cache import session_page_cache
+    
+    app = create_app('testing')
+    session_page_cache.enabled = False
+    limiter.enabled = False
+    token_bucket_limiter.enabled = False
+    client = app.test_client()
+    session_ids = [f'bench-session-{s}' for s in range(args.sessions)]
+    
+    with app.app_context():
+        app.config['BATCH_MAX_SIZE'] = args.messages
+        for session_id in session_ids:
+            client.post('/api/messages/batch', json=[
+                {
+                    'message_id': f'{session_id}-{i}',
+                    'session_id': session_id,
+                    'content': f'Mensaje de prueba número {i}',
+                    'timestamp': '2025-12-04T10:00:00Z',
+                    'sender': 'user' if i % 2 == 0 else 'system'
+                }
+                for i in range(args.messages)
+            ])
+        
+        def one_per_session():
+            for session_id in session_ids:
+                client.get(f'/api/messages/{session_id}?limit=20')
+        
+        body = {'sessions': [{'session_id': session_id, 'limit': 20} for session_id in session_ids]}
+        
+        print(f'{args.sessions} sesiones de {args.messages} mensajes, 20 por página')
+        timed('una por sesión', one_per_session, args.requests)
+        timed('lectura múltiple', lambda: client.post('/api/messages/sessions', json=body), args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ Módulo de configuración para la aplicación Chat API.
 Maneja diferentes configuraciones de entorno (development, testing, production).
 """
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent
@@ -16,7 +17,122 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JSON_SORT_KEYS = False
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    
+    # Serialización JSON: 'auto' usa orjson si está instalado, 'json' la librería estándar.
+    # JSON_COMPACT=None indenta las respuestas solo en modo debug.
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+    JSON_COMPACT = None
+    
+    # Archivo opcional con términos prohibidos adicionales (uno por línea)
+    CONTENT_FILTER_BLOCKLIST_PATH = os.environ.get('CONTENT_FILTER_BLOCKLIST_PATH')
+    
+    # Número máximo de mensajes aceptados por POST /api/messages/batch
+    BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 500))
+    
+    # Número máximo de sesiones por POST /api/messages/sessions (lectura de varias sesiones)
+    SESSIONS_READ_MAX_SESSIONS = int(os.environ.get('SESSIONS_READ_MAX_SESSIONS', 100))
+    
+    # Importación NDJSON: mensajes por transacción y tamaño máximo de línea
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+    IMPORT_MAX_LINE_BYTES = int(os.environ.get('IMPORT_MAX_LINE_BYTES', 1024 * 1024))
+    
+    # Mensajes leídos por bloque al exportar una sesión (GET .../export)
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    
+    # Group commit: agrupa escrituras concurrentes en una sola transacción.
+    # Cambia unos milisegundos de latencia por mucho mayor throughput de ingesta.
+    GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() == 'true'
+    GROUP_COMMIT_WINDOW_MS = float(os.environ.get('GROUP_COMMIT_WINDOW_MS', 5))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 64))
+    
+    # Ingesta asíncrona: POST /api/messages responde 202 y un pool de workers
+    # guarda los mensajes. Con la cola llena la API responde 503.
+    ASYNC_INGESTION_ENABLED = os.environ.get('ASYNC_INGESTION_ENABLED', 'false').lower() == 'true'
+    INGESTION_QUEUE_SIZE = int(os.environ.get('INGESTION_QUEUE_SIZE', 1000))
+    INGESTION_WORKERS = int(os.environ.get('INGESTION_WORKERS', 2))
+    INGESTION_STATUS_RETENTION = int(os.environ.get('INGESTION_STATUS_RETENTION', 10000))
+    
+    # Long-polling (GET /api/messages/<session_id>/since/<last_id>): espera por
+    # defecto y máxima, en segundos, antes de responder sin mensajes nuevos
+    LONG_POLL_TIMEOUT_SECONDS = float(os.environ.get('LONG_POLL_TIMEOUT_SECONDS', 25))
+    LONG_POLL_MAX_TIMEOUT_SECONDS = float(os.environ.get('LONG_POLL_MAX_TIMEOUT_SECONDS', 60))
+    # Con SOCKETIO_MESSAGE_QUEUE la notificación no cruza procesos: la espera
+    # vuelve a consultar la base de datos cada tantos segundos
+    LONG_POLL_RECHECK_SECONDS = float(os.environ.get('LONG_POLL_RECHECK_SECONDS', 2))
+    
+    # Emisión WebSocket en segundo plano: las solicitudes encolan los mensajes
+    # nuevos y WS_DISPATCHER_WORKERS hilos los emiten a los rooms. Con la cola
+    # de un hilo llena (WS_DISPATCHER_QUEUE_SIZE lotes), WS_DISPATCHER_OVERFLOW
+    # decide: 'block' espera hasta WS_DISPATCHER_BLOCK_TIMEOUT_SECONDS, 'drop'
+    # descarta y 'coalesce' une los mensajes al lote pendiente de su sesión
+    WS_DISPATCHER_ENABLED = os.environ.get('WS_DISPATCHER_ENABLED', 'true').lower() == 'true'
+    WS_DISPATCHER_WORKERS = int(os.environ.get('WS_DISPATCHER_WORKERS', 1))
+    WS_DISPATCHER_QUEUE_SIZE = int(os.environ.get('WS_DISPATCHER_QUEUE_SIZE', 10000))
+    WS_DISPATCHER_OVERFLOW = os.environ.get('WS_DISPATCHER_OVERFLOW', 'coalesce')
+    WS_DISPATCHER_BLOCK_TIMEOUT_SECONDS = float(os.environ.get('WS_DISPATCHER_BLOCK_TIMEOUT_SECONDS', 1))
+    
+    # Clientes en modo agrupado (join con batch): los mensajes de su sesión se
+    # emiten en un solo new_messages cada WS_BATCH_WINDOW_MS milisegundos, o
+    # antes si se reúnen WS_BATCH_MAX_MESSAGES
+    WS_BATCH_WINDOW_MS = float(os.environ.get('WS_BATCH_WINDOW_MS', 50))
+    WS_BATCH_MAX_MESSAGES = int(os.environ.get('WS_BATCH_MAX_MESSAGES', 500))
+    
+    # Reproducción al unirse con since_id o last_n: los últimos
+    # WS_REPLAY_BUFFER_SIZE mensajes de las WS_REPLAY_MAX_SESSIONS sesiones más
+    # recientes se guardan en memoria; los rangos más antiguos se leen de la
+    # base de datos. Como mucho WS_REPLAY_MAX_MESSAGES mensajes por join
+    WS_REPLAY_BUFFER_ENABLED = os.environ.get('WS_REPLAY_BUFFER_ENABLED', 'true').lower() == 'true'
+    WS_REPLAY_BUFFER_SIZE = int(os.environ.get('WS_REPLAY_BUFFER_SIZE', 200))
+    WS_REPLAY_MAX_SESSIONS = int(os.environ.get('WS_REPLAY_MAX_SESSIONS', 1000))
+    WS_REPLAY_MAX_MESSAGES = int(os.environ.get('WS_REPLAY_MAX_MESSAGES', 500))
+    
+    # Cola de mensajes entre workers para las emisiones a rooms. Sin valor,
+    # un solo proceso. unix:///ruta/socketio.sock usa el broker local incluido;
+    # redis://, kafka://, zmq+tcp:// o amqp:// usan un broker externo. Todos
+    # los workers deben compartir URL y canal
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    
+    # Caché de lectura de páginas por sesión (GET /api/messages/<session_id>)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 2048))
+    PAGE_CACHE_TTL_SECONDS = float(os.environ.get('PAGE_CACHE_TTL_SECONDS', 30))
+    
+    # Caché en memoria de API Keys validadas; una key revocada se elimina de
+    # inmediato en el proceso que la revoca y, en los demás, al expirar el TTL
+    API_KEY_CACHE_ENABLED = os.environ.get('API_KEY_CACHE_ENABLED', 'true').lower() == 'true'
+    API_KEY_CACHE_TTL_SECONDS = float(os.environ.get('API_KEY_CACHE_TTL_SECONDS', 60))
+    API_KEY_CACHE_MAX_ENTRIES = int(os.environ.get('API_KEY_CACHE_MAX_ENTRIES', 10000))
+    
+    # Segundos entre escrituras por lotes de api_keys.last_used_at (0: escribir en cada uso)
+    API_KEY_LAST_USED_FLUSH_SECONDS = float(os.environ.get('API_KEY_LAST_USED_FLUSH_SECONDS', 5))
+    
+    # Contadores de rate limiting compartidos por todos los workers del host
+    # (archivo SQLite en modo WAL en el directorio temporal, fuera del
+    # código fuente; también admite memory:// o redis://)
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or \
+        f'sqlite:///{Path(tempfile.gettempdir()) / "chat_api_rate_limits.db"}'
+    
+    # Cuota global por API Key (o por IP sin key) con token bucket; las keys
+    # pueden definir la suya en rate_limit_per_minute y rate_limit_burst
+    RATE_LIMIT_TOKEN_BUCKET_ENABLED = os.environ.get('RATE_LIMIT_TOKEN_BUCKET_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_PER_MINUTE = int(os.environ.get('RATE_LIMIT_PER_MINUTE', 100))
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 0)) or None
+    
+    # Filtro Bloom de message_ids para rechazar duplicados sin abrir transacción
+    DUPLICATE_FILTER_ENABLED = os.environ.get('DUPLICATE_FILTER_ENABLED', 'true').lower() == 'true'
+    DUPLICATE_FILTER_CAPACITY = int(os.environ.get('DUPLICATE_FILTER_CAPACITY', 1000000))
+    DUPLICATE_FILTER_ERROR_RATE = float(os.environ.get('DUPLICATE_FILTER_ERROR_RATE', 0.001))
+    
+    # Lecturas de mensajes: 'core' construye registros ligeros (MessageRecord) con
+    # SQLAlchemy Core; 'orm' hidrata instancias Message
+    REPOSITORY_READ_MODE = os.environ.get('REPOSITORY_READ_MODE', 'core')
+    
+    # Búsqueda de texto completo con SQLite FTS5; sin FTS5 se usa LIKE
+    SEARCH_FULL_TEXT_ENABLED = os.environ.get('SEARCH_FULL_TEXT_ENABLED', 'true').lower() == 'true'
+    
+    # Filas que cuenta como máximo la búsqueda con count=estimate
+    SEARCH_COUNT_ESTIMATE_CAP = int(os.environ.get('SEARCH_COUNT_ESTIMATE_CAP', 1000))
 
 
 class DevelopmentConfig(Config):
@@ -34,6 +150,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SQLALCHEMY_ECHO = False
+    DUPLICATE_FILTER_CAPACITY = 10000
+    API_KEY_LAST_USED_FLUSH_SECONDS = 0
+    RATELIMIT_STORAGE_URI = 'sqlite:///:memory:'
+    SOCKETIO_MESSAGE_QUEUE = None
 
 
 class ProductionConfig(Config):
@@ -43,6 +163,7 @@ class ProductionConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{BASE_DIR / "chat_prod.db"}'
     SQLALCHEMY_ECHO = False
+    JSON_COMPACT = True
 
 
 config = {
@@ -6,4 +6,4 @@ env = os.environ.get('FLASK_ENV', 'development')
 app = create_app(env)
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=7000, debug=True)
+    socketio.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 7000)), debug=True)
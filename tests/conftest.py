@@ -2,6 +2,7 @@
 Configuración de Pytest y fixtures.
 Provee fixtures de prueba para la suite de tests.
 """
+import json
 import pytest
 from app import create_app, db
 
@@ -84,3 +85,83 @@ def socketio(app):
     """
     from app import socketio
     return socketio
+
+
+def _build_message(message_id, session_id='test-session', **overrides):
+    """Construye un mensaje válido; overrides reemplaza o agrega campos."""
+    message = {
+        'message_id': message_id,
+        'session_id': session_id,
+        'content': f'Mensaje {message_id}',
+        'timestamp': '2025-12-04T10:00:00Z',
+        'sender': 'user'
+    }
+    message.update(overrides)
+    return message
+
+
+@pytest.fixture
+def make_message():
+    """
+    Proporciona una función que construye mensajes válidos.
+    
+    Returns:
+        Función (message_id, session_id='test-session', **campos) -> diccionario
+    """
+    return _build_message
+
+
+@pytest.fixture
+def post_message(client):
+    """
+    Proporciona una función que crea un mensaje mediante POST /api/messages.
+    
+    Args:
+        client: Fixture de cliente de prueba, usado si no se indica otro
+        
+    Returns:
+        Función (message_id, session_id='test-session', client=None, **campos) -> respuesta
+    """
+    default_client = client
+    
+    def post(message_id, session_id='test-session', client=None, **overrides):
+        return (client or default_client).post(
+            '/api/messages',
+            data=json.dumps(_build_message(message_id, session_id, **overrides)),
+            content_type='application/json'
+        )
+    
+    return post
+
+
+@pytest.fixture
+def seed_session(client):
+    """
+    Proporciona una función que crea una sesión con un lote de mensajes.
+    
+    Los message_id son '<prefix>-<i>' (prefix es por defecto el session_id)
+    y el remitente alterna entre user (i par) y system (i impar).
+    
+    Args:
+        client: Fixture de cliente de prueba
+        
+    Returns:
+        Función (session_id, count, prefix=None, content='Mensaje {i}') -> session_id;
+        content es una plantilla con {i} o una función que recibe i
+    """
+    def seed(session_id, count, prefix=None, content='Mensaje {i}'):
+        render = content if callable(content) else lambda i: content.format(i=i)
+        batch = [
+            _build_message(
+                f'{prefix or session_id}-{i}',
+                session_id,
+                content=render(i),
+                sender='user' if i % 2 == 0 else 'system'
+            )
+            for i in range(count)
+        ]
+        response = client.post('/api/messages/batch', data=json.dumps(batch), content_type='application/json')
+        assert response.status_code == 201
+        return session_id
+    
+    return seed
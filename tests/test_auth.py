@@ -152,3 +152,121 @@ class TestAPIKeyListing:
             
             keys = list_api_keys()
             assert len(keys) == 2
+
+
+class TestAPIKeyCache:
+    """Tests para la caché de validación y la escritura diferida de last_used_at."""
+    
+    @staticmethod
+    def _count_statements(app, func):
+        """Ejecuta func y retorna las sentencias SQL emitidas."""
+        from sqlalchemy import event
+        from app import db
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return statements
+    
+    @staticmethod
+    def _stored_last_used_at(key_id):
+        """Lee last_used_at directamente de la base de datos."""
+        from app import db
+        return db.session.execute(
+            db.select(APIKey.last_used_at).where(APIKey.id == key_id)
+        ).scalar_one()
+    
+    @pytest.fixture
+    def buffered(self, monkeypatch):
+        """Activa la escritura diferida con un intervalo que no vence durante el test."""
+        from app.services.api_key_cache import last_used_buffer
+        monkeypatch.setattr(last_used_buffer, 'interval', 3600)
+        return last_used_buffer
+    
+    def test_repeated_validation_skips_database(self, app, buffered):
+        """Verifica que una key ya validada no vuelva a consultar la base de datos."""
+        with app.app_context():
+            api_key_plain, _ = create_api_key("Cached Key")
+            validate_api_key(api_key_plain)
+            
+            statements = self._count_statements(app, lambda: validate_api_key(api_key_plain))
+            
+            assert statements == []
+    
+    def test_revoke_invalidates_cached_key(self, app):
+        """Verifica que una key revocada se rechace aunque estuviera en caché."""
+        with app.app_context():
+            api_key_plain, api_key_obj = create_api_key("Cached Key")
+            assert validate_api_key(api_key_plain) is not None
+            
+            revoke_api_key(api_key_obj.id)
+            
+            assert validate_api_key(api_key_plain) is None
+    
+    def test_stale_validation_is_not_cached(self):
+        """Verifica que una lectura anterior a una invalidación no se guarde."""
+        from app.services.api_key_cache import APIKeyCache, CachedAPIKey
+        cache = APIKeyCache()
+        cache.enabled, cache.ttl_seconds, cache.max_entries = True, 60, 10
+        
+        generation = cache.generation()
+        cache.invalidate('hash')
+        cache.set('hash', CachedAPIKey(1, 'Key', 'hash', None), generation)
+        
+        assert cache.get('hash') is None
+    
+    def test_last_used_at_is_written_behind(self, app, buffered):
+        """Verifica que last_used_at se escriba en lote al vaciar el buffer."""
+        with app.app_context():
+            api_key_plain, api_key_obj = create_api_key("Buffered Key")
+            
+            validated = validate_api_key(api_key_plain)
+            validate_api_key(api_key_plain)
+            
+            assert self._stored_last_used_at(api_key_obj.id) is None
+            assert buffered.pending() == 1
+            
+            assert buffered.flush() == 1
+            assert self._stored_last_used_at(api_key_obj.id) == validated.last_used_at.replace(tzinfo=None)
+    
+    def test_flush_never_moves_last_used_at_back(self, app, buffered):
+        """Verifica que una fecha anterior no sobrescriba una más reciente."""
+        from datetime import datetime, timedelta
+        with app.app_context():
+            _, api_key_obj = create_api_key("Buffered Key")
+            now = datetime.now()
+            
+            buffered.record(api_key_obj.id, now)
+            buffered.flush()
+            buffered.record(api_key_obj.id, now - timedelta(minutes=5))
+            buffered.flush()
+            
+            assert self._stored_last_used_at(api_key_obj.id) == now
+    
+    def test_authenticated_requests_do_not_write(self, app, client, buffered):
+        """Verifica que las solicitudes autenticadas no escriban en api_keys."""
+        with app.app_context():
+            api_key_plain, _ = create_api_key("Reader Key")
+        
+        def read_twice():
+            for _ in range(2):
+                client.get('/api/messages/session-x', headers={'X-API-Key': api_key_plain})
+        
+        statements = self._count_statements(app, read_twice)
+        
+        assert not [statement for statement in statements if 'api_keys' in statement and 'UPDATE' in statement]
+        assert len([statement for statement in statements if 'api_keys' in statement]) == 1
+    
+    def test_list_flushes_pending_usage(self, app, buffered):
+        """Verifica que el listado incluya los usos aún no escritos."""
+        with app.app_context():
+            api_key_plain, _ = create_api_key("Listed Key")
+            validate_api_key(api_key_plain)
+            
+            keys = list_api_keys()
+            
+            assert keys[0].last_used_at is not None
+            assert buffered.pending() == 0
@@ -0,0 +1,180 @@
+"""
+Tests para la ingesta de mensajes por lotes.
+"""
+import json
+from app.models import Message
+from app.repositories.message_repository import MessageRepository
+from app.utils.validators import ValidationError
+
+
+# Metadatos que normalmente agrega MessageService, para guardar directo en el repositorio
+_METADATA = {
+    'timestamp_epoch_ms': 1764842400000,
+    'word_count': 4,
+    'character_count': 18,
+    'processed_at': '2025-12-04T10:00:01Z'
+}
+
+
+class TestBatchEndpoint:
+    """Tests para el endpoint POST /api/messages/batch."""
+    
+    def test_batch_all_success(self, client, make_message):
+        """Verifica que un lote válido se guarde completo."""
+        batch = [make_message(f'batch-{i}', 'batch-session') for i in range(5)]
+        
+        response = client.post(
+            '/api/messages/batch',
+            data=json.dumps(batch),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 201
+        data = json.loads(response.data)
+        
+        assert data['status'] == 'success'
+        assert data['summary'] == {'received': 5, 'saved': 5, 'failed': 0}
+        assert [item['data']['message_id'] for item in data['data']] == [f'batch-{i}' for i in range(5)]
+        
+        response = client.get('/api/messages/batch-session?limit=10')
+        assert json.loads(response.data)['pagination']['total'] == 5
+    
+    def test_batch_reports_errors_per_item(self, client, sample_message, make_message):
+        """Verifica que los errores se reporten por elemento sin revertir el lote."""
+        client.post(
+            '/api/messages',
+            data=json.dumps(sample_message),
+            content_type='application/json'
+        )
+        
+        batch = [
+            make_message('batch-0', 'batch-session'),
+            make_message('batch-1', 'batch-session', sender='invalid'),
+            make_message(sample_message['message_id'], 'batch-session'),
+            make_message('batch-3', 'batch-session'),
+            make_message('batch-3', 'batch-session')
+        ]
+        
+        response = client.post(
+            '/api/messages/batch',
+            data=json.dumps(batch),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 207
+        data = json.loads(response.data)
+        
+        assert data['status'] == 'partial'
+        assert data['summary'] == {'received': 5, 'saved': 2, 'failed': 3}
+        
+        statuses = [item['status'] for item in data['data']]
+        assert statuses == ['success', 'error', 'error', 'success', 'error']
+        assert data['data'][1]['error']['code'] == 'INVALID_SENDER'
+        assert data['data'][2]['error']['code'] == 'DUPLICATE_MESSAGE_ID'
+        assert data['data'][4]['error']['code'] == 'DUPLICATE_MESSAGE_ID'
+    
+    def test_batch_invalid_format(self, client, sample_message):
+        """Verifica que el cuerpo deba ser una lista."""
+        response = client.post(
+            '/api/messages/batch',
+            data=json.dumps(sample_message),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_FORMAT'
+    
+    def test_batch_empty(self, client):
+        """Verifica que un lote vacío sea rechazado."""
+        response = client.post(
+            '/api/messages/batch',
+            data=json.dumps([]),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'EMPTY_BATCH'
+    
+    def test_batch_too_large(self, app, client, make_message):
+        """Verifica el límite de tamaño del lote."""
+        app.config['BATCH_MAX_SIZE'] = 2
+        batch = [make_message(f'batch-{i}', 'batch-session') for i in range(3)]
+        
+        response = client.post(
+            '/api/messages/batch',
+            data=json.dumps(batch),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'BATCH_TOO_LARGE'
+
+
+class TestBulkRepository:
+    """Tests para el guardado masivo del repositorio."""
+    
+    def test_save_messages_bulk_returns_ids(self, app, make_message):
+        """Verifica que los mensajes guardados reciban su ID de base de datos."""
+        service_rows = [
+            make_message(f'batch-{i}', 'batch-session', **_METADATA)
+            for i in range(3)
+        ]
+        
+        results = MessageRepository().save_messages_bulk(service_rows)
+        
+        assert all(isinstance(result, Message) for result in results)
+        assert [result.id for result in results] == sorted(result.id for result in results)
+        assert Message.query.count() == 3
+
+
+class TestGroupCommit:
+    """Tests para el modo group commit de save_message."""
+    
+    def _save_concurrently(self, app, messages):
+        """Llama a save_message desde varios hilos a la vez."""
+        import threading
+        
+        barrier = threading.Barrier(len(messages))
+        outcomes = [None] * len(messages)
+        
+        def worker(index, message_data):
+            with app.app_context():
+                barrier.wait()
+                try:
+                    outcomes[index] = MessageRepository().save_message(message_data).message_id
+                except ValidationError as error:
+                    outcomes[index] = error.code
+        
+        threads = [threading.Thread(target=worker, args=item) for item in enumerate(messages)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        return outcomes
+    
+    def test_group_commit_saves_concurrent_messages(self, app, make_message):
+        """Verifica que las escrituras concurrentes se guarden y cada hilo reciba su resultado."""
+        app.config.update(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=50, GROUP_COMMIT_MAX_BATCH=100)
+        messages = [
+            make_message(f'batch-{i}', 'batch-session', **_METADATA)
+            for i in range(6)
+        ]
+        messages.append(dict(messages[0]))
+        
+        outcomes = self._save_concurrently(app, messages)
+        
+        assert sorted(outcomes) == sorted([f'batch-{i}' for i in range(6)] + ['DUPLICATE_MESSAGE_ID'])
+        assert Message.query.count() == 6
+    
+    def test_group_commit_closes_full_batch(self, app, make_message):
+        """Verifica que un lote lleno se escriba sin esperar la ventana."""
+        app.config.update(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=10000, GROUP_COMMIT_MAX_BATCH=3)
+        messages = [
+            make_message(f'batch-{i}', 'batch-session', **_METADATA)
+            for i in range(3)
+        ]
+        
+        outcomes = self._save_concurrently(app, messages)
+        
+        assert sorted(outcomes) == ['batch-0', 'batch-1', 'batch-2']
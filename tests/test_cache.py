@@ -0,0 +1,93 @@
+"""
+Tests para la caché de páginas por sesión.
+"""
+import json
+from app.utils.cache import SessionPageCache, session_page_cache
+
+
+class TestSessionPageCacheEndpoint:
+    """Tests de la caché a través de GET /api/messages/<session_id>."""
+    
+    def test_hit_after_first_read(self, client, post_message):
+        """Verifica que la segunda lectura se sirva desde la caché."""
+        post_message('cache-1', 'cache-a')
+        
+        first = client.get('/api/messages/cache-a')
+        second = client.get('/api/messages/cache-a')
+        
+        assert first.data == second.data
+        stats = json.loads(client.get('/api/stats/cache').data)['data']
+        assert (stats['hits'], stats['misses']) == (1, 1)
+    
+    def test_insert_invalidates_only_its_session(self, client, post_message):
+        """Verifica que una inserción invalide solo la sesión afectada."""
+        post_message('cache-1', 'cache-a')
+        post_message('cache-2', 'cache-b')
+        client.get('/api/messages/cache-a')
+        client.get('/api/messages/cache-b')
+        
+        post_message('cache-3', 'cache-a')
+        
+        data = json.loads(client.get('/api/messages/cache-a').data)
+        assert data['pagination']['total'] == 2
+        client.get('/api/messages/cache-b')
+        
+        stats = session_page_cache.stats()
+        assert (stats['hits'], stats['misses']) == (1, 3)
+    
+    def test_cached_page_matches_its_etag(self, client, post_message, monkeypatch):
+        """Verifica que no se sirva una página guardada con el ETag de una escritura posterior."""
+        post_message('cache-1', 'cache-a')
+        first = client.get('/api/messages/cache-a')
+        
+        # Escritura confirmada sin invalidar la caché, como en otro worker
+        monkeypatch.setattr(session_page_cache, 'invalidate_session', lambda session_id: None)
+        post_message('cache-2', 'cache-a')
+        second = client.get('/api/messages/cache-a')
+        
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert [m['message_id'] for m in json.loads(second.data)['data']] == ['cache-1', 'cache-2']
+        third = client.get('/api/messages/cache-a', headers={'If-None-Match': second.headers['ETag']})
+        assert third.status_code == 304
+
+
+class TestSessionPageCache:
+    """Tests unitarios de SessionPageCache."""
+    
+    def _cache(self, max_entries=2):
+        """Crea una caché activada."""
+        cache = SessionPageCache()
+        cache.enabled = True
+        cache.max_entries = max_entries
+        cache.ttl_seconds = 60
+        return cache
+    
+    def test_lru_eviction(self):
+        """Verifica que se descarte la entrada usada hace más tiempo."""
+        cache = self._cache()
+        cache.set(('s', 1), b'uno', 0)
+        cache.set(('s', 2), b'dos', 0)
+        cache.get(('s', 1))
+        cache.set(('s', 3), b'tres', 0)
+        
+        assert cache.get(('s', 2)) is None
+        assert cache.get(('s', 1)) == b'uno'
+        assert cache.stats()['evictions'] == 1
+    
+    def test_stale_read_not_stored(self):
+        """Verifica que una lectura iniciada antes de una invalidación no se guarde."""
+        cache = self._cache()
+        generation = cache.generation('s')
+        cache.invalidate_session('s')
+        
+        cache.set(('s', 1), b'obsoleto', generation)
+        
+        assert cache.get(('s', 1)) is None
+    
+    def test_ttl_expiration(self):
+        """Verifica que las entradas expiren."""
+        cache = self._cache()
+        cache.ttl_seconds = -1
+        cache.set(('s', 1), b'uno', 0)
+        
+        assert cache.get(('s', 1)) is None
@@ -0,0 +1,69 @@
+"""
+Tests para ETag y GET condicional en las lecturas de sesión.
+"""
+import json
+import pytest
+
+
+@pytest.fixture
+def etag_session(seed_session):
+    """Crea una sesión con 5 mensajes."""
+    return seed_session('etag-session', 5, prefix='etag')
+
+
+class TestConditionalGet:
+    """Tests para If-None-Match y Cache-Control."""
+    
+    def test_not_modified_until_new_message(self, client, etag_session):
+        """Verifica el 304 mientras la sesión no cambie."""
+        first = client.get(f'/api/messages/{etag_session}')
+        etag = first.headers['ETag']
+        
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'] == 'no-cache'
+        
+        second = client.get(f'/api/messages/{etag_session}', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+        
+        client.post(
+            '/api/messages',
+            data=json.dumps({
+                'message_id': 'etag-nuevo',
+                'session_id': etag_session,
+                'content': 'Nuevo',
+                'timestamp': '2025-12-04T11:00:00Z',
+                'sender': 'user'
+            }),
+            content_type='application/json'
+        )
+        
+        third = client.get(f'/api/messages/{etag_session}', headers={'If-None-Match': etag})
+        assert third.status_code == 200
+        assert third.headers['ETag'] != etag
+    
+    def test_search_honors_if_none_match(self, client, etag_session):
+        """Verifica el 304 en la búsqueda."""
+        first = client.get(f'/api/messages/{etag_session}/search?q=Mensaje')
+        second = client.get(
+            f'/api/messages/{etag_session}/search?q=Mensaje',
+            headers={'If-None-Match': first.headers['ETag']}
+        )
+        
+        assert second.status_code == 304
+    
+    def test_full_cursor_page_is_immutable(self, client, etag_session):
+        """Verifica Cache-Control de larga duración para páginas que ya no pueden cambiar."""
+        first = json.loads(client.get(f'/api/messages/{etag_session}?limit=2').data)
+        cursor = first['pagination']['next_cursor']
+        
+        middle = client.get(f'/api/messages/{etag_session}?limit=2&cursor={cursor}')
+        assert 'immutable' in middle.headers['Cache-Control']
+        
+        tail_cursor = json.loads(middle.data)['pagination']['next_cursor']
+        tail = client.get(f'/api/messages/{etag_session}?limit=2&cursor={tail_cursor}')
+        assert tail.headers['Cache-Control'] == 'no-cache'
+        
+        # La misma página servida desde la caché conserva sus headers
+        cached = client.get(f'/api/messages/{etag_session}?limit=2&cursor={cursor}')
+        assert 'immutable' in cached.headers['Cache-Control']
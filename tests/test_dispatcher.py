@@ -0,0 +1,279 @@
+"""
+Tests para el despachador de emisiones WebSocket.
+"""
+import json
+import threading
+import time
+import pytest
+from app.services.broadcast_dispatcher import broadcast_dispatcher
+from app.websocket_handlers import batch_room
+
+
+@pytest.fixture
+def dispatcher(app):
+    """Despachador con un hilo emisor y cola de una entrada."""
+    app.config.update(WS_DISPATCHER_WORKERS=1, WS_DISPATCHER_QUEUE_SIZE=1, WS_DISPATCHER_BLOCK_TIMEOUT_SECONDS=0.05)
+    broadcast_dispatcher.init_app(app)
+    yield broadcast_dispatcher
+    broadcast_dispatcher.join(timeout=5)
+
+
+@pytest.fixture
+def blocked_emit(monkeypatch):
+    """Registra las emisiones y detiene el hilo emisor hasta liberar el evento."""
+    emitted = []
+    started = threading.Event()
+    release = threading.Event()
+    
+    def emit_new_messages(socketio, session_id, messages):
+        started.set()
+        release.wait(5)
+        emitted.append((session_id, [message['message_id'] for message in messages]))
+    
+    monkeypatch.setattr('app.websocket_handlers.emit_new_messages', emit_new_messages)
+    yield emitted, started, release
+    release.set()
+
+
+def _fill_queue(dispatcher, started, make_message):
+    """Ocupa el hilo emisor con m-0 y llena la cola con m-1."""
+    dispatcher.dispatch('room-1', [make_message('m-0', 'room-1')])
+    assert started.wait(5)
+    dispatcher.dispatch('room-1', [make_message('m-1', 'room-1')])
+
+
+class TestBroadcastDispatcher:
+    """Tests para BroadcastDispatcher."""
+    
+    def test_post_does_not_wait_for_emit(self, app, client, sample_message, dispatcher, blocked_emit):
+        """Verifica que la solicitud responda mientras la emisión sigue pendiente."""
+        emitted, started, release = blocked_emit
+        
+        response = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        assert response.status_code == 201
+        assert started.wait(5)
+        assert emitted == []
+        
+        release.set()
+        dispatcher.join(timeout=5)
+        assert emitted == [(sample_message['session_id'], [sample_message['message_id']])]
+    
+    def test_room_receives_new_message(self, app, client, socketio, sample_message, monkeypatch):
+        """Verifica que el mensaje se emita al room de la sesión desde el hilo emisor."""
+        socketio.test_client(app).emit('join', {'session_id': sample_message['session_id']})
+        calls = []
+        monkeypatch.setattr(
+            socketio, 'emit',
+            lambda event, data, room: calls.append((event, data['message_id'], room, threading.current_thread().name))
+        )
+        
+        client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert calls == [('new_message', sample_message['message_id'], sample_message['session_id'], 'websocket-emitter-0')]
+    
+    def test_drop_policy(self, dispatcher, blocked_emit, make_message):
+        """Verifica que con la cola llena se descarten los mensajes."""
+        emitted, started, release = blocked_emit
+        dispatcher.overflow = 'drop'
+        _fill_queue(dispatcher, started, make_message)
+        
+        assert dispatcher.dispatch('room-1', [make_message('m-2', 'room-1')]) is False
+        
+        release.set()
+        dispatcher.join(timeout=5)
+        assert emitted == [('room-1', ['m-0']), ('room-1', ['m-1'])]
+        assert dispatcher.stats()['dropped'] == 1
+    
+    def test_coalesce_policy(self, dispatcher, blocked_emit, make_message):
+        """Verifica que con la cola llena los mensajes se unan al lote pendiente de la sesión."""
+        emitted, started, release = blocked_emit
+        dispatcher.overflow = 'coalesce'
+        _fill_queue(dispatcher, started, make_message)
+        
+        assert dispatcher.dispatch('room-1', [make_message('m-2', 'room-1'), make_message('m-3', 'room-1')]) is True
+        # Otra sesión no tiene lote pendiente en la cola llena
+        assert dispatcher.dispatch('room-2', [make_message('x-0', 'room-2')]) is False
+        
+        release.set()
+        dispatcher.join(timeout=5)
+        assert emitted == [('room-1', ['m-0']), ('room-1', ['m-1', 'm-2', 'm-3'])]
+        
+        stats = dispatcher.stats()
+        assert (stats['coalesced'], stats['dropped'], stats['emitted']) == (2, 1, 4)
+    
+    def test_block_policy(self, dispatcher, blocked_emit, make_message):
+        """Verifica que con la cola llena se espere a que haya espacio."""
+        emitted, started, release = blocked_emit
+        dispatcher.overflow = 'block'
+        _fill_queue(dispatcher, started, make_message)
+        
+        # Sin espacio durante el timeout se descarta
+        assert dispatcher.dispatch('room-1', [make_message('m-2', 'room-1')]) is False
+        
+        dispatcher.block_timeout = 5
+        threading.Timer(0.05, release.set).start()
+        assert dispatcher.dispatch('room-1', [make_message('m-3', 'room-1')]) is True
+        
+        dispatcher.join(timeout=5)
+        assert emitted == [('room-1', ['m-0']), ('room-1', ['m-1']), ('room-1', ['m-3'])]
+    
+    def test_order_per_session_with_several_workers(self, app, monkeypatch, make_message):
+        """Verifica que los mensajes de una sesión se emitan en orden con varios hilos."""
+        emitted = {}
+        monkeypatch.setattr(
+            'app.websocket_handlers.emit_new_messages',
+            lambda socketio, session_id, messages: emitted.setdefault(session_id, []).extend(
+                message['message_id'] for message in messages
+            )
+        )
+        app.config.update(WS_DISPATCHER_WORKERS=4, WS_DISPATCHER_QUEUE_SIZE=1000)
+        broadcast_dispatcher.init_app(app)
+        
+        for i in range(200):
+            broadcast_dispatcher.dispatch(f'room-{i % 5}', [make_message(f'm-{i}', 'room-1')])
+        broadcast_dispatcher.join(timeout=5)
+        
+        for room in range(5):
+            assert emitted[f'room-{room}'] == [f'm-{i}' for i in range(room, 200, 5)]
+    
+    def test_disabled_emits_in_request(self, app, monkeypatch, make_message):
+        """Verifica que desactivado se emita en el hilo de la solicitud."""
+        calls = []
+        monkeypatch.setattr(
+            'app.websocket_handlers.emit_new_messages',
+            lambda socketio, session_id, messages: calls.append(threading.current_thread())
+        )
+        app.config['WS_DISPATCHER_ENABLED'] = False
+        broadcast_dispatcher.init_app(app)
+        
+        broadcast_dispatcher.dispatch('room-1', [make_message('m-0', 'room-1')])
+        
+        assert calls == [threading.current_thread()]
+    
+    def test_invalid_overflow_policy(self, app):
+        """Verifica el error con una política desconocida."""
+        app.config['WS_DISPATCHER_OVERFLOW'] = 'ignore'
+        
+        with pytest.raises(ValueError):
+            broadcast_dispatcher.init_app(app)
+    
+    def test_stats_endpoint(self, client, sample_message):
+        """Verifica las métricas de GET /api/stats/websocket."""
+        client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        broadcast_dispatcher.join(timeout=5)
+        
+        response = client.get('/api/stats/websocket')
+        data = json.loads(response.data)['data']
+        
+        assert response.status_code == 200
+        assert data['enabled'] is True
+        assert data['queue_depth'] == 0
+        assert data['enqueued'] == data['emitted'] == 1
+        assert data['emit_latency_ms']['max'] >= data['emit_duration_ms']['max'] > 0
+
+
+class TestBatchedBroadcast:
+    """Tests para el evento new_messages de los clientes en modo agrupado."""
+    
+    @pytest.fixture
+    def emitted(self, socketio, monkeypatch):
+        """Registra los mensajes emitidos por socketio.emit, sin los eventos de conexión."""
+        calls = []
+        emit = socketio.emit
+        
+        def record(event, data, room=None, **kwargs):
+            if event in ('new_message', 'new_messages'):
+                calls.append((event, room, data))
+            else:
+                emit(event, data, room=room, **kwargs)
+        
+        monkeypatch.setattr(socketio, 'emit', record)
+        return calls
+    
+    def _join(self, app, socketio, session_id, batch):
+        """Conecta un cliente de prueba y lo une a la sesión."""
+        ws_client = socketio.test_client(app)
+        ws_client.emit('join', {'session_id': session_id, 'batch': batch})
+        return ws_client
+    
+    def test_messages_in_window_sent_together(self, app, socketio, emitted, make_message):
+        """Verifica que los mensajes de una ventana se emitan en un solo new_messages."""
+        app.config['WS_BATCH_WINDOW_MS'] = 100
+        broadcast_dispatcher.init_app(app)
+        self._join(app, socketio, 'room-1', batch=True)
+        
+        for i in range(3):
+            broadcast_dispatcher.dispatch('room-1', [make_message(f'm-{i}', 'room-1')])
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert [(event, room) for event, room, _ in emitted] == [('new_messages', batch_room('room-1'))]
+        assert [message['message_id'] for message in emitted[0][2]] == ['m-0', 'm-1', 'm-2']
+    
+    def test_both_modes_in_same_session(self, app, socketio, emitted, make_message):
+        """Verifica que cada cliente reciba el evento del modo que eligió."""
+        app.config['WS_BATCH_WINDOW_MS'] = 0
+        broadcast_dispatcher.init_app(app)
+        self._join(app, socketio, 'room-1', batch=True)
+        self._join(app, socketio, 'room-1', batch=False)
+        
+        broadcast_dispatcher.dispatch('room-1', [make_message('m-0', 'room-1'), make_message('m-1', 'room-1')])
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert [(event, room) for event, room, _ in emitted] == [
+            ('new_message', 'room-1'),
+            ('new_message', 'room-1'),
+            ('new_messages', batch_room('room-1'))
+        ]
+    
+    def test_max_messages_flushes_before_window(self, app, socketio, emitted, make_message):
+        """Verifica que un lote lleno se emita sin esperar a la ventana."""
+        app.config.update(WS_BATCH_WINDOW_MS=10000, WS_BATCH_MAX_MESSAGES=2)
+        broadcast_dispatcher.init_app(app)
+        self._join(app, socketio, 'room-1', batch=True)
+        
+        started = time.monotonic()
+        broadcast_dispatcher.dispatch('room-1', [make_message('m-0', 'room-1'), make_message('m-1', 'room-1')])
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert time.monotonic() - started < 5
+        assert len(emitted) == 1
+    
+    def test_switching_mode_leaves_other_room(self, app, socketio, emitted, make_message):
+        """Verifica que un nuevo join cambie el modo del cliente."""
+        app.config['WS_BATCH_WINDOW_MS'] = 0
+        broadcast_dispatcher.init_app(app)
+        ws_client = self._join(app, socketio, 'room-1', batch=True)
+        ws_client.emit('join', {'session_id': 'room-1', 'batch': False})
+        
+        broadcast_dispatcher.dispatch('room-1', [make_message('m-0', 'room-1')])
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert [event for event, _, _ in emitted] == ['new_message']
+    
+    def test_no_clients_no_emit(self, app, emitted, make_message):
+        """Verifica que no se serialicen mensajes para sesiones sin clientes."""
+        broadcast_dispatcher.dispatch('room-sin-clientes', [make_message('m-0', 'room-1')])
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert emitted == []
+    
+    def test_batch_encoded_once_per_room(self, app, socketio, monkeypatch, make_message):
+        """Verifica que el paquete new_messages se serialice una vez para todo el room."""
+        app.config['WS_BATCH_WINDOW_MS'] = 0
+        broadcast_dispatcher.init_app(app)
+        for _ in range(3):
+            self._join(app, socketio, 'room-1', batch=True)
+        
+        packet_class = socketio.server.packet_class
+        encode = packet_class.encode
+        encoded = []
+        monkeypatch.setattr(packet_class, 'encode', lambda self: encoded.append(self.data[0]) or encode(self))
+        monkeypatch.setattr(socketio.server, '_send_eio_packet', lambda eio_sid, eio_pkt: None)
+        
+        broadcast_dispatcher.dispatch('room-1', [make_message(f'm-{i}', 'room-1') for i in range(10)])
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert encoded == ['new_messages']
+        assert broadcast_dispatcher.stats()['batches_emitted'] == 1
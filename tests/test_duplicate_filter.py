@@ -0,0 +1,81 @@
+"""
+Tests para la pre-verificación de message_ids duplicados.
+"""
+import json
+import pytest
+from app import db
+from app.repositories.message_repository import MessageRepository
+from app.utils.bloom_filter import BloomFilter
+from app.utils.validators import ValidationError
+
+
+class TestBloomFilter:
+    """Tests para el filtro Bloom."""
+    
+    def test_no_false_negatives(self):
+        """Verifica que todo elemento agregado sea reconocido."""
+        bloom = BloomFilter(1000, 0.01)
+        items = [f'msg-{i}' for i in range(1000)]
+        
+        for item in items:
+            bloom.add(item)
+        
+        assert all(item in bloom for item in items)
+    
+    def test_false_positive_rate(self):
+        """Verifica que la tasa de falsos positivos sea cercana a la configurada."""
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'msg-{i}')
+        
+        false_positives = sum(1 for i in range(10000) if f'otro-{i}' in bloom)
+        
+        assert false_positives < 300
+
+
+class TestDuplicatePrecheck:
+    """Tests para el rechazo temprano de duplicados en el repositorio."""
+    
+    def test_known_duplicate_skips_transaction(self, client, sample_message, monkeypatch):
+        """Verifica que un duplicado conocido se rechace sin intentar el INSERT."""
+        client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        def fail_commit():
+            raise AssertionError('No debería abrirse una transacción')
+        
+        monkeypatch.setattr(db.session, 'commit', fail_commit)
+        
+        response = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'DUPLICATE_MESSAGE_ID'
+    
+    def test_filter_loaded_from_database(self, app, client, sample_message):
+        """Verifica que el filtro se reconstruya con los IDs existentes."""
+        client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        repository = MessageRepository()
+        
+        repository.load_known_message_ids()
+        
+        assert repository._is_known_duplicate(sample_message['message_id'])
+        assert not repository._is_known_duplicate('msg-nuevo')
+    
+    def test_database_remains_final_authority(self, app, sample_message):
+        """Verifica que el índice único detecte duplicados aunque el filtro no los conozca."""
+        app.config['DUPLICATE_FILTER_ENABLED'] = False
+        repository = MessageRepository()
+        repository.load_known_message_ids()
+        message_data = dict(
+            sample_message,
+            timestamp_epoch_ms=1686839400000,
+            word_count=5,
+            character_count=31,
+            processed_at='2023-06-15T14:30:01Z'
+        )
+        
+        repository.save_message(message_data)
+        
+        with pytest.raises(ValidationError) as exc_info:
+            repository.save_message(message_data)
+        
+        assert exc_info.value.code == 'DUPLICATE_MESSAGE_ID'
@@ -0,0 +1,83 @@
+"""
+Tests para la exportación de sesiones en streaming.
+"""
+import csv
+import gzip
+import io
+import json
+import pytest
+from app.repositories.message_repository import MessageRepository
+
+
+@pytest.fixture
+def export_session(seed_session):
+    """Crea una sesión con 5 mensajes, uno de ellos con comas y comillas."""
+    return seed_session(
+        'export-session',
+        5,
+        prefix='export',
+        content=lambda i: f'Mensaje {i}' if i != 2 else 'Hola, "mundo"'
+    )
+
+
+class TestExportEndpoint:
+    """Tests para GET /api/messages/<session_id>/export."""
+    
+    def test_export_ndjson(self, client, export_session):
+        """Verifica que cada mensaje se exporte como una línea JSON."""
+        response = client.get(f'/api/messages/{export_session}/export')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        assert 'attachment' in response.headers['Content-Disposition']
+        
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        assert [line['message_id'] for line in lines] == [f'export-{i}' for i in range(5)]
+        assert lines[0]['metadata']['word_count'] == 2
+    
+    def test_export_csv(self, client, export_session):
+        """Verifica el CSV con encabezado y escapado de campos."""
+        response = client.get(f'/api/messages/{export_session}/export?format=csv&sender=user')
+        
+        assert response.mimetype == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+        assert [row['message_id'] for row in rows] == ['export-0', 'export-2', 'export-4']
+        assert rows[1]['content'] == 'Hola, "mundo"'
+    
+    def test_export_empty_session_csv(self, client):
+        """Verifica que una sesión vacía exporte solo el encabezado."""
+        response = client.get('/api/messages/sin-mensajes/export?format=csv')
+        
+        assert response.data.decode().splitlines() == [
+            'message_id,session_id,content,timestamp,sender,word_count,character_count,processed_at'
+        ]
+    
+    def test_export_gzip(self, client, export_session):
+        """Verifica la compresión gzip cuando el cliente la acepta."""
+        response = client.get(
+            f'/api/messages/{export_session}/export',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        lines = gzip.decompress(response.data).splitlines()
+        assert len(lines) == 5
+    
+    def test_export_invalid_format(self, client, export_session):
+        """Verifica que un formato desconocido sea rechazado."""
+        response = client.get(f'/api/messages/{export_session}/export?format=xml')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_EXPORT_FORMAT'
+
+
+class TestIterMessages:
+    """Tests para la lectura por bloques del repositorio."""
+    
+    def test_iter_messages_in_batches(self, app, export_session):
+        """Verifica que los mensajes se entreguen en bloques del tamaño pedido."""
+        batches = list(MessageRepository().iter_messages_by_session(export_session, batch_size=2))
+        
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [message.message_id for batch in batches for message in batch] == [f'export-{i}' for i in range(5)]
@@ -0,0 +1,88 @@
+"""
+Tests para el parámetro fields (sparse fieldsets).
+"""
+import json
+import pytest
+from sqlalchemy import event
+from app import db
+
+
+@pytest.fixture
+def fields_session(seed_session):
+    """Crea una sesión con 4 mensajes."""
+    return seed_session('fields-session', 4, prefix='fields', content='Contenido largo del mensaje {i}')
+
+
+@pytest.fixture
+def statements(app):
+    """Registra las sentencias SQL ejecutadas durante el test."""
+    executed = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+class TestSparseFieldsets:
+    """Tests para fields= en listado, búsqueda y exportación."""
+    
+    def test_list_returns_only_requested_fields(self, client, fields_session, statements):
+        """Verifica las claves de la respuesta y que content no se lea de la base de datos."""
+        response = client.get(f'/api/messages/{fields_session}?fields=timestamp,message_id,sender')
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        assert list(data['data'][0]) == ['message_id', 'timestamp', 'sender']
+        assert len(data['data']) == 4
+        assert not any('messages.content' in statement for statement in statements)
+    
+    def test_list_orm_mode_pushes_down_columns(self, app, client, fields_session, statements):
+        """Verifica que el modo ORM también limite las columnas leídas."""
+        app.config['REPOSITORY_READ_MODE'] = 'orm'
+        db.session.expunge_all()
+        
+        response = client.get(f'/api/messages/{fields_session}?fields=message_id,metadata')
+        data = json.loads(response.data)
+        
+        assert data['data'][0] == {
+            'message_id': 'fields-0',
+            'metadata': {'word_count': 5, 'character_count': 29, 'processed_at': data['data'][0]['metadata']['processed_at']}
+        }
+        assert not any('messages.content' in statement for statement in statements)
+    
+    def test_cursor_pagination_with_fields(self, client, fields_session):
+        """Verifica que los cursores funcionen sin pedir campos adicionales."""
+        first = json.loads(client.get(f'/api/messages/{fields_session}?limit=2&fields=sender').data)
+        cursor = first['pagination']['next_cursor']
+        
+        second = json.loads(client.get(f'/api/messages/{fields_session}?limit=2&fields=sender&cursor={cursor}').data)
+        
+        assert second['data'] == [{'sender': 'user'}, {'sender': 'system'}]
+    
+    def test_search_with_fields_and_highlight(self, client, fields_session):
+        """Verifica la búsqueda con fields y resaltado sin devolver content."""
+        response = client.get(f'/api/messages/{fields_session}/search?q=largo&fields=message_id&highlight=true&limit=1')
+        result = json.loads(response.data)['data'][0]
+        
+        assert set(result) == {'message_id', 'highlight'}
+        assert '<mark>largo</mark>' in result['highlight']
+    
+    def test_export_csv_with_fields(self, client, fields_session):
+        """Verifica las columnas del CSV exportado con fields."""
+        response = client.get(f'/api/messages/{fields_session}/export?format=csv&fields=message_id,metadata')
+        lines = response.data.decode().splitlines()
+        
+        assert lines[0] == 'message_id,word_count,character_count,processed_at'
+        assert lines[1].startswith('fields-0,5,29,')
+    
+    def test_invalid_field(self, client, fields_session):
+        """Verifica que un campo desconocido sea rechazado."""
+        response = client.get(f'/api/messages/{fields_session}?fields=message_id,password')
+        
+        assert response.status_code == 400
+        data = json.loads(response.data)
+        assert data['error']['code'] == 'INVALID_FIELDS'
+        assert 'password' in data['error']['message']
@@ -0,0 +1,74 @@
+"""
+Tests para la importación de mensajes en formato NDJSON.
+"""
+import io
+import json
+from app.utils.ndjson import iter_lines, LineTooLongError
+
+
+def _ndjson(*objects):
+    """Construye un cuerpo NDJSON a partir de objetos o líneas en bruto."""
+    lines = [obj if isinstance(obj, str) else json.dumps(obj) for obj in objects]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class TestImportEndpoint:
+    """Tests para el endpoint POST /api/messages/import."""
+    
+    def test_import_in_chunks(self, app, client, make_message):
+        """Verifica que los mensajes se guarden por bloques con eventos de progreso."""
+        app.config['IMPORT_CHUNK_SIZE'] = 2
+        body = _ndjson(*[
+            make_message(f'import-{i}', 'import-session', content=f'Mensaje histórico {i} con spam')
+            for i in range(5)
+        ])
+        
+        response = client.post('/api/messages/import', data=body, content_type='application/x-ndjson')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        events = [json.loads(line) for line in response.data.splitlines()]
+        
+        assert [event['type'] for event in events] == ['progress', 'progress', 'progress', 'summary']
+        assert events[-1] == {'type': 'summary', 'processed': 5, 'saved': 5, 'failed': 0}
+        
+        data = json.loads(client.get('/api/messages/import-session?limit=10').data)
+        assert data['pagination']['total'] == 5
+        assert 'spam' not in data['data'][0]['content']
+    
+    def test_import_reports_errors_by_line(self, client, make_message):
+        """Verifica que los errores se reporten con su número de línea."""
+        body = _ndjson(
+            make_message('import-0', 'import-session'),
+            '{no es json',
+            make_message('import-1', 'import-session', sender='bot'),
+            make_message('import-0', 'import-session')
+        )
+        
+        response = client.post('/api/messages/import', data=body, content_type='application/x-ndjson')
+        events = [json.loads(line) for line in response.data.splitlines()]
+        errors = {event['line']: event['error']['code'] for event in events if event['type'] == 'error'}
+        
+        assert errors == {2: 'INVALID_JSON', 3: 'INVALID_SENDER', 4: 'DUPLICATE_MESSAGE_ID'}
+        assert events[-1] == {'type': 'summary', 'processed': 4, 'saved': 1, 'failed': 3}
+    
+    def test_import_requires_ndjson(self, client):
+        """Verifica que se exija el content type NDJSON."""
+        response = client.post('/api/messages/import', data='[]', content_type='application/json')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_CONTENT_TYPE'
+
+
+class TestIterLines:
+    """Tests para la lectura de líneas NDJSON."""
+    
+    def test_skips_blank_lines_and_limits_length(self):
+        """Verifica que se omitan líneas vacías y se rechacen líneas demasiado largas."""
+        stream = io.BytesIO(b'{"a": 1}\n\n' + b'x' * 50 + b'\n{"b": 2}')
+        
+        lines = list(iter_lines(stream, max_line_bytes=20))
+        
+        assert lines[0] == (1, b'{"a": 1}\n')
+        assert lines[1][0] == 3 and isinstance(lines[1][1], LineTooLongError)
+        assert lines[2] == (4, b'{"b": 2}')
@@ -0,0 +1,136 @@
+"""
+Tests para la ingesta asíncrona de mensajes.
+"""
+import json
+import threading
+import pytest
+from app.models import Message
+from app.services.ingestion_service import ingestion_service
+
+
+@pytest.fixture
+def async_app(app):
+    """Aplicación con la ingesta asíncrona activada."""
+    app.config.update(ASYNC_INGESTION_ENABLED=True, INGESTION_QUEUE_SIZE=10, INGESTION_WORKERS=1)
+    ingestion_service.init_app(app)
+    return app
+
+
+class TestAsyncIngestion:
+    """Tests para el modo 202 Accepted de POST /api/messages."""
+    
+    def test_create_message_returns_202(self, async_app, sample_message):
+        """Verifica que el mensaje se encole y luego se persista."""
+        client = async_app.test_client()
+        
+        response = client.post(
+            '/api/messages',
+            data=json.dumps(sample_message),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 202
+        data = json.loads(response.data)
+        assert data['status'] == 'accepted'
+        assert data['data']['message_id'] == sample_message['message_id']
+        assert response.headers['Location'].endswith(f"/api/ingestion/{sample_message['message_id']}")
+        
+        ingestion_service.join()
+        
+        response = client.get(f"/api/ingestion/{sample_message['message_id']}")
+        assert response.status_code == 200
+        assert json.loads(response.data)['data']['ingestion_status'] == 'persisted'
+        
+        response = client.get(f"/api/messages/{sample_message['session_id']}")
+        assert json.loads(response.data)['pagination']['total'] == 1
+    
+    def test_invalid_message_rejected_synchronously(self, async_app, sample_message):
+        """Verifica que la validación siga ocurriendo en la solicitud."""
+        sample_message['sender'] = 'invalid'
+        
+        response = async_app.test_client().post(
+            '/api/messages',
+            data=json.dumps(sample_message),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_SENDER'
+    
+    def test_duplicate_reported_in_status(self, async_app, client, sample_message):
+        """Verifica que un duplicado detectado por el worker quede como failed."""
+        async_app.config['ASYNC_INGESTION_ENABLED'] = False
+        client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        async_app.config['ASYNC_INGESTION_ENABLED'] = True
+        
+        response = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        assert response.status_code == 202
+        ingestion_service.join()
+        
+        data = json.loads(client.get(f"/api/ingestion/{sample_message['message_id']}").data)['data']
+        assert data['ingestion_status'] == 'failed'
+        assert data['error']['code'] == 'DUPLICATE_MESSAGE_ID'
+    
+    def test_full_queue_returns_503(self, async_app, sample_message, monkeypatch):
+        """Verifica la contrapresión cuando la cola está llena."""
+        async_app.config['INGESTION_QUEUE_SIZE'] = 1
+        ingestion_service.init_app(async_app)
+        monkeypatch.setattr(ingestion_service, '_ensure_workers', lambda: None)
+        client = async_app.test_client()
+        
+        first = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        sample_message['message_id'] = 'msg-otro'
+        second = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        assert first.status_code == 202
+        assert second.status_code == 503
+        assert second.headers['Retry-After'] == '1'
+        assert json.loads(second.data)['error']['code'] == 'SERVICE_UNAVAILABLE'
+        
+        ingestion_service.init_app(async_app)
+    
+    def test_reinit_does_not_wait_for_stalled_workers(self, async_app, make_message, monkeypatch):
+        """Verifica que reiniciar con la cola llena no bloquee y que los mensajes encolados se guarden."""
+        async_app.config['INGESTION_QUEUE_SIZE'] = 1
+        ingestion_service.init_app(async_app)
+        started = threading.Event()
+        release = threading.Event()
+        process = ingestion_service._process
+        
+        def stalled_process(*args):
+            started.set()
+            release.wait(5)
+            process(*args)
+        
+        monkeypatch.setattr(ingestion_service, '_process', stalled_process)
+        client = async_app.test_client()
+        client.post('/api/messages', data=json.dumps(make_message('ingest-0')), content_type='application/json')
+        assert started.wait(5)
+        client.post('/api/messages', data=json.dumps(make_message('ingest-1')), content_type='application/json')
+        [worker] = ingestion_service._workers
+        
+        reinit = threading.Thread(target=ingestion_service.init_app, args=(async_app,))
+        reinit.start()
+        reinit.join(2)
+        blocked = reinit.is_alive()
+        release.set()
+        worker.join(5)
+        
+        assert not blocked
+        assert not worker.is_alive()
+        assert Message.query.count() == 2
+    
+    def test_status_unknown_message(self, client):
+        """Verifica 404 para un mensaje desconocido."""
+        response = client.get('/api/ingestion/no-existe')
+        
+        assert response.status_code == 404
+    
+    def test_session_named_status_not_shadowed(self, client, seed_session):
+        """Verifica que la consulta de estado no tape las rutas de una sesión llamada status."""
+        seed_session('status', 2, content='hola {i}')
+        
+        response = client.get('/api/messages/status/search?q=hola')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['pagination']['total'] == 2
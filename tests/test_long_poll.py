@@ -0,0 +1,151 @@
+"""
+Tests para el endpoint de long-polling y el notificador de sesiones.
+"""
+import threading
+import time
+from app.utils.notifier import SessionNotifier, session_notifier
+
+
+def _post_later(app, post_message, delay, message_id, **overrides):
+    """Guarda un mensaje en poll-session desde otro hilo tras delay segundos."""
+    def post():
+        time.sleep(delay)
+        post_message(message_id, 'poll-session', client=app.test_client(), **overrides)
+    
+    thread = threading.Thread(target=post)
+    thread.start()
+    return thread
+
+
+class TestSessionNotifier:
+    """Tests para SessionNotifier."""
+    
+    def test_notify_wakes_subscribers_of_session(self):
+        """Verifica que notify despierte solo a los suscriptores de la sesión."""
+        notifier = SessionNotifier()
+        
+        with notifier.subscribe('a') as first, notifier.subscribe('b') as other:
+            notifier.notify('a')
+            
+            assert first.wait(0)
+            assert not other.wait(0)
+    
+    def test_notify_before_wait_is_not_lost(self):
+        """Verifica que una notificación previa a wait() se conserve."""
+        notifier = SessionNotifier()
+        
+        with notifier.subscribe('a') as subscription:
+            notifier.notify('a')
+            assert subscription.wait(1)
+    
+    def test_close_unregisters(self):
+        """Verifica que cerrar la suscripción la elimine del registro."""
+        notifier = SessionNotifier()
+        
+        with notifier.subscribe('a'):
+            assert notifier.waiting('a') == 1
+        
+        assert notifier.waiting() == 0
+
+
+class TestLongPollEndpoint:
+    """Tests para GET /api/messages/<session_id>/since/<last_id>."""
+    
+    def test_returns_immediately_when_newer_messages_exist(self, client, post_message):
+        """Verifica la respuesta inmediata si ya hay mensajes posteriores."""
+        post_message('poll-1', 'poll-session')
+        post_message('poll-2', 'poll-session')
+        
+        started = time.monotonic()
+        response = client.get('/api/messages/poll-session/since/0?timeout=10')
+        data = response.get_json()
+        
+        assert response.status_code == 200
+        assert time.monotonic() - started < 1
+        assert [m['message_id'] for m in data['data']] == ['poll-1', 'poll-2']
+        assert data['pagination']['has_more'] is False
+        
+        # Continuar desde last_id no repite mensajes
+        last_id = data['pagination']['last_id']
+        response = client.get(f'/api/messages/poll-session/since/{last_id}?timeout=0')
+        assert response.get_json()['data'] == []
+        assert response.get_json()['pagination']['last_id'] == last_id
+    
+    def test_waits_for_new_message(self, app, client, post_message):
+        """Verifica que la espera termine al guardarse un mensaje en la sesión."""
+        thread = _post_later(app, post_message, 0.2, 'poll-late')
+        
+        started = time.monotonic()
+        response = client.get('/api/messages/poll-session/since/0?timeout=10')
+        elapsed = time.monotonic() - started
+        thread.join()
+        
+        assert [m['message_id'] for m in response.get_json()['data']] == ['poll-late']
+        assert elapsed < 5
+        assert response.headers['Cache-Control'] == 'no-store'
+    
+    def test_rechecks_with_message_queue(self, app, client, post_message, monkeypatch):
+        """Verifica que con varios workers un mensaje sin notificación llegue al volver a consultar."""
+        app.config.update(SOCKETIO_MESSAGE_QUEUE='unix:///tmp/otro-worker.sock', LONG_POLL_RECHECK_SECONDS=0.1)
+        # Simula un mensaje guardado en otro proceso: no notifica a este
+        monkeypatch.setattr(session_notifier, 'notify', lambda session_id: None)
+        thread = _post_later(app, post_message, 0.2, 'poll-remote')
+        
+        started = time.monotonic()
+        response = client.get('/api/messages/poll-session/since/0?timeout=30')
+        elapsed = time.monotonic() - started
+        thread.join()
+        
+        assert [m['message_id'] for m in response.get_json()['data']] == ['poll-remote']
+        assert elapsed < 5
+    
+    def test_ignores_messages_of_other_sender(self, app, client, post_message):
+        """Verifica que un mensaje que no cumple el filtro no termine la espera."""
+        thread = _post_later(app, post_message, 0.1, 'poll-system', sender='system')
+        
+        response = client.get('/api/messages/poll-session/since/0?timeout=0.5&sender=user')
+        thread.join()
+        
+        assert response.get_json()['data'] == []
+    
+    def test_timeout_returns_empty(self, client):
+        """Verifica que al agotarse la espera se responda sin mensajes."""
+        started = time.monotonic()
+        response = client.get('/api/messages/vacia/since/0?timeout=0.2')
+        
+        assert response.status_code == 200
+        assert response.get_json()['data'] == []
+        assert response.get_json()['pagination']['last_id'] == 0
+        assert time.monotonic() - started >= 0.2
+        assert session_notifier.waiting() == 0
+    
+    def test_timeout_is_capped(self, app, client):
+        """Verifica que timeout no supere LONG_POLL_MAX_TIMEOUT_SECONDS."""
+        app.config['LONG_POLL_MAX_TIMEOUT_SECONDS'] = 0.1
+        
+        started = time.monotonic()
+        client.get('/api/messages/vacia/since/0?timeout=30')
+        
+        assert time.monotonic() - started < 5
+    
+    def test_releases_connection_while_waiting(self, app, client, monkeypatch):
+        """Verifica que la conexión se libere antes de esperar."""
+        from app.repositories.message_repository import MessageRepository
+        calls = []
+        release = MessageRepository.release_connection
+        monkeypatch.setattr(
+            MessageRepository, 'release_connection',
+            staticmethod(lambda: (calls.append(session_notifier.waiting('vacia')), release()))
+        )
+        
+        client.get('/api/messages/vacia/since/0?timeout=0.1')
+        
+        # Se libera con la suscripción ya registrada
+        assert calls == [1]
+    
+    def test_invalid_sender(self, client):
+        """Verifica el error de remitente inválido."""
+        response = client.get('/api/messages/poll-session/since/0?sender=bot')
+        
+        assert response.status_code == 400
+        assert response.get_json()['error']['code'] == 'INVALID_SENDER'
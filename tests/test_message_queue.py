@@ -0,0 +1,195 @@
+"""
+Tests para la cola de mensajes de Socket.IO entre procesos.
+"""
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+from app.utils.message_queue import UnixSocketManager, create_client_manager
+from app.websocket_handlers import room_has_clients
+from config import TestingConfig
+
+
+# Worker en otro proceso: une un cliente al room y escribe el primer new_message recibido
+WORKER_SCRIPT = '''
+import sys, time
+import flask_socketio.test_client
+from config import TestingConfig
+TestingConfig.SOCKETIO_MESSAGE_QUEUE = sys.argv[1]
+# El cliente de prueba rechaza las colas de mensajes; aquí solo recibe
+flask_socketio.test_client.PubSubManager = type('NoMessageQueue', (), {})
+from app import create_app, socketio
+app = create_app('testing')
+frames = []
+ws_client = socketio.test_client(app)
+socketio.server._send_eio_packet = lambda eio_sid, eio_pkt: frames.append(eio_pkt.data)
+ws_client.emit('join', {'session_id': sys.argv[2]})
+deadline = time.monotonic() + 10
+while not socketio.server.manager.broker._subscribers and time.monotonic() < deadline:
+    time.sleep(0.01)
+print('ready', flush=True)
+while time.monotonic() < deadline:
+    received = [frame for frame in list(frames) if 'new_message' in frame]
+    if received:
+        print(received[0], flush=True)
+        break
+    time.sleep(0.01)
+'''
+
+
+class _Subscriber:
+    """Consume _listen de un gestor en un hilo y guarda los mensajes."""
+    
+    def __init__(self, manager):
+        self.manager = manager
+        self.received = []
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def _run(self):
+        for message in self.manager._listen():
+            self.received.append(message)
+    
+    def wait_for(self, count, timeout=5):
+        """Espera a recibir count mensajes."""
+        deadline = time.monotonic() + timeout
+        while len(self.received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.received
+
+
+def _wait_subscribers(broker, count, timeout=5):
+    """Espera a que el broker tenga count suscriptores."""
+    deadline = time.monotonic() + timeout
+    while len(broker._subscribers) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(broker._subscribers) == count
+
+
+@pytest.fixture
+def managers(tmp_path):
+    """Crea gestores unix:// sobre el mismo socket y los cierra al terminar."""
+    created = []
+    
+    def create(channel='socketio'):
+        manager = UnixSocketManager(f'unix://{tmp_path / "socketio.sock"}', channel=channel)
+        created.append(manager)
+        return manager
+    
+    yield create
+    for manager in created:
+        manager.close()
+
+
+class TestUnixSocketManager:
+    """Tests para el broker local sobre socket Unix."""
+    
+    def test_publish_reaches_other_workers(self, managers):
+        """Verifica que un mensaje publicado llegue a los demás gestores y no al emisor."""
+        first, second, publisher = managers(), managers(), managers()
+        first_subscriber = _Subscriber(first)
+        _wait_subscribers(first.broker, 1)
+        second_subscriber = _Subscriber(second)
+        _wait_subscribers(first.broker, 2)
+        
+        first._publish({'method': 'emit', 'event': 'new_message'})
+        publisher._publish({'method': 'emit', 'event': 'new_messages'})
+        
+        # Cada conexión se reenvía por separado: sin orden entre emisores
+        assert sorted(m['event'] for m in second_subscriber.wait_for(2)) == ['new_message', 'new_messages']
+        assert [m['event'] for m in first_subscriber.wait_for(1)] == ['new_messages']
+        assert first.broker.running and not second.broker.running
+    
+    def test_other_channel_ignored(self, managers):
+        """Verifica que cada gestor reciba solo los mensajes de su canal."""
+        subscriber = _Subscriber(managers('chat'))
+        _wait_subscribers(subscriber.manager.broker, 1)
+        other = _Subscriber(managers('otro'))
+        _wait_subscribers(subscriber.manager.broker, 2)
+        
+        managers('chat')._publish({'event': 'chat'})
+        managers('otro')._publish({'event': 'otro'})
+        
+        assert subscriber.wait_for(1) == [{'event': 'chat'}]
+        assert other.wait_for(1) == [{'event': 'otro'}]
+    
+    def test_broker_failover(self, managers):
+        """Verifica que otro worker tome el broker cuando el actual termina."""
+        broker, survivor, publisher = managers(), managers(), managers()
+        _Subscriber(broker)
+        _wait_subscribers(broker.broker, 1)
+        subscriber = _Subscriber(survivor)
+        _wait_subscribers(broker.broker, 2)
+        publisher._publish({'event': 'antes'})
+        assert subscriber.wait_for(1) == [{'event': 'antes'}]
+        
+        broker.close()
+        _wait_subscribers(survivor.broker, 1)
+        publisher._publish({'event': 'después'})
+        
+        assert survivor.broker.running
+        assert subscriber.wait_for(2) == [{'event': 'antes'}, {'event': 'después'}]
+    
+    def test_socket_only_for_owner(self, managers, tmp_path):
+        """Verifica que el socket del broker se cree con permisos 0600."""
+        _Subscriber(managers())
+        socket_path = tmp_path / 'socketio.sock'
+        deadline = time.monotonic() + 5
+        while not socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        assert socket_path.stat().st_mode & 0o777 == 0o600
+
+
+class TestMessageQueueConfig:
+    """Tests para la selección del gestor de clientes."""
+    
+    def test_without_queue_single_process(self, socketio):
+        """Verifica que sin cola se use el gestor en memoria."""
+        assert create_client_manager(None) is None
+        assert room_has_clients(socketio, 'room-sin-clientes') is False
+    
+    def test_manager_from_url(self, tmp_path):
+        """Verifica que el esquema de la URL elija el broker."""
+        manager = create_client_manager(f'unix://{tmp_path / "socketio.sock"}', 'canal')
+        
+        assert isinstance(manager, UnixSocketManager)
+        assert manager.channel == 'canal'
+        assert manager.path == str(tmp_path / 'socketio.sock')
+    
+    def test_emit_relayed_to_other_process(self, tmp_path, sample_message, monkeypatch):
+        """Verifica que un mensaje guardado en un proceso llegue al room en otro."""
+        from app import create_app, db, socketio
+        from app.services.broadcast_dispatcher import broadcast_dispatcher
+        url = f'unix://{tmp_path / "socketio.sock"}'
+        worker = subprocess.Popen(
+            [sys.executable, '-c', WORKER_SCRIPT, url, sample_message['session_id']],
+            cwd=Path(__file__).resolve().parent.parent,
+            stdout=subprocess.PIPE,
+            text=True
+        )
+        try:
+            assert worker.stdout.readline().strip() == 'ready'
+            
+            monkeypatch.setattr(TestingConfig, 'SOCKETIO_MESSAGE_QUEUE', url)
+            app = create_app('testing')
+            # Sin clientes en este proceso, el room puede tenerlos en otro
+            assert room_has_clients(socketio, sample_message['session_id']) is True
+            with app.app_context():
+                response = app.test_client().post(
+                    '/api/messages', data=json.dumps(sample_message), content_type='application/json'
+                )
+                broadcast_dispatcher.join(timeout=5)
+                db.drop_all()
+            socketio.server.manager.close()
+            
+            output, _ = worker.communicate(timeout=15)
+        finally:
+            worker.kill()
+        
+        assert response.status_code == 201
+        event, data = json.loads(output.strip()[1:])
+        assert event == 'new_message'
+        assert data['message_id'] == sample_message['message_id']
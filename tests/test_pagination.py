@@ -0,0 +1,85 @@
+"""
+Tests para la paginación con cursores de GET /api/messages/<session_id>.
+"""
+import json
+import pytest
+
+
+@pytest.fixture
+def paged_session(seed_session):
+    """Crea una sesión con 7 mensajes en una sola solicitud."""
+    return seed_session('page-session', 7, prefix='page')
+
+
+def _ids(data):
+    """Extrae los message_id de una respuesta."""
+    return [message['message_id'] for message in data['data']]
+
+
+class TestCursorPagination:
+    """Tests para cursores next/prev."""
+    
+    def test_walk_forward_and_back(self, client, paged_session):
+        """Verifica que se pueda recorrer la sesión hacia adelante y hacia atrás."""
+        first = json.loads(client.get(f'/api/messages/{paged_session}?limit=3').data)
+        assert _ids(first) == ['page-0', 'page-1', 'page-2']
+        assert first['pagination']['total'] == 7
+        assert first['pagination']['prev_cursor'] is None
+        
+        second = json.loads(client.get(
+            f"/api/messages/{paged_session}?limit=3&cursor={first['pagination']['next_cursor']}"
+        ).data)
+        assert _ids(second) == ['page-3', 'page-4', 'page-5']
+        assert second['pagination']['has_more'] is True
+        assert 'offset' not in second['pagination']
+        
+        third = json.loads(client.get(
+            f"/api/messages/{paged_session}?limit=3&cursor={second['pagination']['next_cursor']}"
+        ).data)
+        assert _ids(third) == ['page-6']
+        assert third['pagination']['has_more'] is False
+        
+        back = json.loads(client.get(
+            f"/api/messages/{paged_session}?limit=3&cursor={third['pagination']['prev_cursor']}"
+        ).data)
+        assert _ids(back) == ['page-3', 'page-4', 'page-5']
+        assert back['pagination']['has_more'] is True
+    
+    def test_cursor_with_sender_filter(self, client, paged_session):
+        """Verifica que el cursor respete el filtro de remitente."""
+        first = json.loads(client.get(f'/api/messages/{paged_session}?limit=2&sender=user').data)
+        second = json.loads(client.get(
+            f"/api/messages/{paged_session}?limit=2&sender=user&cursor={first['pagination']['next_cursor']}"
+        ).data)
+        
+        assert _ids(first) == ['page-0', 'page-2']
+        assert _ids(second) == ['page-4', 'page-6']
+    
+    def test_offset_still_supported(self, client, paged_session):
+        """Verifica la compatibilidad con limit/offset."""
+        data = json.loads(client.get(f'/api/messages/{paged_session}?limit=2&offset=4').data)
+        
+        assert _ids(data) == ['page-4', 'page-5']
+        assert data['pagination']['offset'] == 4
+        assert data['pagination']['prev_cursor'] is not None
+    
+    def test_invalid_cursor(self, client, paged_session):
+        """Verifica que un cursor mal formado devuelva 400."""
+        response = client.get(f'/api/messages/{paged_session}?cursor=no-es-un-cursor')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_CURSOR'
+    
+    def test_count_none_skips_total(self, client, paged_session):
+        """Verifica que count=none omita el total."""
+        data = json.loads(client.get(f'/api/messages/{paged_session}?limit=3&count=none').data)
+        
+        assert _ids(data) == ['page-0', 'page-1', 'page-2']
+        assert data['pagination']['total'] is None
+    
+    def test_invalid_count_mode(self, client, paged_session):
+        """Verifica que un modo de conteo desconocido sea rechazado."""
+        response = client.get(f'/api/messages/{paged_session}?count=approx')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_COUNT_MODE'
@@ -0,0 +1,216 @@
+"""
+Tests para el rate limiting por API Key y el almacenamiento SQLite compartido.
+"""
+import json
+import time
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from app.utils.rate_limit import SQLiteStorage
+
+
+def _create_key(client, **quota):
+    """Crea una API Key y retorna (key en texto plano, id)."""
+    response = client.post(
+        '/api/auth/keys',
+        data=json.dumps({'name': 'Rate limit', **quota}),
+        content_type='application/json'
+    )
+    data = json.loads(response.data)['data']
+    return data['api_key'], data['key_info']['id']
+
+
+class TestSQLiteStorage:
+    """Tests para el almacenamiento sqlite:// de Flask-Limiter."""
+    
+    def test_registered_scheme(self, tmp_path):
+        """Verifica que limits cree el almacenamiento desde la URI."""
+        storage = storage_from_string(f'sqlite:///{tmp_path / "limits.db"}')
+        
+        assert isinstance(storage, SQLiteStorage)
+        assert storage.check() is True
+    
+    def test_fixed_window_shared_between_processes(self, tmp_path):
+        """Verifica que dos conexiones al mismo archivo compartan los contadores."""
+        uri = f'sqlite:///{tmp_path / "limits.db"}'
+        first = FixedWindowRateLimiter(storage_from_string(uri))
+        second = FixedWindowRateLimiter(storage_from_string(uri))
+        limit = parse('3 per minute')
+        
+        assert first.hit(limit, 'key:1') is True
+        assert second.hit(limit, 'key:1') is True
+        assert first.hit(limit, 'key:1') is True
+        assert second.hit(limit, 'key:1') is False
+        assert first.hit(limit, 'key:2') is True
+    
+    def test_expired_window_restarts(self):
+        """Verifica que el contador se reinicie al expirar la ventana."""
+        storage = SQLiteStorage('sqlite:///:memory:')
+        
+        assert storage.incr('window', 1) == 1
+        assert storage.incr('window', 1) == 2
+        time.sleep(1.05)
+        assert storage.get('window') == 0
+        assert storage.incr('window', 1) == 1
+    
+    def test_token_bucket(self, monkeypatch):
+        """Verifica el consumo y la recarga de un token bucket."""
+        storage = SQLiteStorage('sqlite:///:memory:')
+        now = [1000.0]
+        monkeypatch.setattr('app.utils.rate_limit.time.time', lambda: now[0])
+        
+        assert storage.consume_token('bucket', 1, 2) == (True, 1, 0.0)
+        assert storage.consume_token('bucket', 1, 2) == (True, 0, 0.0)
+        allowed, remaining, retry_after = storage.consume_token('bucket', 1, 2)
+        assert (allowed, remaining, retry_after) == (False, 0, 1.0)
+        
+        now[0] += 1.5
+        assert storage.consume_token('bucket', 1, 2)[0] is True
+        assert storage.consume_token('bucket', 1, 2)[0] is False
+        
+        # La recarga nunca supera la capacidad
+        now[0] += 60
+        assert storage.consume_token('bucket', 1, 2) == (True, 1, 0.0)
+
+
+class TestTokenBucketLimiter:
+    """Tests para la cuota global por API Key."""
+    
+    def test_quota_per_api_key(self, client):
+        """Verifica que cada key tenga su propio bucket con su cuota."""
+        limited, _ = _create_key(client, rate_limit_per_minute=2)
+        other, _ = _create_key(client, rate_limit_per_minute=2)
+        
+        statuses = [client.get('/api/health', headers={'X-API-Key': limited}).status_code for _ in range(3)]
+        
+        assert statuses == [200, 200, 429]
+        assert client.get('/api/health', headers={'X-API-Key': other}).status_code == 200
+        assert client.get('/api/health').status_code == 200
+    
+    def test_retry_after_header(self, client):
+        """Verifica la respuesta 429 con Retry-After."""
+        api_key, _ = _create_key(client, rate_limit_per_minute=1)
+        client.get('/api/health', headers={'X-API-Key': api_key})
+        
+        response = client.get('/api/health', headers={'X-API-Key': api_key})
+        
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '60'
+        assert json.loads(response.data)['error']['code'] == 'RATE_LIMIT_EXCEEDED'
+    
+    def test_burst(self, client):
+        """Verifica que la ráfaga limite las solicitudes seguidas."""
+        api_key, _ = _create_key(client, rate_limit_per_minute=600, rate_limit_burst=3)
+        
+        statuses = [client.get('/api/health', headers={'X-API-Key': api_key}).status_code for _ in range(4)]
+        
+        assert statuses == [200, 200, 200, 429]
+    
+    def test_requests_without_key_limited_by_ip(self, app, client):
+        """Verifica que sin key se aplique la cuota global por IP."""
+        from app.utils.rate_limit import token_bucket_limiter
+        default_quota = token_bucket_limiter.per_minute
+        token_bucket_limiter.per_minute = 2
+        try:
+            statuses = [client.get('/api/health').status_code for _ in range(3)]
+            other_ip = client.get('/api/health', environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        finally:
+            token_bucket_limiter.per_minute = default_quota
+        
+        assert statuses == [200, 200, 429]
+        assert other_ip.status_code == 200
+    
+    def test_default_limit_without_token_bucket(self, app, client, monkeypatch):
+        """Verifica que sin token bucket las rutas sin límite propio usen el límite por defecto."""
+        from app.utils.rate_limit import token_bucket_limiter
+        monkeypatch.setattr(token_bucket_limiter, 'enabled', False)
+        app.config.update(RATE_LIMIT_TOKEN_BUCKET_ENABLED=False, RATE_LIMIT_PER_MINUTE=2)
+        
+        statuses = [client.get('/api/health').status_code for _ in range(3)]
+        
+        assert statuses == [200, 200, 429]
+    
+    def test_default_limit_exempt_with_token_bucket(self, app, client):
+        """Verifica que con token bucket el límite por defecto no se cuente dos veces."""
+        api_key, _ = _create_key(client, rate_limit_per_minute=600)
+        app.config['RATE_LIMIT_PER_MINUTE'] = 2
+        
+        statuses = [client.get('/api/health', headers={'X-API-Key': api_key}).status_code for _ in range(3)]
+        
+        assert statuses == [200, 200, 200]
+    
+    def test_route_limits_keyed_by_api_key(self, client):
+        """Verifica que los límites por ruta se cuenten por key y no por IP."""
+        first, _ = _create_key(client)
+        second, _ = _create_key(client)
+        
+        def import_status(api_key):
+            return client.post(
+                '/api/messages/import',
+                data='',
+                content_type='application/x-ndjson',
+                headers={'X-API-Key': api_key}
+            ).status_code
+        
+        statuses = [import_status(first) for _ in range(6)]
+        
+        assert statuses[5] == 429
+        assert 429 not in statuses[:5]
+        assert import_status(second) != 429
+
+
+class TestAPIKeyQuotaEndpoints:
+    """Tests para la configuración de cuotas de las API Keys."""
+    
+    def test_create_with_quota(self, client):
+        """Verifica que la cuota se guarde al crear la key."""
+        response = client.post(
+            '/api/auth/keys',
+            data=json.dumps({'name': 'Con cuota', 'rate_limit_per_minute': 30, 'rate_limit_burst': 5}),
+            content_type='application/json'
+        )
+        key_info = json.loads(response.data)['data']['key_info']
+        
+        assert key_info['rate_limit_per_minute'] == 30
+        assert key_info['rate_limit_burst'] == 5
+    
+    def test_update_quota_applies_immediately(self, client):
+        """Verifica que PATCH cambie la cuota de una key ya validada."""
+        api_key, key_id = _create_key(client, rate_limit_per_minute=1)
+        assert client.get('/api/health', headers={'X-API-Key': api_key}).status_code == 200
+        assert client.get('/api/health', headers={'X-API-Key': api_key}).status_code == 429
+        
+        response = client.patch(
+            f'/api/auth/keys/{key_id}',
+            data=json.dumps({'rate_limit_per_minute': 600, 'rate_limit_burst': 10}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['data']['rate_limit_burst'] == 10
+        assert client.get('/api/health', headers={'X-API-Key': api_key}).status_code == 200
+    
+    @pytest.mark.parametrize('value', [0, -5, 'diez', 2.5, True])
+    def test_invalid_quota(self, client, value):
+        """Verifica el error con una cuota no válida."""
+        _, key_id = _create_key(client)
+        
+        response = client.patch(
+            f'/api/auth/keys/{key_id}',
+            data=json.dumps({'rate_limit_per_minute': value}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_RATE_LIMIT'
+    
+    def test_update_nonexistent_key(self, client):
+        """Verifica el error al actualizar una key inexistente."""
+        response = client.patch(
+            '/api/auth/keys/9999',
+            data=json.dumps({'rate_limit_per_minute': 10}),
+            content_type='application/json'
+        )
+        
+        assert response.status_code == 404
@@ -0,0 +1,72 @@
+"""
+Tests para el camino de lectura con SQLAlchemy Core (MessageRecord).
+"""
+import json
+import pytest
+from app import db
+from app.models import Message
+from app.repositories.message_repository import MessageRepository
+from app.repositories.records import MessageRecord
+
+
+@pytest.fixture
+def read_session(seed_session):
+    """Crea una sesión con 6 mensajes."""
+    session_id = seed_session('read-session', 6, prefix='read', content='Mensaje de lectura {i}')
+    db.session.expunge_all()
+    return session_id
+
+
+def _get_in_mode(app, client, mode, url):
+    """Ejecuta un GET con el modo de lectura indicado."""
+    app.config['REPOSITORY_READ_MODE'] = mode
+    from app.utils.cache import session_page_cache
+    session_page_cache.clear()
+    return client.get(url).get_data()
+
+
+class TestCoreReadPath:
+    """Tests para REPOSITORY_READ_MODE = 'core'."""
+    
+    def test_returns_records_without_orm_objects(self, app, read_session):
+        """Verifica que el modo core no hidrate instancias ORM."""
+        messages = MessageRepository().get_messages_by_session(read_session, limit=10)
+        
+        assert all(isinstance(message, MessageRecord) for message in messages)
+        assert len(db.session.identity_map) == 0
+        assert not hasattr(messages[0], '__dict__')
+    
+    def test_orm_mode_returns_models(self, app, read_session):
+        """Verifica que el modo orm conserve las instancias Message."""
+        app.config['REPOSITORY_READ_MODE'] = 'orm'
+        
+        messages = MessageRepository().get_messages_by_session(read_session, limit=10)
+        
+        assert all(isinstance(message, Message) for message in messages)
+    
+    def test_to_dict_identical(self, app, read_session):
+        """Verifica que MessageRecord.to_dict() coincida con Message.to_dict()."""
+        records = MessageRepository().get_messages_by_session(read_session, limit=10)
+        models = Message.query.filter_by(session_id=read_session).order_by(Message.id).all()
+        
+        assert [record.to_dict() for record in records] == [model.to_dict() for model in models]
+        assert [record.id for record in records] == [model.id for model in models]
+    
+    @pytest.mark.parametrize('url', [
+        '/api/messages/read-session?limit=4',
+        '/api/messages/read-session?limit=4&offset=2&sender=user',
+        '/api/messages/read-session/search?q=lectura&limit=4&highlight=true',
+        '/api/messages/read-session/search?sender=system&count=none',
+        '/api/messages/read-session/export?format=csv',
+        '/api/messages/read-session/export',
+    ])
+    def test_responses_identical_in_both_modes(self, app, client, read_session, url):
+        """Verifica que las respuestas no dependan del modo de lectura."""
+        assert _get_in_mode(app, client, 'core', url) == _get_in_mode(app, client, 'orm', url)
+    
+    def test_keyset_identical_in_both_modes(self, app, client, read_session):
+        """Verifica la paginación con cursores en ambos modos."""
+        first = json.loads(client.get(f'/api/messages/{read_session}?limit=2').data)
+        url = f"/api/messages/{read_session}?limit=2&cursor={first['pagination']['next_cursor']}"
+        
+        assert _get_in_mode(app, client, 'core', url) == _get_in_mode(app, client, 'orm', url)
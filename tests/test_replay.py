@@ -0,0 +1,220 @@
+"""
+Tests para la reproducción de mensajes al unirse a una sesión por WebSocket.
+"""
+import json
+import threading
+import time
+import pytest
+from app.repositories.message_repository import MessageRepository
+from app.services.broadcast_dispatcher import broadcast_dispatcher
+from app.services.message_service import MessageService
+from app.utils.replay_buffer import replay_buffer
+
+
+@pytest.fixture
+def frames(socketio, monkeypatch):
+    """Registra los eventos enviados a cada cliente: eio_sid -> [(evento, datos)]."""
+    sent = {}
+    
+    def record(eio_sid, eio_pkt):
+        event, data = json.loads(eio_pkt.data[1:])
+        sent.setdefault(eio_sid, []).append((event, data))
+    
+    monkeypatch.setattr(socketio.server, '_send_eio_packet', record)
+    return sent
+
+
+def _join(app, socketio, frames, **data):
+    """Une un cliente nuevo a room-1 y retorna sus eventos tras vaciar la cola."""
+    ws_client = socketio.test_client(app)
+    ws_client.emit('join', {'session_id': 'room-1', **data})
+    broadcast_dispatcher.join(timeout=5)
+    return frames.setdefault(ws_client.eio_sid, [])
+
+
+def _history(events):
+    """message_id de la reproducción recibida."""
+    [history] = [data for event, data in events if event == 'history']
+    return [message['message_id'] for message in history['messages']], history['has_more']
+
+
+def _live(events):
+    """message_id recibidos en vivo, con new_message o new_messages."""
+    received = []
+    for event, data in events:
+        if event == 'new_message':
+            received.append(data['message_id'])
+        elif event == 'new_messages':
+            received.extend(message['message_id'] for message in data)
+    return received
+
+
+class TestReplayOnJoin:
+    """Tests para join con since_id y last_n."""
+    
+    def test_last_n_from_buffer(self, app, post_message, socketio, frames):
+        """Verifica que last_n reproduzca los últimos mensajes desde memoria."""
+        for i in range(5):
+            post_message(f'm-{i}', 'room-1')
+        
+        events = _join(app, socketio, frames, last_n=3)
+        
+        assert [event for event, _ in events] == ['connected', 'joined', 'history']
+        assert _history(events) == (['m-2', 'm-3', 'm-4'], True)
+        assert (replay_buffer.stats()['hits'], replay_buffer.stats()['misses']) == (1, 0)
+    
+    def test_since_id_then_live(self, app, post_message, socketio, frames):
+        """Verifica que tras la reproducción lleguen los mensajes en vivo."""
+        for i in range(3):
+            post_message(f'm-{i}', 'room-1')
+        
+        events = _join(app, socketio, frames, since_id='m-0')
+        post_message('m-3', 'room-1')
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert _history(events) == (['m-1', 'm-2'], False)
+        assert [event for event, _ in events][3:] == ['new_message']
+        assert _live(events) == ['m-3']
+    
+    def test_older_range_from_database(self, app, post_message, socketio, frames):
+        """Verifica que un since_id fuera del buffer se lea de la base de datos."""
+        for i in range(4):
+            post_message(f'm-{i}', 'room-1')
+        replay_buffer.init_app(app)
+        post_message('m-4', 'room-1')
+        
+        events = _join(app, socketio, frames, since_id='m-1')
+        
+        assert _history(events) == (['m-2', 'm-3', 'm-4'], False)
+        assert replay_buffer.stats()['misses'] == 1
+    
+    def test_import_discards_buffer(self, app, client, post_message, make_message, socketio, frames):
+        """Verifica que los mensajes importados no falten en una reproducción con since_id."""
+        for i in range(3):
+            post_message(f'm-{i}', 'room-1')
+        body = ''.join(json.dumps(make_message(f'm-1{i}', 'room-1')) + '\n' for i in range(2))
+        client.post('/api/messages/import', data=body, content_type='application/x-ndjson')
+        post_message('m-20', 'room-1')
+        
+        events = _join(app, socketio, frames, since_id='m-2')
+        
+        assert _history(events) == (['m-10', 'm-11', 'm-20'], False)
+        assert replay_buffer.stats()['misses'] == 1
+    
+    def test_replay_limited(self, app, post_message, socketio, frames):
+        """Verifica que se reproduzcan como mucho WS_REPLAY_MAX_MESSAGES, los más recientes."""
+        app.config['WS_REPLAY_MAX_MESSAGES'] = 2
+        for i in range(4):
+            post_message(f'm-{i}', 'room-1')
+        
+        events = _join(app, socketio, frames, since_id='m-0', last_n=10)
+        
+        assert _history(events) == (['m-2', 'm-3'], True)
+    
+    @pytest.mark.parametrize('data, code', [
+        ({'since_id': 'no-existe'}, 'MESSAGE_NOT_FOUND'),
+        ({'since_id': 42}, 'INVALID_REPLAY'),
+        ({'last_n': 0}, 'INVALID_REPLAY')
+    ])
+    def test_invalid_replay(self, app, socketio, frames, data, code):
+        """Verifica el evento error y que el cliente no se una al room."""
+        events = _join(app, socketio, frames, **data)
+        
+        assert [event for event, _ in events] == ['connected', 'error']
+        assert events[1][1]['code'] == code
+        assert not socketio.server.manager.rooms.get('/', {}).get('room-1')
+    
+    @pytest.mark.parametrize('batch', [False, True])
+    def test_queued_messages_not_repeated_live(self, app, post_message, socketio, frames, monkeypatch, batch):
+        """Verifica que los mensajes encolados antes del join lleguen solo en la reproducción."""
+        release = threading.Event()
+        emit = broadcast_dispatcher._emit
+        monkeypatch.setattr(broadcast_dispatcher, '_emit', lambda *args: release.wait(5) and emit(*args))
+        for i in range(5):
+            post_message(f'm-{i}', 'room-1')
+        
+        ws_client = socketio.test_client(app)
+        ws_client.emit('join', {'session_id': 'room-1', 'since_id': 'm-1', 'batch': batch})
+        release.set()
+        post_message('m-5', 'room-1')
+        broadcast_dispatcher.join(timeout=5)
+        
+        events = frames[ws_client.eio_sid]
+        assert _history(events) == (['m-2', 'm-3', 'm-4'], False)
+        assert [event for event, _ in events][:3] == ['connected', 'joined', 'history']
+        assert _live(events) == ['m-5']
+    
+    def test_join_waits_for_saved_messages_to_be_queued(self, app, post_message, socketio, frames, monkeypatch):
+        """Verifica que la lectura de la base de datos espere a las escrituras aún sin encolar."""
+        for i in range(2):
+            post_message(f'm-{i}', 'room-1')
+        replay_buffer.init_app(app)
+        saved = threading.Event()
+        release = threading.Event()
+        record = replay_buffer.record
+        
+        def slow_record(session_id, messages):
+            saved.set()
+            release.wait(5)
+            record(session_id, messages)
+        
+        monkeypatch.setattr(replay_buffer, 'record', slow_record)
+        writer = threading.Thread(target=post_message, args=('m-2', 'room-1'))
+        writer.start()
+        assert saved.wait(5)
+        
+        # m-2 ya está confirmado en la base de datos pero aún no encolado
+        threading.Timer(0.1, release.set).start()
+        events = _join(app, socketio, frames, since_id='m-0')
+        writer.join()
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert _history(events)[0] + _live(events) == ['m-1', 'm-2']
+    
+    def test_concurrent_writers_publish_in_id_order(self, app, post_message, socketio, frames, monkeypatch):
+        """Verifica que buffer, emisión y base de datos coincidan aunque un escritor anterior publique tarde."""
+        live = _join(app, socketio, frames)
+        saved = threading.Event()
+        save_message = MessageRepository.save_message
+        
+        def slow_save(repository, message_data):
+            message = save_message(repository, message_data)
+            if message_data['message_id'] == 'm-0':
+                saved.set()
+                time.sleep(0.3)
+            return message
+        
+        monkeypatch.setattr(MessageRepository, 'save_message', slow_save)
+        writer = threading.Thread(target=post_message, args=('m-0', 'room-1'), kwargs={'client': app.test_client()})
+        writer.start()
+        assert saved.wait(5)
+        post_message('m-1', 'room-1')
+        writer.join()
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert [message['message_id'] for message in replay_buffer.recent('room-1')] == ['m-0', 'm-1']
+        assert _live(live) == ['m-0', 'm-1']
+        assert _history(_join(app, socketio, frames, since_id='m-0')) == (['m-1'], False)
+    
+    @pytest.mark.parametrize('batch', [False, True])
+    def test_no_gap_or_duplicate_with_concurrent_writes(self, app, client, socketio, frames, make_message, batch):
+        """Verifica que reproducción y mensajes en vivo sumen cada mensaje una sola vez."""
+        message_ids = [f'm-{i}' for i in range(300)]
+        written = []
+        
+        def write():
+            with app.app_context():
+                service = MessageService()
+                for message_id in message_ids:
+                    service.process_and_save_message(make_message(message_id, 'room-1'))
+                    written.append(message_id)
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        while len(written) < 50:
+            time.sleep(0.001)
+        events = _join(app, socketio, frames, since_id='m-10', batch=batch)
+        writer.join()
+        broadcast_dispatcher.join(timeout=5)
+        
+        assert _history(events)[0] + _live(events) == message_ids[11:]
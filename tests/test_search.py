@@ -2,6 +2,7 @@
 Tests para funcionalidad de búsqueda de mensajes.
 """
 import json
+import pytest
 
 
 class TestSearchEndpoints:
@@ -230,3 +231,195 @@ class TestSearchEndpoints:
         data = json.loads(response.data)
         
         assert len(data['data']) >= 2
+
+
+class TestFullTextSearch:
+    """Tests para la búsqueda con el índice FTS5."""
+    
+    def _post(self, client, message_id, content, session_id='fts-session'):
+        """Guarda un mensaje en la sesión de pruebas."""
+        client.post(
+            '/api/messages',
+            data=json.dumps({
+                'message_id': message_id,
+                'session_id': session_id,
+                'content': content,
+                'timestamp': '2025-12-04T10:00:00Z',
+                'sender': 'user'
+            }),
+            content_type='application/json'
+        )
+    
+    def test_results_ranked_by_relevance(self, client):
+        """Verifica que los mensajes más relevantes aparezcan primero."""
+        self._post(client, 'fts-1', 'Necesito ayuda con mi cuenta y mi factura mensual')
+        self._post(client, 'fts-2', 'Información sobre productos')
+        self._post(client, 'fts-3', 'ayuda ayuda')
+        
+        response = client.get('/api/messages/fts-session/search?q=ayuda')
+        data = json.loads(response.data)
+        
+        assert [item['message_id'] for item in data['data']] == ['fts-3', 'fts-1']
+        assert data['pagination']['total'] == 2
+        
+        response = client.get('/api/messages/fts-session/search?q=ayuda&sort=chronological')
+        assert [item['message_id'] for item in json.loads(response.data)['data']] == ['fts-1', 'fts-3']
+    
+    def test_prefix_and_accent_insensitive(self, client):
+        """Verifica la búsqueda por prefijo e ignorando acentos."""
+        self._post(client, 'fts-4', 'Información sobre productos')
+        
+        response = client.get('/api/messages/fts-session/search?q=informacion produc')
+        
+        assert [item['message_id'] for item in json.loads(response.data)['data']] == ['fts-4']
+    
+    def test_query_syntax_is_escaped(self, client):
+        """Verifica que los operadores de FTS5 en el texto no rompan la consulta."""
+        self._post(client, 'fts-5', 'Pregunta: ¿OR "NEAR" funciona?')
+        
+        response = client.get('/api/messages/fts-session/search?q=OR NEAR(" -')
+        
+        assert response.status_code == 200
+        assert [item['message_id'] for item in json.loads(response.data)['data']] == ['fts-5']
+    
+    def test_highlight(self, client):
+        """Verifica el fragmento resaltado."""
+        self._post(client, 'fts-6', 'Necesito ayuda con mi cuenta')
+        
+        response = client.get('/api/messages/fts-session/search?q=ayuda&highlight=true')
+        result = json.loads(response.data)['data'][0]
+        
+        assert result['highlight'] == 'Necesito <mark>ayuda</mark> con mi cuenta'
+        assert result['content'] == 'Necesito ayuda con mi cuenta'
+    
+    @pytest.mark.parametrize('full_text', [True, False])
+    def test_highlight_escapes_content(self, app, client, full_text):
+        """Verifica que el fragmento escape el HTML del contenido y conserve <mark>."""
+        from app.repositories.message_repository import MessageRepository
+        
+        self._post(client, 'fts-10', '<script>alert(1)</script> prueba & "otra"')
+        app.config['SEARCH_FULL_TEXT_ENABLED'] = full_text
+        MessageRepository().detect_full_text_search()
+        
+        try:
+            response = client.get('/api/messages/fts-session/search?q=prueba&highlight=true')
+        finally:
+            app.config['SEARCH_FULL_TEXT_ENABLED'] = True
+            MessageRepository().detect_full_text_search()
+        
+        result = json.loads(response.data)['data'][0]
+        assert '<script>' not in result['highlight']
+        assert '&lt;script&gt;' in result['highlight']
+        assert result['highlight'].endswith('<mark>prueba</mark> &amp; &quot;otra&quot;')
+    
+    def test_invalid_sort(self, client):
+        """Verifica que un orden desconocido sea rechazado."""
+        response = client.get('/api/messages/fts-session/search?q=ayuda&sort=random')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_SORT'
+    
+    def test_like_fallback(self, app, client):
+        """Verifica que sin FTS5 se conserve la búsqueda por subcadena."""
+        from app.repositories.message_repository import MessageRepository
+        
+        self._post(client, 'fts-7', 'Necesito ayuda con mi cuenta')
+        app.config['SEARCH_FULL_TEXT_ENABLED'] = False
+        MessageRepository().detect_full_text_search()
+        
+        try:
+            response = client.get('/api/messages/fts-session/search?q=yuda&highlight=true')
+        finally:
+            app.config['SEARCH_FULL_TEXT_ENABLED'] = True
+            MessageRepository().detect_full_text_search()
+        
+        data = json.loads(response.data)
+        assert [item['message_id'] for item in data['data']] == ['fts-7']
+        assert data['data'][0]['highlight'] == 'Necesito a<mark>yuda</mark> con mi cuenta'
+    
+    def test_migration_indexes_existing_messages(self, app, client):
+        """Verifica que la migración indexe los mensajes previos a la tabla FTS5."""
+        from sqlalchemy import text
+        from app import db
+        from app.migrations import run_migrations
+        
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP TABLE messages_fts'))
+            for trigger in ('messages_fts_insert', 'messages_fts_delete', 'messages_fts_update'):
+                connection.execute(text(f'DROP TRIGGER {trigger}'))
+        self._post(client, 'fts-8', 'Mensaje previo al índice')
+        
+        run_migrations()
+        self._post(client, 'fts-9', 'Mensaje posterior al índice')
+        
+        response = client.get('/api/messages/fts-session/search?q=indice&sort=chronological')
+        
+        assert [item['message_id'] for item in json.loads(response.data)['data']] == ['fts-8', 'fts-9']
+
+
+class TestSearchCountModes:
+    """Tests para el parámetro count de la búsqueda."""
+    
+    @pytest.fixture
+    def search_session(self, seed_session):
+        """Crea una sesión con 6 mensajes que contienen "prueba"."""
+        return seed_session('count-session', 6, prefix='count', content='Mensaje de prueba {i}')
+    
+    def test_exact_count_in_single_query(self, app, search_session):
+        """Verifica que la página y el total se obtengan con una sola consulta."""
+        from sqlalchemy import event
+        from app import db
+        from app.repositories.message_repository import MessageRepository
+        
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            rows, total, has_more = MessageRepository().search_messages_page(
+                search_session, {'query': 'prueba'}, limit=4
+            )
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        
+        assert len(statements) == 1
+        assert len(rows) == 4
+        assert total == 6
+        assert has_more is True
+    
+    def test_count_none(self, client, search_session):
+        """Verifica que count=none omita el total pero informe si hay más resultados."""
+        data = json.loads(client.get(f'/api/messages/{search_session}/search?q=prueba&limit=4&count=none').data)
+        
+        assert len(data['data']) == 4
+        assert data['pagination']['total'] is None
+        assert data['pagination']['has_more'] is True
+    
+    def test_count_estimate_is_bounded(self, app, client, search_session):
+        """Verifica que count=estimate deje de contar al llegar al límite configurado."""
+        app.config['SEARCH_COUNT_ESTIMATE_CAP'] = 4
+        
+        data = json.loads(client.get(f'/api/messages/{search_session}/search?q=prueba&limit=2&count=estimate').data)
+        assert data['pagination']['total'] == 4
+        assert data['pagination']['total_exact'] is False
+        
+        data = json.loads(client.get(f'/api/messages/{search_session}/search?q=prueba 5&count=estimate').data)
+        assert data['pagination']['total'] == 1
+        assert data['pagination']['total_exact'] is True
+    
+    def test_exact_count_past_last_page(self, client, search_session):
+        """Verifica el total cuando el offset supera los resultados."""
+        data = json.loads(client.get(f'/api/messages/{search_session}/search?q=prueba&offset=10').data)
+        
+        assert data['data'] == []
+        assert data['pagination']['total'] == 6
+        assert data['pagination']['has_more'] is False
+    
+    def test_invalid_count_mode(self, client, search_session):
+        """Verifica que un modo de conteo desconocido sea rechazado."""
+        response = client.get(f'/api/messages/{search_session}/search?count=approx')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_COUNT_MODE'
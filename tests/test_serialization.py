@@ -0,0 +1,70 @@
+"""
+Tests para los backends de serialización JSON.
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from app.utils.serialization import OrjsonJSONProvider, init_json
+
+pytest.importorskip('orjson')
+
+
+class TestJsonBackends:
+    """Tests para la selección y el formato del proveedor JSON."""
+    
+    def test_auto_uses_orjson(self, app):
+        """Verifica que 'auto' instale orjson cuando está disponible."""
+        assert isinstance(app.json, OrjsonJSONProvider)
+    
+    def test_orjson_matches_stdlib(self, app):
+        """Verifica que ambos backends produzcan el mismo documento."""
+        payload = {
+            'contenido': 'Información',
+            'cuando': datetime(2025, 12, 4, 10, 0, tzinfo=timezone.utc),
+            'monto': Decimal('1.50'),
+            'lista': [1, None, True],
+            3: 'clave no str'
+        }
+        
+        orjson_output = app.json.dumps(payload)
+        app.config['JSON_BACKEND'] = 'json'
+        init_json(app)
+        stdlib_output = app.json.dumps(payload)
+        
+        assert json.loads(orjson_output) == json.loads(stdlib_output)
+    
+    def test_compact_and_indented_output(self, app):
+        """Verifica JSON_COMPACT en las respuestas."""
+        app.config['JSON_COMPACT'] = True
+        init_json(app)
+        assert app.json.response({'a': 1, 'b': [2]}).get_data() == b'{"a":1,"b":[2]}\n'
+        
+        app.config['JSON_COMPACT'] = False
+        init_json(app)
+        assert b'\n  "a": 1' in app.json.response({'a': 1}).get_data()
+    
+    def test_keys_not_sorted(self, client, sample_message):
+        """Verifica que se respete JSON_SORT_KEYS = False."""
+        response = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        assert list(json.loads(response.data)['data']) == ['message_id', 'session_id', 'content', 'timestamp', 'sender', 'metadata']
+    
+    def test_stdlib_backend(self, app, client, sample_message):
+        """Verifica que la API funcione con el backend estándar."""
+        app.config['JSON_BACKEND'] = 'json'
+        init_json(app)
+        assert type(app.json) is DefaultJSONProvider
+        
+        response = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        assert response.status_code == 201
+        assert json.loads(response.data)['data']['message_id'] == sample_message['message_id']
+    
+    def test_unknown_backend(self, app):
+        """Verifica que un backend desconocido sea rechazado."""
+        app.config['JSON_BACKEND'] = 'ujson'
+        
+        with pytest.raises(ValueError):
+            init_json(app)
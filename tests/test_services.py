@@ -5,6 +5,7 @@ Prueba el servicio de validación y el servicio de mensajes.
 import pytest
 from app.services.validation_service import ValidationService
 from app.services.message_service import MessageService
+from app.services.content_filter import ContentFilter
 from app.utils.validators import ValidationError
 
 
@@ -119,3 +120,41 @@ class TestMessageService:
         
         assert metadata['word_count'] == 0
         assert metadata['character_count'] == 0
+    
+    def test_filter_content_respects_word_boundaries(self):
+        """Prueba que el filtrado no altere palabras que solo contienen un término."""
+        service = MessageService()
+        
+        content = "Scammer envió sPaM; spam."
+        filtered = service._filter_content(content)
+        
+        assert filtered == "Scammer envió ****; ****."
+
+
+class TestContentFilter:
+    """Casos de prueba para el motor ContentFilter."""
+    
+    def test_shared_prefixes(self):
+        """Prueba términos que comparten prefijo, incluidas frases."""
+        engine = ContentFilter(['scam', 'scammer', 'free money'])
+        
+        filtered = engine.filter("Un scammer ofrece FREE MONEY, es un scam")
+        
+        assert filtered == "Un ******* ofrece **********, es un ****"
+    
+    def test_reload_from_blocklist_file(self, tmp_path):
+        """Prueba la recarga desde un archivo de términos."""
+        blocklist = tmp_path / 'blocklist.txt'
+        blocklist.write_text('# comentario\nfraude\n', encoding='utf-8')
+        engine = ContentFilter()
+        engine.blocklist_path = str(blocklist)
+        
+        engine.reload()
+        
+        assert engine.filter("Fraude y spam") == "****** y ****"
+    
+    def test_special_characters_are_escaped(self):
+        """Prueba que los términos con caracteres especiales se traten literalmente."""
+        engine = ContentFilter(['c++', 'a.b'])
+        
+        assert engine.filter("c++ y axb y a.b") == "*** y axb y ***"
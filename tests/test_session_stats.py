@@ -0,0 +1,62 @@
+"""
+Tests para los contadores mantenidos por sesión.
+"""
+import json
+import pytest
+from app import db
+from app.models import Message, SessionStats
+from app.repositories.message_repository import MessageRepository
+
+
+@pytest.fixture
+def stats_message(make_message):
+    """Construye el mensaje stats-<index>, con un timestamp que crece con index."""
+    def build(index, sender='user', session_id='stats-session'):
+        return make_message(f'stats-{index}', session_id, sender=sender, timestamp=f'2025-12-04T10:00:{index:02d}Z')
+    
+    return build
+
+
+class TestSessionStats:
+    """Tests para session_stats."""
+    
+    def test_counters_updated_on_insert(self, client, stats_message):
+        """Verifica que las inserciones individuales y por lote actualicen los contadores."""
+        client.post('/api/messages', data=json.dumps(stats_message(0)), content_type='application/json')
+        batch = [stats_message(1, 'system'), stats_message(2), stats_message(3, 'system'), stats_message(0)]
+        client.post('/api/messages/batch', data=json.dumps(batch), content_type='application/json')
+        
+        stats = db.session.get(SessionStats, 'stats-session')
+        last = Message.query.filter_by(message_id='stats-3').one()
+        
+        assert (stats.total_count, stats.user_count, stats.system_count) == (4, 2, 2)
+        assert stats.last_id == last.id
+        assert stats.last_timestamp == '2025-12-04T10:00:03Z'
+    
+    def test_pagination_total_uses_counters(self, client, stats_message):
+        """Verifica los totales de paginación con y sin filtro de remitente."""
+        batch = [stats_message(i, 'user' if i < 3 else 'system') for i in range(5)]
+        client.post('/api/messages/batch', data=json.dumps(batch), content_type='application/json')
+        
+        total = json.loads(client.get('/api/messages/stats-session').data)['pagination']['total']
+        users = json.loads(client.get('/api/messages/stats-session?sender=user').data)['pagination']['total']
+        empty = json.loads(client.get('/api/messages/sin-mensajes').data)['pagination']['total']
+        
+        assert (total, users, empty) == (5, 3, 0)
+    
+    def test_rebuild_recomputes_counters(self, app, client, stats_message):
+        """Verifica que el comando de reconstrucción corrija contadores desfasados."""
+        batch = [stats_message(i, 'user' if i % 2 else 'system') for i in range(4)]
+        batch.append(stats_message(9, session_id='otra-session'))
+        client.post('/api/messages/batch', data=json.dumps(batch), content_type='application/json')
+        
+        db.session.get(SessionStats, 'stats-session').total_count = 99
+        db.session.commit()
+        
+        result = app.test_cli_runner().invoke(args=['rebuild-session-stats'])
+        
+        assert 'Contadores reconstruidos para 2 sesiones' in result.output
+        db.session.expire_all()
+        stats = MessageRepository().get_session_stats('stats-session')
+        assert (stats.total_count, stats.user_count, stats.system_count) == (4, 2, 2)
+        assert stats.last_timestamp == '2025-12-04T10:00:03Z'
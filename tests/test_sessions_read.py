@@ -0,0 +1,160 @@
+"""
+Tests para la lectura de varias sesiones en una sola solicitud.
+"""
+import json
+import pytest
+from sqlalchemy import event
+from app import db
+
+
+@pytest.fixture
+def sessions(seed_session):
+    """Crea tres sesiones con 5, 3 y 1 mensajes alternando remitente."""
+    sizes = {'multi-a': 5, 'multi-b': 3, 'multi-c': 1}
+    for session_id, size in sizes.items():
+        seed_session(session_id, size)
+    return sizes
+
+
+def _read(client, body):
+    """Envía una lectura de varias sesiones."""
+    return client.post('/api/messages/sessions', data=json.dumps(body), content_type='application/json')
+
+
+def _ids(page):
+    """message_id de los mensajes de una página."""
+    return [message['message_id'] for message in page['data']]
+
+
+class TestSessionsRead:
+    """Tests para POST /api/messages/sessions."""
+    
+    def test_latest_messages_per_session(self, client, sessions):
+        """Verifica que sin cursor se retornen los mensajes más recientes de cada sesión."""
+        response = _read(client, {'sessions': [
+            {'session_id': 'multi-a', 'limit': 2},
+            {'session_id': 'multi-c', 'limit': 2},
+            {'session_id': 'sin-mensajes'}
+        ]})
+        data = response.get_json()['data']
+        
+        assert response.status_code == 200
+        assert list(data) == ['multi-a', 'multi-c', 'sin-mensajes']
+        assert _ids(data['multi-a']) == ['multi-a-3', 'multi-a-4']
+        assert data['multi-a']['pagination']['has_more'] is True
+        assert data['multi-a']['pagination']['total'] == 5
+        assert _ids(data['multi-c']) == ['multi-c-0']
+        assert data['multi-c']['pagination']['prev_cursor'] is None
+        assert data['sin-mensajes']['data'] == []
+        assert data['sin-mensajes']['pagination']['total'] == 0
+    
+    def test_cursors_continue_each_session(self, client, sessions):
+        """Verifica que los cursores de cada sesión se puedan combinar en otra lectura."""
+        first = _read(client, {'sessions': [
+            {'session_id': 'multi-a', 'limit': 2},
+            {'session_id': 'multi-b', 'limit': 1}
+        ]}).get_json()['data']
+        
+        second = _read(client, {'sessions': [
+            {'session_id': 'multi-a', 'limit': 2, 'cursor': first['multi-a']['pagination']['prev_cursor']},
+            {'session_id': 'multi-b', 'limit': 1, 'cursor': first['multi-b']['pagination']['prev_cursor']}
+        ]}).get_json()['data']
+        
+        assert _ids(second['multi-a']) == ['multi-a-1', 'multi-a-2']
+        assert _ids(second['multi-b']) == ['multi-b-1']
+        
+        # Hacia adelante desde la página anterior se vuelve a la primera
+        third = _read(client, {'sessions': [
+            {'session_id': 'multi-a', 'limit': 5, 'cursor': second['multi-a']['pagination']['next_cursor']}
+        ]}).get_json()['data']
+        
+        assert _ids(third['multi-a']) == ['multi-a-3', 'multi-a-4']
+        assert third['multi-a']['pagination']['has_more'] is False
+    
+    def test_sender_and_fields(self, client, sessions):
+        """Verifica el filtro por remitente y la selección de campos."""
+        data = _read(client, {
+            'sessions': [{'session_id': 'multi-a', 'limit': 3}],
+            'sender': 'user',
+            'fields': 'message_id,sender'
+        }).get_json()['data']['multi-a']
+        
+        assert data['data'] == [
+            {'message_id': 'multi-a-0', 'sender': 'user'},
+            {'message_id': 'multi-a-2', 'sender': 'user'},
+            {'message_id': 'multi-a-4', 'sender': 'user'}
+        ]
+        assert data['pagination']['total'] == 3
+    
+    @pytest.mark.parametrize('fields, status', [
+        (['message_id', 'sender'], 200),
+        (['message_id', 7], 400),
+        ({'message_id': True}, 400)
+    ])
+    def test_fields_as_json_list(self, client, sessions, fields, status):
+        """Verifica fields como lista y el error 400 con tipos no válidos."""
+        response = _read(client, {'sessions': [{'session_id': 'multi-a', 'limit': 1}], 'fields': fields})
+        
+        assert response.status_code == status
+        if status == 200:
+            assert response.get_json()['data']['multi-a']['data'] == [{'message_id': 'multi-a-4', 'sender': 'user'}]
+        else:
+            assert response.get_json()['error']['code'] == 'INVALID_FIELDS'
+    
+    def test_constant_number_of_queries(self, app, client, sessions):
+        """Verifica que el número de consultas no dependa del número de sesiones."""
+        def count_queries(body):
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                _read(client, body)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            return len(statements)
+        
+        one = count_queries({'sessions': [{'session_id': 'multi-a'}]})
+        many = count_queries({'sessions': [{'session_id': f'multi-{i}'} for i in range(40)]})
+        
+        assert one == many == 2
+    
+    def test_count_none_omits_totals(self, client, sessions):
+        """Verifica que count=none no incluya totales."""
+        data = _read(client, {'sessions': [{'session_id': 'multi-a'}], 'count': 'none'}).get_json()['data']
+        
+        assert 'total' not in data['multi-a']['pagination']
+    
+    def test_duplicate_session(self, client):
+        """Verifica el error al repetir una sesión."""
+        response = _read(client, {'sessions': [{'session_id': 'x'}, {'session_id': 'x'}]})
+        
+        assert response.status_code == 400
+        assert response.get_json()['error']['code'] == 'DUPLICATE_SESSION_ID'
+    
+    def test_too_many_sessions(self, app, client):
+        """Verifica el límite de sesiones por solicitud."""
+        app.config['SESSIONS_READ_MAX_SESSIONS'] = 2
+        
+        response = _read(client, {'sessions': [{'session_id': f's-{i}'} for i in range(3)]})
+        
+        assert response.get_json()['error']['code'] == 'BATCH_TOO_LARGE'
+    
+    @pytest.mark.parametrize('body', [{}, {'sessions': 'multi-a'}, {'sessions': [{'limit': 2}]}])
+    def test_invalid_body(self, client, body):
+        """Verifica el error de formato del cuerpo."""
+        response = _read(client, body)
+        
+        assert response.status_code == 400
+        assert response.get_json()['error']['code'] == 'INVALID_FORMAT'
+    
+    def test_invalid_cursor(self, client):
+        """Verifica el error con un cursor mal formado."""
+        response = _read(client, {'sessions': [{'session_id': 'x', 'cursor': 'no-es-un-cursor'}]})
+        
+        assert response.get_json()['error']['code'] == 'INVALID_CURSOR'
+    
+    def test_session_named_sessions_still_readable(self, client):
+        """Verifica que GET /api/messages/sessions siga leyendo la sesión 'sessions'."""
+        response = client.get('/api/messages/sessions')
+        
+        assert response.status_code == 200
@@ -0,0 +1,111 @@
+"""
+Tests para el parseo de timestamps y la columna epoch normalizada.
+"""
+import json
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import event, text
+from app import db
+from app.migrations import run_migrations
+from app.models import Message
+from app.utils.timestamps import parse_iso_timestamp, to_epoch_ms
+
+
+class TestTimestampParsing:
+    """Tests para parse_iso_timestamp y to_epoch_ms."""
+    
+    def test_canonical_fast_path(self):
+        """Verifica la forma YYYY-MM-DDTHH:MM:SSZ."""
+        assert parse_iso_timestamp('2023-06-15T14:30:00Z') == datetime(2023, 6, 15, 14, 30, tzinfo=timezone.utc)
+    
+    def test_fallback_formats(self):
+        """Verifica que las demás variantes ISO se normalicen al mismo instante."""
+        assert to_epoch_ms('2023-06-15T16:30:00+02:00') == to_epoch_ms('2023-06-15T14:30:00Z')
+        assert to_epoch_ms('2023-06-15T14:30:00.250Z') == to_epoch_ms('2023-06-15T14:30:00Z') + 250
+        assert to_epoch_ms('2023-06-15T14:30:00') == to_epoch_ms('2023-06-15T14:30:00Z')
+    
+    def test_invalid_values(self):
+        """Verifica que los valores inválidos se rechacen en ambos caminos."""
+        with pytest.raises(ValueError):
+            parse_iso_timestamp('2023-13-15T14:30:00Z')
+        with pytest.raises(ValueError):
+            parse_iso_timestamp('not-a-timestamp')
+
+
+class TestEpochColumn:
+    """Tests para messages.timestamp_epoch_ms."""
+    
+    def test_search_with_mixed_offsets(self, client):
+        """Verifica que los filtros de rango comparen instantes y no strings."""
+        for index, timestamp in enumerate(['2025-12-04T09:00:00+02:00', '2025-12-04T08:00:00Z']):
+            client.post(
+                '/api/messages',
+                data=json.dumps({
+                    'message_id': f'offset-{index}',
+                    'session_id': 'offset-session',
+                    'content': 'Mensaje con offset',
+                    'timestamp': timestamp,
+                    'sender': 'user'
+                }),
+                content_type='application/json'
+            )
+        
+        response = client.get(
+            '/api/messages/offset-session/search?start_date=2025-12-04T07:30:00Z&end_date=2025-12-04T08:30:00Z'
+        )
+        data = json.loads(response.data)
+        
+        assert [message['message_id'] for message in data['data']] == ['offset-1']
+    
+    def test_invalid_date_parameter(self, client):
+        """Verifica que una fecha de búsqueda inválida devuelva 400."""
+        response = client.get('/api/messages/offset-session/search?start_date=ayer')
+        
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_DATE'
+    
+    def test_migration_adds_and_backfills_column(self, app):
+        """Verifica que la migración agregue la columna y rellene las filas existentes."""
+        db.session.execute(text('DROP INDEX ix_messages_session_timestamp_epoch'))
+        db.session.execute(text('ALTER TABLE messages DROP COLUMN timestamp_epoch_ms'))
+        db.session.execute(text(
+            "INSERT INTO messages (message_id, session_id, content, timestamp, sender, "
+            "word_count, character_count, processed_at) "
+            "VALUES ('legacy-1', 'legacy', 'Hola', '2023-06-15T14:30:00Z', 'user', 1, 4, '2023-06-15T14:30:01Z')"
+        ))
+        db.session.commit()
+        
+        run_migrations()
+        
+        message = Message.query.filter_by(message_id='legacy-1').one()
+        assert message.timestamp_epoch_ms == to_epoch_ms('2023-06-15T14:30:00Z')
+    
+    def test_backfill_runs_once(self, app):
+        """Verifica que en los arranques siguientes no se vuelva a recorrer la tabla."""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            run_migrations()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert not [statement for statement in statements if 'timestamp_epoch_ms IS NULL' in statement]
+    
+    def test_timestamp_parsed_once_per_message(self, client, sample_message, monkeypatch):
+        """Verifica que el timestamp validado se reutilice al guardar el mensaje."""
+        calls = []
+        
+        def counting_parse(value):
+            calls.append(value)
+            return parse_iso_timestamp(value)
+        
+        monkeypatch.setattr('app.utils.timestamps.parse_iso_timestamp', counting_parse)
+        monkeypatch.setattr('app.services.validation_service.parse_iso_timestamp', counting_parse)
+        
+        response = client.post('/api/messages', data=json.dumps(sample_message), content_type='application/json')
+        
+        assert response.status_code == 201
+        assert calls == [sample_message['timestamp']]
+        message = Message.query.filter_by(message_id=sample_message['message_id']).one()
+        assert message.timestamp_epoch_ms == to_epoch_ms(sample_message['timestamp'])